@@ -14,22 +14,114 @@ class Settings:
     MODEL_NAME = os.getenv("MODEL_NAME", "llama-3.1-8b-instant")
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     
+    # LLM Routing
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))  # Overall deadline per generate call
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))  # Pooled keep-alive connections
+    LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+    LLM_FALLBACK_MODELS = [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if m.strip()]
+    LLM_LOCAL_BASE_URL = os.getenv("LLM_LOCAL_BASE_URL", "")  # OpenAI-compatible endpoint used as last resort
+    LLM_LOCAL_MODEL = os.getenv("LLM_LOCAL_MODEL", "local")
+    LLM_LOCAL_API_KEY = os.getenv("LLM_LOCAL_API_KEY")
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))  # Send a duplicate request after this latency percentile
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))  # Recent attempts kept per route
+    LLM_RATE_LIMIT_COOLDOWN = float(os.getenv("LLM_RATE_LIMIT_COOLDOWN", "10"))  # Seconds to skip a route after a 429
+    LLM_ERROR_COOLDOWN = float(os.getenv("LLM_ERROR_COOLDOWN", "5"))
+    
     # Directories
     UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "./uploads"))
     VECTOR_STORE_DIR = Path(os.getenv("VECTOR_STORE_DIR", "./vectorstore"))
     CHAT_HISTORY_DIR = Path(os.getenv("CHAT_HISTORY_DIR", "./chat_history"))
     
+    # Vector Store Sharding (empty: a single local store in VECTOR_STORE_DIR)
+    VECTOR_STORE_SHARDS = os.getenv("VECTOR_STORE_SHARDS", "")  # Chroma servers as name=url pairs, e.g. "s1=http://10.0.0.5:8000,s2=http://10.0.0.6:8000"
+    VECTOR_STORE_DRAINING_SHARDS = os.getenv("VECTOR_STORE_DRAINING_SHARDS", "")  # Still read, but their documents move to the others
+    SHARD_VIRTUAL_NODES = int(os.getenv("SHARD_VIRTUAL_NODES", "64"))  # Ring points per shard; more = more even spread
+    SHARD_QUERY_WORKERS = int(os.getenv("SHARD_QUERY_WORKERS", "8"))  # Shards searched in parallel per retrieval
+    SHARD_REBALANCE_INTERVAL = float(os.getenv("SHARD_REBALANCE_INTERVAL", "300"))  # Seconds between placement checks; 0 disables (run it on one instance only)
+    
     # Text Processing
     CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+    COARSE_CHUNK_SIZE = int(os.getenv("COARSE_CHUNK_SIZE", "2000"))  # Chunks used by summary / notes / FAQ / podcast
+    COARSE_CHUNK_OVERLAP = int(os.getenv("COARSE_CHUNK_OVERLAP", "200"))
     
     # Retrieval
     MAX_RETRIEVAL_CHUNKS = int(os.getenv("MAX_RETRIEVAL_CHUNKS", "5"))
     
+    # Document Routing (queries over many documents)
+    ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "true").lower() == "true"
+    ROUTING_MIN_DOCUMENTS = int(os.getenv("ROUTING_MIN_DOCUMENTS", "100"))  # Below this many documents every one is searched
+    ROUTING_TOP_DOCUMENTS = int(os.getenv("ROUTING_TOP_DOCUMENTS", "32"))  # Documents searched per query; higher = better recall, slower
+    ROUTING_SEGMENTS = int(os.getenv("ROUTING_SEGMENTS", "4"))  # Section-level vectors per document signature
+    
+    # Near-Duplicate Chunks (repeated slides, boilerplate, re-issued chapters)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))  # Estimated Jaccard similarity that counts as a duplicate
+    DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))  # MinHash signature length
+    DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))  # LSH bands; must divide DEDUP_NUM_PERM
+    DEDUP_SHINGLE_WORDS = int(os.getenv("DEDUP_SHINGLE_WORDS", "5"))
+    
+    # Batch Question Answering
+    MAX_BATCH_QUESTIONS = int(os.getenv("MAX_BATCH_QUESTIONS", "200"))
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))  # Concurrent LLM calls per batch
+    BATCH_TIMEOUT_SECONDS = float(os.getenv("BATCH_TIMEOUT_SECONDS", "600"))
+    
+    # Background Tasks
+    TASK_WORKERS = int(os.getenv("TASK_WORKERS", "1"))  # Concurrent summarize/notes/FAQ/podcast jobs
+    TASK_MAX_YIELD_SECONDS = float(os.getenv("TASK_MAX_YIELD_SECONDS", "30"))  # Longest a job waits for chat traffic per LLM call
+    TASK_JOB_RETENTION_SECONDS = int(os.getenv("TASK_JOB_RETENTION_SECONDS", "604800"))  # Finished jobs older than this are dropped (0 = no age limit)
+    TASK_JOB_RETENTION_COUNT = int(os.getenv("TASK_JOB_RETENTION_COUNT", "500"))  # Most finished jobs kept (0 = no count limit)
+    
+    # Index Snapshots
+    SNAPSHOT_BOOTSTRAP_DIR = os.getenv("SNAPSHOT_BOOTSTRAP_DIR", "")  # Import missing documents from here on startup
+    SNAPSHOT_VERIFY = os.getenv("SNAPSHOT_VERIFY", "true").lower() == "true"
+    
+    # Vector Index Residency
+    INDEX_PREFETCH_ENABLED = os.getenv("INDEX_PREFETCH_ENABLED", "true").lower() == "true"
+    INDEX_PREFETCH_WORKERS = int(os.getenv("INDEX_PREFETCH_WORKERS", "2"))
+    
+    # Admission Control
+    ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "10"))  # Shared by chat and uploads
+    ADMISSION_MAX_QUEUED_PER_SESSION = int(os.getenv("ADMISSION_MAX_QUEUED_PER_SESSION", "4"))
+    CHAT_MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", "8"))
+    CHAT_QUEUE_SIZE = int(os.getenv("CHAT_QUEUE_SIZE", "64"))
+    CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "20"))  # Longest a query may wait for a slot
+    UPLOAD_MAX_CONCURRENT = int(os.getenv("UPLOAD_MAX_CONCURRENT", "2"))
+    UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "16"))
+    UPLOAD_QUEUE_TIMEOUT = float(os.getenv("UPLOAD_QUEUE_TIMEOUT", "60"))
+    THREADPOOL_WORKERS = int(os.getenv("THREADPOOL_WORKERS", "40"))  # Blocking work off the event loop; keep above ADMISSION_MAX_CONCURRENT
+    
+    # Context Compression
+    CONTEXT_COMPRESSION_ENABLED = os.getenv("CONTEXT_COMPRESSION_ENABLED", "true").lower() == "true"
+    QA_CONTEXT_TOKEN_BUDGET = int(os.getenv("QA_CONTEXT_TOKEN_BUDGET", "600"))  # Context tokens kept for a question
+    TASK_CONTEXT_TOKEN_BUDGET = int(os.getenv("TASK_CONTEXT_TOKEN_BUDGET", "3000"))  # Context tokens kept for notes/FAQ/podcast
+    SENTENCE_EMBEDDING_CACHE_SIZE = int(os.getenv("SENTENCE_EMBEDDING_CACHE_SIZE", "20000"))
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "512"))
+    
     # Map-Reduce Summarization
     MAX_CHUNKS_PER_BATCH = int(os.getenv("MAX_CHUNKS_PER_BATCH", "3"))  # Chunks per summary batch
     MAX_TOKENS_PER_CHUNK = int(os.getenv("MAX_TOKENS_PER_CHUNK", "1500"))  # Estimated tokens per chunk
     
+    # Token Budgets (0 disables a limit)
+    CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", "4"))  # Used to estimate prompt size before a call
+    GROQ_TPM_LIMIT = int(os.getenv("GROQ_TPM_LIMIT", "0"))  # Tokens per minute across all requests
+    SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "0"))  # Tokens per session per budget window
+    DOCUMENT_TOKEN_BUDGET = int(os.getenv("DOCUMENT_TOKEN_BUDGET", "0"))  # Tokens per document per budget window
+    BUDGET_WINDOW_SECONDS = int(os.getenv("BUDGET_WINDOW_SECONDS", "3600"))
+    BUDGET_DEGRADE_THRESHOLD = float(os.getenv("BUDGET_DEGRADE_THRESHOLD", "0.8"))  # Fraction of a budget that triggers degraded mode
+    DEGRADED_RETRIEVAL_CHUNKS = int(os.getenv("DEGRADED_RETRIEVAL_CHUNKS", "2"))
+    USAGE_FLUSH_EVERY = int(os.getenv("USAGE_FLUSH_EVERY", "20"))  # LLM calls between usage file writes
+    
+    # Startup
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"  # Load heavy services at startup
+    WARMUP_IN_BACKGROUND = os.getenv("WARMUP_IN_BACKGROUND", "true").lower() == "true"  # Serve while warming up
+    
+    # Observability
+    DEBUG_TIMING = os.getenv("DEBUG_TIMING", "false").lower() == "true"  # Add Server-Timing headers to responses
+    
     # Server
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", "8000"))
@@ -52,6 +144,3 @@ class Settings:
         if not cls.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY environment variable is required")
 
-# Initialize directories
-Settings.ensure_directories()
-
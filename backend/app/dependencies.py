@@ -0,0 +1,244 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Optional
+from fastapi import Depends, Request
+from app.config import Settings
+from app.services.embeddings import EmbeddingService
+from app.services.vector_store import VectorStoreService
+from app.services.retriever import RetrieverService
+from app.services.llm_groq import LLMGroqService
+from app.services.usage_service import UsageTracker
+from app.services.context_compressor import ContextCompressor
+from app.services.task_scheduler import TaskScheduler, PriorityGate, JobProgress
+from app.services.rag_service import RAGService
+from app.services.document_service import DocumentService
+from app.services.chat_history_service import ChatHistoryService
+from app.services.chat_session_service import ChatSessionService
+from app.services.cache_service import CacheService
+from app.services.artifact_store import ArtifactStore
+from app.services.admission_control import AdmissionController
+from app.services.index_residency import IndexResidencyManager
+from app.services.snapshot_service import SnapshotService
+from app.services.document_router import DocumentRouter
+from app.services.near_duplicates import NearDuplicateIndex
+
+
+class ServiceContainer:
+    """Owns a single shared instance of every service used by the routers.
+
+    Heavy resources (the embedding model, the Chroma client and the Groq client)
+    are built lazily on first access, so they are loaded once per process and
+    only when something actually needs them. Tests can replace any entry with
+    a lightweight fake through ``override`` before the first request.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._instances: Dict[str, Any] = {}
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return the named instance, building it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                instance = factory()
+                self._instances[name] = instance
+        return instance
+
+    def override(self, name: str, instance: Any):
+        """Replace a service instance (e.g. with a fake in tests)"""
+        with self._lock:
+            self._instances[name] = instance
+
+    def is_loaded(self, name: str) -> bool:
+        """Check whether a service has already been built"""
+        return name in self._instances
+
+    @property
+    def embeddings(self) -> EmbeddingService:
+        return self._get("embeddings", EmbeddingService)
+
+    @property
+    def vector_store(self) -> VectorStoreService:
+        return self._get("vector_store", VectorStoreService)
+
+    @property
+    def residency(self) -> IndexResidencyManager:
+        return self._get("residency", lambda: IndexResidencyManager(self.vector_store))
+
+    @property
+    def document_router(self) -> DocumentRouter:
+        return self._get("document_router", lambda: DocumentRouter(self.vector_store))
+
+    @property
+    def dedup(self) -> Optional[NearDuplicateIndex]:
+        if not Settings.DEDUP_ENABLED:
+            return None
+        return self._get("dedup", NearDuplicateIndex)
+
+    @property
+    def usage(self) -> UsageTracker:
+        return self._get("usage", UsageTracker)
+
+    @property
+    def llm(self) -> LLMGroqService:
+        return self._get("llm", lambda: LLMGroqService(usage=self.usage))
+
+    @property
+    def retriever(self) -> RetrieverService:
+        return self._get("retriever", lambda: RetrieverService(
+            self.vector_store,
+            self.embeddings,
+            residency=self.residency
+        ))
+
+    @property
+    def compressor(self) -> ContextCompressor:
+        return self._get("compressor", lambda: ContextCompressor(self.embeddings))
+
+    @property
+    def priority_gate(self) -> PriorityGate:
+        return self._get("priority_gate", PriorityGate)
+
+    @property
+    def admission(self) -> AdmissionController:
+        return self._get("admission", AdmissionController)
+
+    @property
+    def task_scheduler(self) -> TaskScheduler:
+        return self._get("task_scheduler", lambda: TaskScheduler(self._run_task_job))
+
+    def _run_task_job(self, job: Dict, progress: JobProgress) -> str:
+        """Execute a queued task job on a scheduler worker thread"""
+        return asyncio.run(self.rag_service.run_task(
+            job["task_type"],
+            job["document_id"],
+            job["language"],
+            progress=progress
+        ))
+
+    @property
+    def rag_service(self) -> RAGService:
+        return self._get("rag_service", lambda: RAGService(
+            embeddings=self.embeddings,
+            vector_store=self.vector_store,
+            retriever=self.retriever,
+            llm=self.llm,
+            usage=self.usage,
+            compressor=self.compressor,
+            gate=self.priority_gate,
+            cache=self.cache,
+            artifacts=self.artifacts,
+            router=self.document_router,
+            dedup=self.dedup,
+        ))
+
+    @property
+    def document_service(self) -> DocumentService:
+        return self._get("document_service", lambda: DocumentService(
+            embeddings=self.embeddings,
+            vector_store=self.vector_store,
+            cache=self.cache,
+            chat_session_service=self.chat_session_service,
+            chat_history_service=self.chat_history_service,
+            artifacts=self.artifacts,
+            residency=self.residency,
+            router=self.document_router,
+            dedup=self.dedup,
+            scheduler=self.task_scheduler,
+        ))
+
+    @property
+    def cache(self) -> CacheService:
+        return self._get("cache", CacheService)
+
+    @property
+    def artifacts(self) -> ArtifactStore:
+        return self._get("artifacts", ArtifactStore)
+
+    @property
+    def snapshots(self) -> SnapshotService:
+        return self._get("snapshots", lambda: SnapshotService(
+            self.vector_store,
+            self.artifacts,
+            router=self.document_router,
+            dedup=self.dedup,
+        ))
+
+    @property
+    def chat_history_service(self) -> ChatHistoryService:
+        return self._get("chat_history_service", ChatHistoryService)
+
+    @property
+    def chat_session_service(self) -> ChatSessionService:
+        return self._get("chat_session_service", ChatSessionService)
+
+    def warm_up(self):
+        """Eagerly build the heavy services so the first request does not pay for it"""
+        self.embeddings.embed_query("warm up")
+        self.vector_store
+        if Settings.GROQ_API_KEY:
+            self.llm
+
+    def close(self):
+        """Flush state held by loaded services"""
+        if self.is_loaded("task_scheduler"):
+            self.task_scheduler.shutdown()
+        if self.is_loaded("residency"):
+            self.residency.shutdown()
+        if self.is_loaded("vector_store"):
+            self.vector_store.close()
+        if self.is_loaded("usage"):
+            self.usage.flush()
+
+
+def get_container(request: Request) -> ServiceContainer:
+    """Return the container created by the application lifespan"""
+    return request.app.state.container
+
+
+def get_usage_tracker(container: ServiceContainer = Depends(get_container)) -> UsageTracker:
+    return container.usage
+
+
+def get_llm_service(container: ServiceContainer = Depends(get_container)) -> LLMGroqService:
+    return container.llm
+
+
+def get_priority_gate(container: ServiceContainer = Depends(get_container)) -> PriorityGate:
+    return container.priority_gate
+
+
+def get_task_scheduler(container: ServiceContainer = Depends(get_container)) -> TaskScheduler:
+    return container.task_scheduler
+
+
+def get_index_residency(container: ServiceContainer = Depends(get_container)) -> IndexResidencyManager:
+    return container.residency
+
+
+def get_dedup_index(container: ServiceContainer = Depends(get_container)) -> Optional[NearDuplicateIndex]:
+    return container.dedup
+
+
+def get_vector_store(container: ServiceContainer = Depends(get_container)) -> VectorStoreService:
+    return container.vector_store
+
+
+def get_rag_service(container: ServiceContainer = Depends(get_container)) -> RAGService:
+    return container.rag_service
+
+
+def get_document_service(container: ServiceContainer = Depends(get_container)) -> DocumentService:
+    return container.document_service
+
+
+def get_chat_history_service(container: ServiceContainer = Depends(get_container)) -> ChatHistoryService:
+    return container.chat_history_service
+
+
+def get_chat_session_service(container: ServiceContainer = Depends(get_container)) -> ChatSessionService:
+    return container.chat_session_service
@@ -1,15 +1,64 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import Settings
-from app.routers import documents, chat
+from app.dependencies import ServiceContainer
+from app.routers import documents, chat, metrics, usage, tasks
+from app.services.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_IN_FLIGHT,
+    start_request_timings,
+    stop_request_timings,
+    format_server_timing,
+)
+from app.services.admission_control import AdmissionRejectedError
 
 # Validate settings
 Settings.validate()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared service container for the lifetime of the app"""
+    Settings.ensure_directories()
+    # Chat and upload handlers run their blocking work via asyncio.to_thread; size the pool so the
+    # admission limits, not the CPU-count default, decide how many run at once
+    executor = ThreadPoolExecutor(max_workers=Settings.THREADPOOL_WORKERS, thread_name_prefix="blocking")
+    asyncio.get_running_loop().set_default_executor(executor)
+    container = getattr(app.state, "container", None) or ServiceContainer()
+    app.state.container = container
+    
+    if Settings.SNAPSHOT_BOOTSTRAP_DIR:
+        # Replicas start from exported bundles instead of re-ingesting every PDF
+        await asyncio.to_thread(
+            container.snapshots.import_,
+            Settings.SNAPSHOT_BOOTSTRAP_DIR,
+            verify=Settings.SNAPSHOT_VERIFY
+        )
+    
+    warmup_task = None
+    if Settings.WARMUP_ON_STARTUP:
+        if Settings.WARMUP_IN_BACKGROUND:
+            # Requests arriving mid warm-up block on the container lock instead of loading twice
+            warmup_task = asyncio.create_task(asyncio.to_thread(container.warm_up))
+        else:
+            container.warm_up()
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    container.close()
+    executor.shutdown(wait=False)
+
+
 app = FastAPI(
     title="Smart Learning Support Chatbot API",
     description="API for Smart Learning Support Chatbot with RAG capabilities",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -21,9 +70,87 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+class AdmissionControlMiddleware:
+    """Queue or shed chat and upload requests beyond their concurrency limits.
+    
+    A plain ASGI middleware, so the slot is held until the whole response, streamed
+    batch answers included, has been sent, and is released however the request
+    ends: finished, failed, cancelled, or abandoned by a client that disconnected.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Settings.ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        admission = request.app.state.container.admission
+        route_name = admission.classify(request.method, request.url.path)
+        if route_name is None:
+            await self.app(scope, receive, send)
+            return
+        
+        # Fairness is per chat session; clients that don't send one are keyed by address
+        session_key = request.headers.get("X-Session-Id") or (request.client.host if request.client else "anonymous")
+        try:
+            ticket = await admission.acquire(route_name, session_key)
+        except AdmissionRejectedError as e:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": f"Server busy ({e.reason}), retry later"},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(ticket)
+
+
+app.add_middleware(AdmissionControlMiddleware)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record request latency and, when DEBUG_TIMING is on, per-stage Server-Timing headers"""
+    route = request.url.path
+    timings, token = start_request_timings()
+    HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        HTTP_IN_FLIGHT.dec()
+        stop_request_timings(token)
+        # Use the route template so path parameters don't explode label cardinality
+        matched = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            elapsed,
+            method=request.method,
+            route=getattr(matched, "path", route),
+            status=str(status)
+        )
+    
+    if Settings.DEBUG_TIMING:
+        timings["total"] = elapsed
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
+
+
 # Include routers
 app.include_router(documents.router)
 app.include_router(chat.router)
+app.include_router(metrics.router)
+app.include_router(usage.router)
+app.include_router(tasks.router)
 
 
 @app.get("/")
@@ -9,6 +9,13 @@ class QueryRequest(BaseModel):
     language: Optional[str] = "en"
 
 
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    session_id: str
+    document_ids: List[str]
+    language: Optional[str] = "en"
+
+
 class TaskRequest(BaseModel):
     document_id: str
     task_type: str  # "summarize", "study_notes", "faq", "podcast"
@@ -1,16 +1,26 @@
-from fastapi import APIRouter, HTTPException, Body
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Body, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.models.request import QueryRequest
+from app.models.request import QueryRequest, BatchQueryRequest
+from app.config import Settings
 from app.services.rag_service import RAGService
 from app.services.chat_history_service import ChatHistoryService
 from app.services.chat_session_service import ChatSessionService
+from app.services.usage_service import BudgetExceededError, usage_context
+from app.services.task_scheduler import PriorityGate
+from app.services.index_residency import IndexResidencyManager
+from app.dependencies import (
+    get_rag_service,
+    get_chat_history_service,
+    get_chat_session_service,
+    get_priority_gate,
+    get_index_residency,
+)
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
-rag_service = RAGService()
-chat_history_service = ChatHistoryService()
-chat_session_service = ChatSessionService()
-
 
 class AddDocumentRequest(BaseModel):
     document_id: str
@@ -18,7 +28,7 @@ class AddDocumentRequest(BaseModel):
 
 
 @router.post("/session")
-async def create_session():
+async def create_session(chat_session_service: ChatSessionService = Depends(get_chat_session_service)):
     """Create a new chat session"""
     try:
         session_id = chat_session_service.create_session()
@@ -31,12 +41,18 @@ async def create_session():
 
 
 @router.get("/session/{session_id}")
-async def get_session(session_id: str):
+async def get_session(
+    session_id: str,
+    chat_session_service: ChatSessionService = Depends(get_chat_session_service),
+    residency: IndexResidencyManager = Depends(get_index_residency)
+):
     """Get a chat session"""
     try:
         session = chat_session_service.get_session(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
+        # Reopening a session means questions about its documents are coming
+        residency.prefetch(document["document_id"] for document in session.get("documents", []))
         return {
             "success": True,
             "session": session
@@ -48,10 +64,16 @@ async def get_session(session_id: str):
 
 
 @router.post("/session/{session_id}/documents")
-async def add_document_to_session(session_id: str, request: AddDocumentRequest):
+async def add_document_to_session(
+    session_id: str,
+    request: AddDocumentRequest,
+    chat_session_service: ChatSessionService = Depends(get_chat_session_service),
+    residency: IndexResidencyManager = Depends(get_index_residency)
+):
     """Add a document to a session"""
     try:
         chat_session_service.add_document_to_session(session_id, request.document_id, request.document_name)
+        residency.prefetch([request.document_id])
         return {
             "success": True,
             "message": "Document added to session"
@@ -63,7 +85,7 @@ async def add_document_to_session(session_id: str, request: AddDocumentRequest):
 
 
 @router.get("/sessions")
-async def list_sessions():
+async def list_sessions(chat_session_service: ChatSessionService = Depends(get_chat_session_service)):
     """List all chat sessions"""
     try:
         sessions = chat_session_service.list_all_sessions()
@@ -76,14 +98,20 @@ async def list_sessions():
 
 
 @router.post("/query")
-async def query_document(request: QueryRequest):
+async def query_document(
+    request: QueryRequest,
+    rag_service: RAGService = Depends(get_rag_service),
+    chat_history_service: ChatHistoryService = Depends(get_chat_history_service),
+    priority_gate: PriorityGate = Depends(get_priority_gate)
+):
     """Answer questions based on the uploaded documents"""
     try:
         if not request.document_ids:
             raise HTTPException(status_code=400, detail="At least one document ID is required")
         
         # Save user message to history
-        chat_history_service.save_message(
+        await asyncio.to_thread(
+            chat_history_service.save_message,
             session_id=request.session_id,
             role="user",
             content=request.query,
@@ -91,14 +119,16 @@ async def query_document(request: QueryRequest):
         )
         
         # Get response from all documents
-        response = await rag_service.answer_question(
-            query=request.query,
-            document_ids=request.document_ids,
-            language=request.language
-        )
+        with priority_gate.interactive(), usage_context(session_id=request.session_id):
+            response = await rag_service.answer_question(
+                query=request.query,
+                document_ids=request.document_ids,
+                language=request.language
+            )
         
         # Save assistant response to history
-        chat_history_service.save_message(
+        await asyncio.to_thread(
+            chat_history_service.save_message,
             session_id=request.session_id,
             role="assistant",
             content=response,
@@ -111,12 +141,80 @@ async def query_document(request: QueryRequest):
         }
     except HTTPException:
         raise
+    except BudgetExceededError as e:
+        if not e.retry_after:
+            # Larger than the budget itself: retrying cannot help
+            raise HTTPException(status_code=413, detail=f"Request too large for the token budget: {e.reason}")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Token budget exceeded: {e.reason}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
 
+@router.post("/query/batch")
+async def query_documents_batch(
+    request: BatchQueryRequest,
+    rag_service: RAGService = Depends(get_rag_service),
+    chat_history_service: ChatHistoryService = Depends(get_chat_history_service),
+    priority_gate: PriorityGate = Depends(get_priority_gate)
+):
+    """Answer many questions at once, streaming one NDJSON line per answer as it finishes"""
+    if not request.document_ids:
+        raise HTTPException(status_code=400, detail="At least one document ID is required")
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    if len(request.queries) > Settings.MAX_BATCH_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {Settings.MAX_BATCH_QUESTIONS} queries are allowed per batch"
+        )
+    
+    async def stream_answers():
+        answers = [None] * len(request.queries)
+        failed = 0
+        try:
+            # Background jobs yield to batch answers as they do to single queries
+            with priority_gate.interactive():
+                async for index, answer, error in rag_service.answer_questions_batch(
+                    queries=request.queries,
+                    document_ids=request.document_ids,
+                    language=request.language,
+                    session_id=request.session_id
+                ):
+                    answers[index] = answer
+                    if error:
+                        failed += 1
+                        line = {"index": index, "query": request.queries[index], "success": False, "error": error}
+                    else:
+                        line = {"index": index, "query": request.queries[index], "success": True, "response": answer}
+                    yield json.dumps(line, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"done": True, "success": False, "error": f"Error processing batch: {str(e)}"}) + "\n"
+            return
+        
+        # One history write for the whole batch, in question order
+        messages = []
+        for query, answer in zip(request.queries, answers):
+            messages.append(("user", query))
+            if answer is not None:
+                messages.append(("assistant", answer))
+        await asyncio.to_thread(chat_history_service.save_messages, request.session_id, messages, request.document_ids)
+        
+        yield json.dumps({
+            "done": True,
+            "success": True,
+            "answered": len(request.queries) - failed,
+            "failed": failed
+        }) + "\n"
+    
+    return StreamingResponse(stream_answers(), media_type="application/x-ndjson")
+
+
 @router.get("/history/{session_id}")
-async def get_chat_history(session_id: str):
+async def get_chat_history(session_id: str, chat_history_service: ChatHistoryService = Depends(get_chat_history_service)):
     """Get chat history for a session"""
     try:
         history = chat_history_service.get_history(session_id)
@@ -129,7 +227,7 @@ async def get_chat_history(session_id: str):
 
 
 @router.get("/histories")
-async def list_histories():
+async def list_histories(chat_history_service: ChatHistoryService = Depends(get_chat_history_service)):
     """List all chat histories"""
     try:
         histories = chat_history_service.list_all_histories()
@@ -142,7 +240,7 @@ async def list_histories():
 
 
 @router.delete("/history/{session_id}")
-async def clear_chat_history(session_id: str):
+async def clear_chat_history(session_id: str, chat_history_service: ChatHistoryService = Depends(get_chat_history_service)):
     """Clear chat history for a session"""
     try:
         chat_history_service.clear_history(session_id)
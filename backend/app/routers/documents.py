@@ -1,13 +1,20 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
 from app.services.document_service import DocumentService
+from app.services.index_residency import IndexResidencyManager
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.vector_store import VectorStoreService
+from app.dependencies import get_dedup_index, get_document_service, get_index_residency, get_vector_store
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
-document_service = DocumentService()
-
 
 @router.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    file: UploadFile = File(...),
+    document_service: DocumentService = Depends(get_document_service)
+):
     """Upload and process a PDF document"""
     if not file.filename or not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
@@ -23,8 +30,78 @@ async def upload_document(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
 
 
+@router.get("/residency")
+async def get_index_residency_stats(residency: IndexResidencyManager = Depends(get_index_residency)):
+    """Loaded document indexes with hit/miss and load-time statistics"""
+    try:
+        return {
+            "success": True,
+            "residency": residency.stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting residency stats: {str(e)}")
+
+
+@router.get("/dedup")
+async def get_dedup_stats(dedup: Optional[NearDuplicateIndex] = Depends(get_dedup_index)):
+    """Size of the near-duplicate index, or enabled: false when deduplication is off"""
+    try:
+        return {
+            "success": True,
+            "enabled": dedup is not None,
+            # Loads the stored signatures on first use
+            "dedup": await asyncio.to_thread(dedup.stats) if dedup else None
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting dedup stats: {str(e)}")
+
+
+@router.get("/shards")
+async def get_shard_stats(vector_store: VectorStoreService = Depends(get_vector_store)):
+    """Vector store shards with their document counts and the rebalancer's progress"""
+    try:
+        return {
+            "success": True,
+            **await asyncio.to_thread(vector_store.shard_stats)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting shard stats: {str(e)}")
+
+
+@router.post("/shards/rebalance")
+async def rebalance_shards(vector_store: VectorStoreService = Depends(get_vector_store)):
+    """Move every document to the shard that owns it now, and report how many moved"""
+    try:
+        if not vector_store.sharded:
+            raise HTTPException(status_code=400, detail="Sharding is not enabled")
+        return {
+            "success": True,
+            **await asyncio.to_thread(vector_store.rebalancer.rebalance)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rebalancing shards: {str(e)}")
+
+
+@router.delete("/{document_id}")
+async def delete_document(document_id: str, document_service: DocumentService = Depends(get_document_service)):
+    """Delete a document with its vectors, PDF file, cached outputs and session references"""
+    try:
+        result = await document_service.delete_document(document_id)
+        return {
+            "success": True,
+            "document_id": document_id,
+            **result
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
+
+
 @router.get("/")
-async def list_documents():
+async def list_documents(document_service: DocumentService = Depends(get_document_service)):
     """List all uploaded documents"""
     try:
         documents = await document_service.list_documents()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from app.models.request import TaskRequest
+from app.services.task_scheduler import TaskScheduler, TERMINAL_STATUSES
+from app.services.vector_store import VectorStoreService
+from app.dependencies import get_task_scheduler, get_vector_store
+
+router = APIRouter(prefix="/api/tasks", tags=["tasks"])
+
+TASK_TYPES = ("summarize", "study_notes", "faq", "podcast")
+
+
+@router.post("/")
+async def create_task(
+    request: TaskRequest,
+    scheduler: TaskScheduler = Depends(get_task_scheduler),
+    vector_store: VectorStoreService = Depends(get_vector_store)
+):
+    """Queue a summarize / study_notes / faq / podcast job for a document"""
+    if request.task_type not in TASK_TYPES:
+        raise HTTPException(status_code=400, detail=f"Task type must be one of: {', '.join(TASK_TYPES)}")
+    
+    try:
+        if not await asyncio.to_thread(vector_store.has_document, request.document_id):
+            raise HTTPException(status_code=404, detail="Document not found")
+        priority = int((request.additional_params or {}).get("priority", 5))
+        job, deduplicated = scheduler.submit(
+            document_id=request.document_id,
+            task_type=request.task_type,
+            language=request.language,
+            priority=priority
+        )
+        return {
+            "success": True,
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "deduplicated": deduplicated
+        }
+    except HTTPException:
+        raise
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Priority must be an integer")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating task: {str(e)}")
+
+
+@router.get("/")
+async def list_tasks(document_id: Optional[str] = None, scheduler: TaskScheduler = Depends(get_task_scheduler)):
+    """List task jobs, optionally for one document"""
+    try:
+        return {
+            "success": True,
+            "jobs": scheduler.list_jobs(document_id)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing tasks: {str(e)}")
+
+
+@router.get("/{job_id}")
+async def get_task(job_id: str, scheduler: TaskScheduler = Depends(get_task_scheduler)):
+    """Get a task job's status, progress and result"""
+    job = scheduler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {
+        "success": True,
+        "job": job
+    }
+
+
+@router.get("/{job_id}/events")
+async def stream_task_events(job_id: str, scheduler: TaskScheduler = Depends(get_task_scheduler)):
+    """Stream job progress as server-sent events until the job finishes"""
+    if not scheduler.get(job_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    async def events():
+        last_update = None
+        while True:
+            job = scheduler.get(job_id)
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.delete("/{job_id}")
+async def cancel_task(job_id: str, scheduler: TaskScheduler = Depends(get_task_scheduler)):
+    """Cancel a queued or running task job"""
+    job = scheduler.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if job["status"] == "running":
+        message = "Cancellation requested; the task stops at its next stage"
+    elif job["status"] == "cancelled":
+        message = "Task cancelled"
+    else:
+        message = "Task already finished"
+    return {
+        "success": True,
+        "status": job["status"],
+        "message": message
+    }
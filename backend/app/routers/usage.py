@@ -0,0 +1,35 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends
+from app.services.llm_groq import LLMGroqService
+from app.services.usage_service import UsageTracker
+from app.dependencies import get_llm_service, get_usage_tracker
+
+router = APIRouter(prefix="/api/usage", tags=["usage"])
+
+SCOPES = ("global", "session", "document", "task")
+
+
+@router.get("/")
+async def get_usage(scope: Optional[str] = None, usage: UsageTracker = Depends(get_usage_tracker)):
+    """Get LLM token usage aggregated by session, document and task type"""
+    if scope and scope not in SCOPES:
+        raise HTTPException(status_code=400, detail=f"Scope must be one of: {', '.join(SCOPES)}")
+    try:
+        return {
+            "success": True,
+            "usage": usage.summary(scope)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting usage: {str(e)}")
+
+
+@router.get("/routes")
+async def get_llm_routes(llm: LLMGroqService = Depends(get_llm_service)):
+    """Get latency, hedging threshold and cooldown state of each LLM route"""
+    try:
+        return {
+            "success": True,
+            "routes": llm.route_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting route stats: {str(e)}")
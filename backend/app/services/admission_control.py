@@ -0,0 +1,238 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional
+from app.config import Settings
+from app.services.metrics import metrics
+
+ADMISSION_QUEUE_DEPTH = metrics.gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot",
+    ["route"]
+)
+ADMISSION_IN_FLIGHT = metrics.gauge(
+    "admission_in_flight",
+    "Admitted requests currently being served",
+    ["route"]
+)
+ADMISSION_REJECTIONS = metrics.counter(
+    "admission_rejections_total",
+    "Requests shed by admission control",
+    ["route", "reason"]
+)
+ADMISSION_WAIT = metrics.histogram(
+    "admission_wait_seconds",
+    "Time admitted requests spent queued",
+    ["route"]
+)
+
+# Rejection reasons
+QUEUE_FULL = "queue_full"
+SESSION_LIMIT = "session_limit"
+DEADLINE = "deadline"
+TIMEOUT = "timeout"
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class RouteClass:
+    """Admission settings and live state for one group of endpoints"""
+    name: str
+    limit: int
+    queue_size: int
+    timeout: float
+    priority: int  # lower is served first
+    service_time: float  # initial guess, then a moving average of observed service times
+    in_flight: int = 0
+    queued: int = 0
+    # session -> waiting futures; sessions are served round-robin
+    waiting: "OrderedDict[str, Deque[asyncio.Future]]" = field(default_factory=OrderedDict)
+
+
+@dataclass
+class AdmissionTicket:
+    route: str
+    admitted_at: float
+
+
+class AdmissionController:
+    """Per-route concurrency limits with bounded, fair, deadline-aware queues.
+
+    Requests beyond a route's concurrency limit wait in a queue. Within a
+    route, waiting sessions are served round-robin so one client cannot starve
+    the others; across routes, freed slots go to the highest-priority route
+    first (chat before uploads). A request is rejected up front when the queue
+    is full or its estimated wait exceeds the route's deadline, and again if it
+    is still queued when the deadline passes. Runs on the event loop; no locks.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, RouteClass]] = None, max_concurrent: Optional[int] = None):
+        self.routes = routes or {
+            "chat": RouteClass(
+                "chat",
+                limit=Settings.CHAT_MAX_CONCURRENT,
+                queue_size=Settings.CHAT_QUEUE_SIZE,
+                timeout=Settings.CHAT_QUEUE_TIMEOUT,
+                priority=0,
+                service_time=2.0,
+            ),
+            "upload": RouteClass(
+                "upload",
+                limit=Settings.UPLOAD_MAX_CONCURRENT,
+                queue_size=Settings.UPLOAD_QUEUE_SIZE,
+                timeout=Settings.UPLOAD_QUEUE_TIMEOUT,
+                priority=1,
+                service_time=10.0,
+            ),
+        }
+        self.max_concurrent = max_concurrent or Settings.ADMISSION_MAX_CONCURRENT
+        self.max_queued_per_session = Settings.ADMISSION_MAX_QUEUED_PER_SESSION
+        self._in_flight = 0
+
+    @staticmethod
+    def classify(method: str, path: str) -> Optional[str]:
+        """Map a request to its admission route, or None if it is not controlled"""
+        if method != "POST":
+            return None
+        if path.rstrip("/") in ("/api/chat/query", "/api/chat/query/batch"):
+            return "chat"
+        if path.rstrip("/") == "/api/documents/upload":
+            return "upload"
+        return None
+
+    def _has_capacity(self, route: RouteClass) -> bool:
+        return route.in_flight < route.limit and self._in_flight < self.max_concurrent
+
+    def _may_admit(self, route: RouteClass) -> bool:
+        """A slot is free and no higher-priority route is waiting for the shared pool"""
+        if not self._has_capacity(route):
+            return False
+        return not any(
+            other.queued and other.in_flight < other.limit
+            for other in self.routes.values()
+            if other.priority < route.priority
+        )
+
+    def _ahead_of(self, route: RouteClass) -> int:
+        """Queued requests that will be served before a new arrival on this route"""
+        return sum(other.queued for other in self.routes.values() if other.priority <= route.priority)
+
+    def estimated_wait(self, route: RouteClass) -> float:
+        """Seconds a new arrival is expected to queue, from the moving average service time"""
+        if not route.queued and self._may_admit(route):
+            return 0.0
+        parallelism = max(1, min(route.limit, self.max_concurrent))
+        return (self._ahead_of(route) + 1) * route.service_time / parallelism
+
+    def _admit(self, route: RouteClass) -> AdmissionTicket:
+        route.in_flight += 1
+        self._in_flight += 1
+        ADMISSION_IN_FLIGHT.set(route.in_flight, route=route.name)
+        return AdmissionTicket(route.name, time.monotonic())
+
+    def _reject(self, route: RouteClass, reason: str, retry_after: float):
+        ADMISSION_REJECTIONS.inc(route=route.name, reason=reason)
+        raise AdmissionRejectedError(reason, max(1, math.ceil(retry_after)))
+
+    async def acquire(self, route_name: str, session_key: str) -> AdmissionTicket:
+        """Wait for a slot on a route, or raise AdmissionRejectedError"""
+        route = self.routes[route_name]
+        if not route.queued and self._may_admit(route):
+            ADMISSION_WAIT.observe(0.0, route=route.name)
+            return self._admit(route)
+
+        if route.queued >= route.queue_size:
+            self._reject(route, QUEUE_FULL, self.estimated_wait(route))
+        waiting = route.waiting.get(session_key)
+        if waiting is not None and sum(not f.done() for f in waiting) >= self.max_queued_per_session:
+            self._reject(route, SESSION_LIMIT, self.estimated_wait(route))
+        estimate = self.estimated_wait(route)
+        if estimate > route.timeout:
+            self._reject(route, DEADLINE, estimate)
+
+        future = asyncio.get_running_loop().create_future()
+        route.waiting.setdefault(session_key, deque()).append(future)
+        route.queued += 1
+        ADMISSION_QUEUE_DEPTH.set(route.queued, route=route.name)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait({future}, timeout=route.timeout)
+        except asyncio.CancelledError:
+            # The client went away while queued
+            if future.done():
+                self.release(future.result())
+            else:
+                self._withdraw(route, session_key, future)
+            raise
+
+        if not future.done():
+            self._withdraw(route, session_key, future)
+            self._reject(route, TIMEOUT, route.service_time)
+        ADMISSION_WAIT.observe(time.monotonic() - queued_at, route=route.name)
+        return future.result()
+
+    def _withdraw(self, route: RouteClass, session_key: str, future: asyncio.Future):
+        """Drop a waiter that gave up from the queue"""
+        future.cancel()
+        waiting = route.waiting.get(session_key)
+        if waiting is not None:
+            waiting.remove(future)
+            if not waiting:
+                del route.waiting[session_key]
+        route.queued -= 1
+        ADMISSION_QUEUE_DEPTH.set(route.queued, route=route.name)
+
+    def release(self, ticket: AdmissionTicket):
+        """Free a slot and hand it to the next waiter"""
+        route = self.routes[ticket.route]
+        route.in_flight -= 1
+        self._in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(route.in_flight, route=route.name)
+        elapsed = time.monotonic() - ticket.admitted_at
+        route.service_time = 0.8 * route.service_time + 0.2 * elapsed
+        self._dispatch()
+
+    def _next_waiter(self, route: RouteClass) -> Optional[asyncio.Future]:
+        """Pop the next live waiter, rotating between sessions"""
+        while route.waiting:
+            session_key, waiting = next(iter(route.waiting.items()))
+            future = waiting.popleft()
+            if waiting:
+                route.waiting.move_to_end(session_key)
+            else:
+                del route.waiting[session_key]
+            if not future.done():
+                return future
+        return None
+
+    def _dispatch(self):
+        for route in sorted(self.routes.values(), key=lambda r: r.priority):
+            while route.queued and self._may_admit(route):
+                future = self._next_waiter(route)
+                if future is None:
+                    break
+                route.queued -= 1
+                ADMISSION_QUEUE_DEPTH.set(route.queued, route=route.name)
+                future.set_result(self._admit(route))
+
+    def stats(self) -> Dict:
+        return {
+            name: {
+                "in_flight": route.in_flight,
+                "queued": route.queued,
+                "limit": route.limit,
+                "avg_service_seconds": round(route.service_time, 3),
+                "estimated_wait_seconds": round(self.estimated_wait(route), 3),
+            }
+            for name, route in self.routes.items()
+        }
@@ -0,0 +1,110 @@
+import gzip
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.config import Settings
+from app.services.text_splitter import FINE, TextChunk
+
+ARTIFACT_VERSION = 2
+
+
+def file_sha256(file_path: Path) -> str:
+    """Hash a file in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Stores per-document ingestion artifacts so documents can be re-indexed without re-parsing.
+
+    One gzipped JSON file per document holds the page texts with their offsets
+    into the joined document text, the fine and coarse chunk layers as
+    ``[start, end, page, page_end]`` rows (chunk text is not duplicated), and the
+    inputs each stage was produced with: the PDF hash, the splitter settings and
+    the embedding model id.
+    """
+
+    def __init__(self):
+        self.artifacts_dir = Settings.VECTOR_STORE_DIR.parent / "artifacts"
+        self.artifacts_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_artifact_file(self, document_id: str) -> Path:
+        return self.artifacts_dir / f"{document_id}.json.gz"
+
+    @staticmethod
+    def build(
+        document_id: str,
+        filename: str,
+        source_sha256: str,
+        pages: List[str],
+        layers: Dict[str, List[TextChunk]],
+        split_settings: Dict,
+        embedding_model: str
+    ) -> Dict:
+        """Assemble an artifact from the output of each ingestion stage"""
+        page_offsets = []
+        offset = 0
+        for page in pages:
+            page_offsets.append(offset)
+            offset += len(page) + 1  # pages are joined with one newline each
+        return {
+            "version": ARTIFACT_VERSION,
+            "document_id": document_id,
+            "filename": filename,
+            "parse": {"source_sha256": source_sha256, "pages": pages, "page_offsets": page_offsets},
+            "split": {
+                "settings": split_settings,
+                "layers": {
+                    name: [[chunk.start, chunk.end, chunk.page, chunk.page_end] for chunk in chunks]
+                    for name, chunks in layers.items()
+                },
+            },
+            "embed": {"model": embedding_model},
+            "updated_at": datetime.now().isoformat(),
+        }
+
+    def save(self, artifact: Dict):
+        artifact_file = self.get_artifact_file(artifact["document_id"])
+        tmp_file = artifact_file.with_suffix(".tmp")
+        with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+            json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+        tmp_file.replace(artifact_file)
+
+    def load(self, document_id: str) -> Optional[Dict]:
+        artifact_file = self.get_artifact_file(document_id)
+        if not artifact_file.exists():
+            return None
+        try:
+            with gzip.open(artifact_file, 'rt', encoding='utf-8') as f:
+                artifact = json.load(f)
+        except Exception:
+            return None
+        if artifact.get("version") == 1:
+            # Single-layer chunk spans: keep the parsed text, re-split on the next re-index
+            artifact["version"] = ARTIFACT_VERSION
+            artifact["split"] = {}
+        return artifact if artifact.get("version") == ARTIFACT_VERSION else None
+
+    def delete(self, document_id: str) -> bool:
+        artifact_file = self.get_artifact_file(document_id)
+        if not artifact_file.exists():
+            return False
+        artifact_file.unlink()
+        return True
+
+    def list_document_ids(self) -> List[str]:
+        return sorted(f.name[:-len(".json.gz")] for f in self.artifacts_dir.glob("*.json.gz"))
+
+    @staticmethod
+    def chunks(artifact: Dict, layer: str = FINE) -> List[TextChunk]:
+        """Rebuild one chunk layer from the stored page text"""
+        text = "".join(page + "\n" for page in artifact["parse"]["pages"])
+        return [
+            TextChunk(text[start:end], start, end, page, page_end)
+            for start, end, page, page_end in artifact.get("split", {}).get("layers", {}).get(layer, [])
+        ]
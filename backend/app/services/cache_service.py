@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Optional
 from datetime import datetime, timedelta
 from app.config import Settings
+from app.services.metrics import record_cache_lookup
 
 
 class CacheService:
@@ -29,6 +30,7 @@ class CacheService:
         cache_file = self._get_cache_file(cache_key)
         
         if not cache_file.exists():
+            record_cache_lookup("generated_content", hit=False)
             return None
         
         try:
@@ -39,10 +41,13 @@ class CacheService:
             cached_at = datetime.fromisoformat(cache_data.get('cached_at', ''))
             if datetime.now() - cached_at > self.default_ttl:
                 cache_file.unlink()  # Delete expired cache
+                record_cache_lookup("generated_content", hit=False)
                 return None
             
+            record_cache_lookup("generated_content", hit=True)
             return cache_data.get('content')
         except Exception:
+            record_cache_lookup("generated_content", hit=False)
             return None
     
     def set(self, document_id: str, task_type: str, language: str, content: str):
@@ -61,14 +66,17 @@ class CacheService:
         with open(cache_file, 'w', encoding='utf-8') as f:
             json.dump(cache_data, f, ensure_ascii=False, indent=2)
     
-    def clear(self, document_id: str):
+    def clear(self, document_id: str) -> int:
         """Clear all cache for a document"""
+        removed = 0
         for cache_file in self.cache_dir.glob("*.json"):
             try:
                 with open(cache_file, 'r', encoding='utf-8') as f:
                     cache_data = json.load(f)
-                    if cache_data.get('document_id') == document_id:
-                        cache_file.unlink()
+                if cache_data.get('document_id') == document_id:
+                    cache_file.unlink()
+                    removed += 1
             except Exception:
                 continue
+        return removed
 
@@ -1,8 +1,10 @@
 import json
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from app.config import Settings
+from app.services.metrics import track_stage
 
 
 class ChatHistoryService:
@@ -11,6 +13,8 @@ class ChatHistoryService:
     def __init__(self):
         self.history_dir = Settings.VECTOR_STORE_DIR.parent / "chat_history"
         self.history_dir.mkdir(parents=True, exist_ok=True)
+        # Handlers write from worker threads; each write is a read-modify-write of the whole file
+        self._lock = threading.Lock()
     
     def _get_history_file(self, session_id: str) -> Path:
         """Get history file path for a session"""
@@ -18,44 +22,51 @@ class ChatHistoryService:
     
     def save_message(self, session_id: str, role: str, content: str, document_ids: List[str] = None):
         """Save a chat message to history (by session_id now)"""
+        self.save_messages(session_id, [(role, content)], document_ids)
+    
+    def save_messages(self, session_id: str, messages: List[Tuple[str, str]], document_ids: List[str] = None):
+        """Append several (role, content) messages to history with a single file write"""
         history_file = self._get_history_file(session_id)
         
-        # Load existing history
-        if history_file.exists():
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-        else:
-            history = {
-                "session_id": session_id,
-                "document_ids": document_ids or [],
-                "messages": [],
-                "created_at": datetime.now().isoformat(),
-            }
-        
-        # Add new message
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        }
-        history["messages"].append(message)
-        history["updated_at"] = datetime.now().isoformat()
-        if document_ids:
-            history["document_ids"] = document_ids
-        
-        # Save history
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            # Load existing history
+            if history_file.exists():
+                with open(history_file, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            else:
+                history = {
+                    "session_id": session_id,
+                    "document_ids": document_ids or [],
+                    "messages": [],
+                    "created_at": datetime.now().isoformat(),
+                }
+            
+            # Add new messages
+            for role, content in messages:
+                history["messages"].append({
+                    "role": role,
+                    "content": content,
+                    "timestamp": datetime.now().isoformat()
+                })
+            history["updated_at"] = datetime.now().isoformat()
+            if document_ids:
+                history["document_ids"] = document_ids
+            
+            # Save history
+            with track_stage("history_write"):
+                with open(history_file, 'w', encoding='utf-8') as f:
+                    json.dump(history, f, ensure_ascii=False, indent=2)
     
     def get_history(self, session_id: str) -> List[Dict]:
         """Get chat history for a session"""
         history_file = self._get_history_file(session_id)
         
-        if not history_file.exists():
-            return []
-        
-        with open(history_file, 'r', encoding='utf-8') as f:
-            history = json.load(f)
+        with self._lock:
+            if not history_file.exists():
+                return []
+            
+            with open(history_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
         
         return history.get("messages", [])
     
@@ -65,6 +76,24 @@ class ChatHistoryService:
         if history_file.exists():
             history_file.unlink()
     
+    def remove_document_references(self, document_id: str) -> int:
+        """Drop a document from the document_ids of every history"""
+        updated = 0
+        with self._lock:
+            for history_file in self.history_dir.glob("*.json"):
+                with open(history_file, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+                
+                document_ids = history.get("document_ids", [])
+                if document_id not in document_ids:
+                    continue
+                
+                history["document_ids"] = [doc_id for doc_id in document_ids if doc_id != document_id]
+                with open(history_file, 'w', encoding='utf-8') as f:
+                    json.dump(history, f, ensure_ascii=False, indent=2)
+                updated += 1
+        return updated
+    
     def list_all_histories(self) -> List[Dict]:
         """List all chat histories"""
         histories = []
@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime
 from app.config import Settings
+from app.services.metrics import track_stage
 
 
 class ChatSessionService:
@@ -62,8 +63,29 @@ class ChatSessionService:
             session['updated_at'] = datetime.now().isoformat()
             
             session_file = self._get_session_file(session_id)
+            with track_stage("session_write"):
+                with open(session_file, 'w', encoding='utf-8') as f:
+                    json.dump(session, f, ensure_ascii=False, indent=2)
+    
+    def remove_document_from_sessions(self, document_id: str) -> int:
+        """Remove a document from every session that references it"""
+        updated = 0
+        for session_file in self.sessions_dir.glob("*.json"):
+            with open(session_file, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+            
+            documents = [doc for doc in session.get('documents', []) if doc.get('document_id') != document_id]
+            document_ids = [doc_id for doc_id in session.get('document_ids', []) if doc_id != document_id]
+            if len(documents) == len(session.get('documents', [])) and len(document_ids) == len(session.get('document_ids', [])):
+                continue
+            
+            session['documents'] = documents
+            session['document_ids'] = document_ids
+            session['updated_at'] = datetime.now().isoformat()
             with open(session_file, 'w', encoding='utf-8') as f:
                 json.dump(session, f, ensure_ascii=False, indent=2)
+            updated += 1
+        return updated
     
     def list_all_sessions(self) -> List[Dict]:
         """List all chat sessions"""
@@ -0,0 +1,141 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from app.config import Settings
+from app.services.embeddings import EmbeddingService
+from app.services.metrics import metrics, track_stage
+from app.services.usage_service import estimate_tokens
+
+COMPRESSION_RATIO = metrics.histogram(
+    "context_compression_ratio",
+    "Fraction of context tokens kept after compression, per prompt",
+    ["task"],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+COMPRESSION_TOKENS_SAVED = metrics.counter(
+    "context_compression_tokens_saved_total",
+    "Estimated prompt tokens removed by context compression",
+    ["task"]
+)
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+
+class ContextCompressor:
+    """Keeps only the sentences of retrieved chunks that matter for the prompt.
+
+    Sentences are scored by cosine similarity to the query embedding (or, for
+    query-less tasks, to the centroid of all candidate sentences) in one matrix
+    product. The best sentences are kept up to a token budget and emitted in
+    their original order. Sentence embeddings are cached, since the same chunks
+    are retrieved again and again.
+    """
+
+    def __init__(self, embeddings: EmbeddingService, cache_size: Optional[int] = None):
+        self.embeddings = embeddings
+        self.cache_size = cache_size or Settings.SENTENCE_EMBEDDING_CACHE_SIZE
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        """Split a chunk into sentences"""
+        return [s.strip() for s in _SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+    def _embed_sentences(self, sentences: List[str]):
+        """Return an L2-normalised (n, d) matrix, embedding only uncached sentences"""
+        import numpy as np
+
+        vectors = [None] * len(sentences)
+        missing = []
+        with self._lock:
+            for i, sentence in enumerate(sentences):
+                cached = self._cache.get(sentence)
+                if cached is not None:
+                    self._cache.move_to_end(sentence)
+                    vectors[i] = cached
+                else:
+                    missing.append(i)
+
+        if missing:
+            embedded = np.asarray(
+                self.embeddings.embed_documents([sentences[i] for i in missing]),
+                dtype=np.float32
+            )
+            norms = np.linalg.norm(embedded, axis=1, keepdims=True)
+            embedded /= np.where(norms == 0, 1, norms)
+            with self._lock:
+                for row, i in enumerate(missing):
+                    vectors[i] = embedded[row]
+                    self._cache[sentences[i]] = embedded[row]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return np.vstack(vectors)
+
+    def compress(
+        self,
+        chunks: List[str],
+        query: Optional[str] = None,
+        token_budget: Optional[int] = None,
+        task: str = "qa"
+    ) -> str:
+        """Build a context string from the most relevant sentences within the token budget"""
+        import numpy as np
+
+        full_context = "\n\n".join(chunks)
+        original_tokens = estimate_tokens(full_context)
+        token_budget = token_budget or Settings.QA_CONTEXT_TOKEN_BUDGET
+        if original_tokens <= token_budget:
+            COMPRESSION_RATIO.observe(1.0, task=task)
+            return full_context
+
+        with track_stage("context_compress"):
+            # (chunk index, sentence) in original order; overlapping chunks repeat sentences
+            positions = []
+            seen = set()
+            for chunk_index, chunk in enumerate(chunks):
+                for sentence in self.split_sentences(chunk):
+                    if sentence not in seen:
+                        seen.add(sentence)
+                        positions.append((chunk_index, sentence))
+            if not positions:
+                return full_context
+
+            sentences = [sentence for _, sentence in positions]
+            matrix = self._embed_sentences(sentences)
+            if query:
+                target = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+            else:
+                target = matrix.mean(axis=0)
+            target /= np.linalg.norm(target) or 1.0
+            scores = matrix @ target
+
+            kept = np.zeros(len(sentences), dtype=bool)
+            used = 0
+            for index in np.argsort(-scores):
+                cost = estimate_tokens(sentences[index]) + 1
+                if used + cost > token_budget:
+                    continue
+                kept[index] = True
+                used += cost
+            if not kept.any():
+                kept[int(np.argmax(scores))] = True
+
+            # Re-assemble in original order, keeping chunk boundaries as paragraphs
+            paragraphs = []
+            current_chunk = None
+            for (chunk_index, sentence), keep in zip(positions, kept):
+                if not keep:
+                    continue
+                if chunk_index != current_chunk:
+                    paragraphs.append([])
+                    current_chunk = chunk_index
+                paragraphs[-1].append(sentence)
+            context = "\n\n".join(" ".join(paragraph) for paragraph in paragraphs)
+
+        kept_tokens = estimate_tokens(context)
+        COMPRESSION_RATIO.observe(kept_tokens / original_tokens if original_tokens else 1.0, task=task)
+        COMPRESSION_TOKENS_SAVED.inc(max(0, original_tokens - kept_tokens), task=task)
+        return context
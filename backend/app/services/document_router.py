@@ -0,0 +1,174 @@
+import threading
+from typing import Dict, List, Optional, Sequence
+from app.config import Settings
+from app.services.metrics import metrics, track_stage
+from app.services.vector_store import VectorStoreService
+
+ROUTED_DOCUMENTS = metrics.histogram(
+    "routing_searched_documents_ratio",
+    "Fraction of a query's documents that got a chunk-level search after routing",
+    buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0)
+)
+
+
+class DocumentRouter:
+    """First-stage routing of a query to the documents worth a chunk-level search.
+
+    Each document is summarised by a small signature: the normalised centroid of
+    its chunk embeddings plus the centroids of ``ROUTING_SEGMENTS`` contiguous
+    runs of chunks (roughly, its sections). All signatures live in one matrix,
+    so scoring every document against a batch of queries is one matrix product
+    followed by a per-document max. Only the ``top_n`` best documents are then
+    searched chunk by chunk; ``ROUTING_TOP_DOCUMENTS`` trades recall for latency.
+    Queries over fewer than ``ROUTING_MIN_DOCUMENTS`` documents search them all,
+    since an exhaustive search is cheap there and routing only costs recall.
+    Signatures are computed at ingestion and stored as ``routing/<id>.npy``;
+    documents without one (older uploads, imported snapshots) get it on first use.
+    """
+
+    def __init__(self, vector_store: VectorStoreService, segments: Optional[int] = None):
+        self.vector_store = vector_store
+        self.segments = segments or Settings.ROUTING_SEGMENTS
+        self.routing_dir = Settings.VECTOR_STORE_DIR.parent / "routing"
+        self.routing_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._signatures: Dict = {}
+        self._loaded = False
+        self._matrix = None
+        self._starts = None
+        self._positions: Dict[str, int] = {}
+
+    def build_signature(self, embeddings: Sequence[Sequence[float]]):
+        """Centroid plus per-segment centroids of a document's chunk embeddings, L2-normalised"""
+        import numpy as np
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or not len(vectors):
+            return None
+        groups = [vectors] + [group for group in np.array_split(vectors, min(self.segments, len(vectors))) if len(group)]
+        signature = np.vstack([group.mean(axis=0) for group in groups])
+        norms = np.linalg.norm(signature, axis=1, keepdims=True)
+        return signature / np.where(norms == 0, 1, norms)
+
+    def _get_signature_file(self, document_id: str):
+        return self.routing_dir / f"{document_id}.npy"
+
+    def add_document(self, document_id: str, embeddings: Sequence[Sequence[float]]):
+        """Store the routing signature for a newly indexed (or re-indexed) document"""
+        import numpy as np
+
+        signature = self.build_signature(embeddings)
+        if signature is None:
+            return
+        np.save(self._get_signature_file(document_id), signature)
+        with self._lock:
+            self._signatures[document_id] = signature
+            self._matrix = None
+
+    def remove_document(self, document_id: str):
+        self._get_signature_file(document_id).unlink(missing_ok=True)
+        with self._lock:
+            if self._signatures.pop(document_id, None) is not None:
+                self._matrix = None
+
+    def _load(self):
+        """Read stored signatures once"""
+        import numpy as np
+
+        with self._lock:
+            if self._loaded:
+                return
+            for signature_file in self.routing_dir.glob("*.npy"):
+                try:
+                    self._signatures[signature_file.stem] = np.load(signature_file)
+                except Exception:
+                    continue
+            self._loaded = True
+            self._matrix = None
+
+    def _ensure_signatures(self, document_ids: Sequence[str]):
+        """Build signatures for documents indexed before routing existed"""
+        for document_id in document_ids:
+            if document_id in self._signatures:
+                continue
+            try:
+                collection = self.vector_store.get_collection(document_id)
+            except ValueError:
+                continue
+            results = collection.get(include=["embeddings", "metadatas"])
+            if results["embeddings"] is None or not len(results["embeddings"]):
+                continue
+            ordered = sorted(
+                zip(results["metadatas"], results["embeddings"]),
+                key=lambda row: (row[0] or {}).get("chunk_index", 0)
+            )
+            self.add_document(document_id, [embedding for _, embedding in ordered])
+
+    def _rebuild(self):
+        """Stack all signatures into one matrix with the start row of each document"""
+        import numpy as np
+
+        with self._lock:
+            if self._matrix is not None:
+                return
+            document_ids = list(self._signatures)
+            if not document_ids:
+                return
+            sizes = [len(self._signatures[document_id]) for document_id in document_ids]
+            self._matrix = np.vstack([self._signatures[document_id] for document_id in document_ids])
+            self._starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+            self._positions = {document_id: i for i, document_id in enumerate(document_ids)}
+
+    def route(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        document_ids: Sequence[str],
+        top_n: Optional[int] = None
+    ) -> List[List[str]]:
+        """Return, per query, the documents to search, best first"""
+        import numpy as np
+
+        top_n = top_n or Settings.ROUTING_TOP_DOCUMENTS
+        document_ids = list(dict.fromkeys(document_ids))
+        if (
+            not Settings.ROUTING_ENABLED
+            or len(document_ids) < Settings.ROUTING_MIN_DOCUMENTS
+            or len(document_ids) <= top_n
+        ):
+            return self._observed([document_ids for _ in query_embeddings], len(document_ids))
+
+        with track_stage("document_routing"):
+            self._load()
+            self._ensure_signatures(document_ids)
+            self._rebuild()
+            with self._lock:
+                matrix, starts, positions = self._matrix, self._starts, self._positions
+            routable = [document_id for document_id in document_ids if document_id in positions] if matrix is not None else []
+            # Documents that cannot be scored are always searched
+            unscored = [document_id for document_id in document_ids if document_id not in positions]
+            if len(routable) <= top_n:
+                return self._observed([document_ids for _ in query_embeddings], len(document_ids))
+
+            queries = np.asarray(query_embeddings, dtype=np.float32)
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries /= np.where(norms == 0, 1, norms)
+            # Best-matching signature row per document, for every query at once
+            document_scores = np.maximum.reduceat(queries @ matrix.T, starts, axis=1)
+            columns = np.array([positions[document_id] for document_id in routable])
+            scores = document_scores[:, columns]
+            best = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+
+            routes = []
+            for row, candidates in zip(scores, best):
+                ordered = candidates[np.argsort(-row[candidates])]
+                routes.append([routable[i] for i in ordered] + unscored)
+
+        return self._observed(routes, len(document_ids))
+
+    @staticmethod
+    def _observed(routes: List[List[str]], total: int) -> List[List[str]]:
+        """Record the searched fraction of every query's documents"""
+        if total:
+            for route in routes:
+                ROUTED_DOCUMENTS.observe(len(route) / total)
+        return routes
@@ -1,22 +1,116 @@
+import asyncio
 import uuid
 import aiofiles
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 from app.services.pdf_loader import PDFLoader
-from app.services.text_splitter import TextSplitterService
+from app.services.text_splitter import TextSplitterService, TextChunk, FINE
 from app.services.embeddings import EmbeddingService
 from app.services.vector_store import VectorStoreService
+from app.services.cache_service import CacheService
+from app.services.chat_session_service import ChatSessionService
+from app.services.chat_history_service import ChatHistoryService
+from app.services.artifact_store import ArtifactStore, file_sha256
+from app.services.index_residency import IndexResidencyManager
+from app.services.document_router import DocumentRouter
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.task_scheduler import TaskScheduler
 from app.config import Settings
+from app.services.metrics import track_stage
 
 
 class DocumentService:
     """Service for managing document upload and processing"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        embeddings: Optional[EmbeddingService] = None,
+        vector_store: Optional[VectorStoreService] = None,
+        cache: Optional[CacheService] = None,
+        chat_session_service: Optional[ChatSessionService] = None,
+        chat_history_service: Optional[ChatHistoryService] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        residency: Optional[IndexResidencyManager] = None,
+        router: Optional[DocumentRouter] = None,
+        dedup: Optional[NearDuplicateIndex] = None,
+        scheduler: Optional[TaskScheduler] = None
+    ):
         self.upload_dir = Settings.UPLOAD_DIR
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
         self.pdf_loader = PDFLoader()
         self.text_splitter = TextSplitterService()
-        self.embeddings = EmbeddingService()
-        self.vector_store = VectorStoreService()
+        self.embeddings = embeddings or EmbeddingService()
+        self.vector_store = vector_store or VectorStoreService()
+        self.cache = cache or CacheService()
+        self.chat_session_service = chat_session_service or ChatSessionService()
+        self.chat_history_service = chat_history_service or ChatHistoryService()
+        self.artifacts = artifacts or ArtifactStore()
+        self.residency = residency
+        self.router = router
+        self.dedup = dedup
+        self.scheduler = scheduler
+    
+    def _store_chunks(
+        self,
+        document_id: str,
+        filename: str,
+        chunks: List[TextChunk],
+        reusable: Optional[Dict[str, List[float]]] = None,
+        replace: bool = False,
+        reuse_duplicates: bool = True
+    ) -> Dict:
+        """Embed and index a document's fine chunks, skipping near-duplicates.
+        
+        A near-duplicate of an earlier chunk of the same document is not indexed at
+        all. A near-duplicate of a chunk in another document is indexed with that
+        chunk's embedding and a ``duplicate_of`` link to it, or with a fresh embedding
+        (and the link) when ``reuse_duplicates`` is False. Everything else is
+        embedded, except texts whose embedding is already in ``reusable``.
+        """
+        reusable = dict(reusable or {})
+        metadatas = [chunk.metadata() for chunk in chunks]
+        indexes = list(range(len(chunks)))
+        signatures = None
+        if self.dedup:
+            with track_stage("dedup"):
+                signatures = self.dedup.signatures([chunk.text for chunk in chunks])
+                links = self.dedup.find_duplicates(document_id, signatures)
+            indexes = [i for i, link in enumerate(links) if link is None or link[0] != document_id]
+            linked: Dict[str, Dict[int, int]] = {}
+            for i in indexes:
+                if links[i] is not None:
+                    linked.setdefault(links[i][0], {})[i] = links[i][1]
+            for other_id, targets in linked.items():
+                if not reuse_duplicates:
+                    for i, target in targets.items():
+                        metadatas[i]["duplicate_of"] = VectorStoreService.chunk_id(other_id, target)
+                    continue
+                found = self.vector_store.get_chunk_embeddings(other_id, list(set(targets.values())))
+                for i, target in targets.items():
+                    # Gone since it was indexed (e.g. deleted): embed this chunk after all
+                    if target in found:
+                        reusable.setdefault(chunks[i].text, found[target])
+                        metadatas[i]["duplicate_of"] = VectorStoreService.chunk_id(other_id, target)
+        
+        texts = [chunks[i].text for i in indexes]
+        missing = list(dict.fromkeys(text for text in texts if text not in reusable))
+        if missing:
+            reusable.update(zip(missing, self.embeddings.embed_documents(missing)))
+        embeddings_list = [reusable[text] for text in texts]
+        
+        if replace:
+            self.vector_store.replace_documents(
+                document_id, filename, texts, embeddings_list, [metadatas[i] for i in indexes], indexes
+            )
+        else:
+            self.vector_store.add_document(
+                document_id, filename, texts, embeddings_list, [metadatas[i] for i in indexes], indexes
+            )
+        if self.dedup:
+            self.dedup.add_document(document_id, indexes, signatures[indexes])
+        if self.router:
+            self.router.add_document(document_id, embeddings_list)
+        return {"stored": len(indexes), "embedded": len(missing)}
     
     async def upload_and_process(self, file) -> str:
         """Upload PDF file and process it into vector store"""
@@ -29,25 +123,143 @@ class DocumentService:
             content = await file.read()
             await f.write(content)
         
+        # Parsing, embedding and Chroma writes block: keep them off the event loop
+        await asyncio.to_thread(self._process_file, document_id, filename, file_path)
+        return document_id
+    
+    def _process_file(self, document_id: str, filename: str, file_path: Path):
+        """Parse, split, embed and store a saved PDF"""
         # Extract text from PDF
-        text = self.pdf_loader.extract_text(file_path)
+        with track_stage("pdf_extract"):
+            pages = self.pdf_loader.extract_pages(file_path)
+        text = self.pdf_loader.join_pages(pages)
         
         if not text.strip():
             raise ValueError("No text could be extracted from the PDF")
         
-        # Split text into chunks
-        chunks = self.text_splitter.split_text(text)
+        # Split text into fine (QA) and coarse (summary / tasks) chunks
+        with track_stage("text_split"):
+            layers = self.text_splitter.split_pages(pages)
         
-        # Create collection
-        collection = self.vector_store.create_collection(document_id, filename)
+        # Embed and store the fine chunks, minus near-duplicates
+        self._store_chunks(document_id, filename, layers[FINE])
         
-        # Generate embeddings
-        embeddings_list = self.embeddings.embed_documents(chunks)
+        # Keep the parsed text and both chunk layers so re-indexing can skip parsing
+        self.artifacts.save(ArtifactStore.build(
+            document_id, filename, file_sha256(file_path), pages, layers,
+            self.text_splitter.settings(), Settings.EMBEDDING_MODEL
+        ))
+    
+    def reindex_document(self, document_id: str, force: Iterable[str] = ()) -> dict:
+        """Bring a document's index up to date, redoing only the stages whose inputs changed.
         
-        # Store in vector store
-        self.vector_store.add_documents(collection, chunks, embeddings_list, document_id)
+        Stages are ``parse`` (the PDF changed or no text is stored), ``split``
+        (chunk settings changed; both chunk layers are rebuilt) and ``embed``
+        (fine chunks or the embedding model changed). When only the chunks changed, embeddings of unchanged chunk
+        texts are reused from the vector store. ``force`` names stages to redo
+        regardless.
+        """
+        force = set(force)
+        artifact = self.artifacts.load(document_id)
+        file_path = self.upload_dir / f"{document_id}.pdf"
+        source_sha256 = file_sha256(file_path) if file_path.exists() else None
+        filename = artifact["filename"] if artifact else self.vector_store.get_filename(document_id)
+        stages = []
         
-        return document_id
+        if (
+            artifact is None
+            or "parse" in force
+            or (source_sha256 and source_sha256 != artifact["parse"]["source_sha256"])
+        ):
+            if source_sha256 is None:
+                raise ValueError(f"Document {document_id} has no stored text and no PDF")
+            with track_stage("pdf_extract"):
+                pages = self.pdf_loader.extract_pages(file_path)
+            stages.append("parse")
+        else:
+            pages = artifact["parse"]["pages"]
+        text = self.pdf_loader.join_pages(pages)
+        if not text.strip():
+            raise ValueError("No text could be extracted from the PDF")
+        
+        split = artifact["split"] if artifact else {}
+        if stages or "split" in force or split.get("settings") != self.text_splitter.settings():
+            with track_stage("text_split"):
+                layers = self.text_splitter.split_pages(pages)
+            stages.append("split")
+        else:
+            layers = {name: ArtifactStore.chunks(artifact, name) for name in split["layers"]}
+        chunks = [chunk.text for chunk in layers[FINE]]
+        
+        model_changed = artifact is None or artifact["embed"]["model"] != Settings.EMBEDDING_MODEL
+        embedded = 0
+        if model_changed or stages or "embed" in force:
+            # Redoing the embeddings: nothing stored, in this document or another, is reused
+            fresh = model_changed or "embed" in force
+            reusable = {} if fresh else self.vector_store.get_embeddings_by_text(document_id)
+            embedded = self._store_chunks(
+                document_id, filename, layers[FINE], reusable, replace=True, reuse_duplicates=not fresh
+            )["embedded"]
+            if self.residency:
+                self.residency.discard(document_id)
+            stages.append("embed")
+        
+        if stages:
+            self.artifacts.save(ArtifactStore.build(
+                document_id,
+                filename,
+                source_sha256 or artifact["parse"]["source_sha256"],
+                pages,
+                layers,
+                self.text_splitter.settings(),
+                Settings.EMBEDDING_MODEL
+            ))
+        
+        return {
+            "document_id": document_id,
+            "stages": stages,
+            "chunks": len(chunks),
+            "chunks_embedded": embedded,
+        }
+    
+    async def delete_document(self, document_id: str) -> dict:
+        """Delete a document and everything derived from it"""
+        # Chroma deletes and the session / history rewrites block: keep them off the event loop
+        return await asyncio.to_thread(self._delete_document, document_id)
+    
+    def _delete_document(self, document_id: str) -> dict:
+        """Cancel the document's jobs, then drop its vectors, file, artifacts, cached outputs and references"""
+        # A job finishing after the delete would cache output for a document that is gone
+        jobs_cancelled = self.scheduler.cancel_document(document_id) if self.scheduler else 0
+        # Chunks of other documents may carry duplicate_of links into this one
+        linking = self.dedup.similar_documents(document_id) if self.dedup else None
+        duplicates_unlinked = self.vector_store.unlink_duplicates(document_id, linking)
+        collection_deleted = self.vector_store.delete_document(document_id)
+        if self.residency:
+            self.residency.discard(document_id)
+        if self.router:
+            self.router.remove_document(document_id)
+        if self.dedup:
+            self.dedup.remove_document(document_id)
+        
+        file_path = self.upload_dir / f"{document_id}.pdf"
+        file_deleted = file_path.exists()
+        if file_deleted:
+            file_path.unlink()
+        self.artifacts.delete(document_id)
+        
+        if not collection_deleted and not file_deleted:
+            raise ValueError(f"Document {document_id} not found")
+        
+        return {
+            "collection_deleted": collection_deleted,
+            "file_deleted": file_deleted,
+            "duplicates_unlinked": duplicates_unlinked,
+            "jobs_cancelled": jobs_cancelled,
+            "cache_entries_removed": self.cache.clear(document_id),
+            "sessions_updated": self.chat_session_service.remove_document_from_sessions(document_id),
+            "histories_updated": self.chat_history_service.remove_document_references(document_id),
+        }
     
     async def list_documents(self):
         """List all processed documents"""
@@ -1,20 +1,72 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+from collections import OrderedDict
 from app.config import Settings
+from app.services.metrics import track_stage
 
 
 class EmbeddingService:
     """Service for generating embeddings"""
     
     def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=Settings.EMBEDDING_MODEL
-        )
+        self._embeddings = None
+        self._lock = threading.Lock()
+        self._query_cache: OrderedDict = OrderedDict()
+    
+    @property
+    def embeddings(self):
+        """Load the sentence-transformers model on first use"""
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    # Imported lazily: pulls in torch and sentence-transformers
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                    self._embeddings = HuggingFaceEmbeddings(
+                        model_name=Settings.EMBEDDING_MODEL
+                    )
+        return self._embeddings
     
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         """Generate embeddings for a list of documents"""
-        return self.embeddings.embed_documents(texts)
+        with track_stage("embed_documents"):
+            return self.embeddings.embed_documents(texts)
+    
+    def _cached_query(self, text: str):
+        """Cached query embedding, marked most recently used"""
+        with self._lock:
+            cached = self._query_cache.get(text)
+            if cached is not None:
+                self._query_cache.move_to_end(text)
+            return cached
     
     def embed_query(self, text: str) -> list[float]:
         """Generate embedding for a single query"""
-        return self.embeddings.embed_query(text)
-
+        # Retrieval and compression embed the same query once per document; reuse it
+        cached = self._cached_query(text)
+        if cached is not None:
+            return cached
+        with track_stage("embed_query"):
+            embedding = self.embeddings.embed_query(text)
+        with self._lock:
+            self._query_cache[text] = embedding
+            while len(self._query_cache) > Settings.QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return embedding
+    
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed many queries in one batched model call, reusing cached ones"""
+        found = {}
+        for text in dict.fromkeys(texts):
+            cached = self._cached_query(text)
+            if cached is not None:
+                found[text] = cached
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+        if missing:
+            with track_stage("embed_query_batch"):
+                embedded = self.embeddings.embed_documents(missing)
+            with self._lock:
+                for text, embedding in zip(missing, embedded):
+                    self._query_cache[text] = embedding
+                while len(self._query_cache) > Settings.QUERY_EMBEDDING_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+            found.update(zip(missing, embedded))
+        return [found[text] for text in texts]
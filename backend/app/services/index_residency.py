@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from app.config import Settings
+from app.services.metrics import metrics
+from app.services.vector_store import VectorStoreService
+
+RESIDENCY_LOOKUPS = metrics.counter(
+    "index_residency_lookups_total",
+    "Document index lookups before a vector query",
+    ["result"]
+)
+INDEX_LOAD_SECONDS = metrics.histogram(
+    "index_load_seconds",
+    "Time to load a document's vector index into memory",
+    ["source"]
+)
+RESIDENT_DOCUMENTS = metrics.gauge(
+    "index_resident_documents",
+    "Document indexes currently loaded"
+)
+
+
+class IndexResidencyManager:
+    """Tracks which documents' vector indexes are loaded, and loads them ahead of queries.
+
+    Chroma keeps a bounded number of HNSW indexes open and closes the least recently
+    used one when it needs room; this manager mirrors that cache in LRU order, with
+    the capacity reported by the vector store. A query on a document that is not
+    resident loads its index first and counts as a miss. ``prefetch`` loads indexes
+    in the background, e.g. as soon as a document is attached to a chat session, so
+    the first question is a hit. Concurrent loads of the same document share one load.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStoreService,
+        capacity: Optional[int] = None,
+        prefetch_workers: Optional[int] = None
+    ):
+        self.vector_store = vector_store
+        self.capacity = capacity or vector_store.index_cache_capacity()
+        self._executor = ThreadPoolExecutor(
+            max_workers=prefetch_workers or Settings.INDEX_PREFETCH_WORKERS,
+            thread_name_prefix="index-prefetch"
+        )
+        self._lock = threading.Lock()
+        self._resident: OrderedDict = OrderedDict()  # document_id -> None, least recently used first
+        self._loading: Dict[str, Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "prefetches": 0, "loads": 0, "load_seconds": 0.0}
+
+    def ensure_resident(self, document_id: str) -> bool:
+        """Make sure a document's index is loaded before querying it. Returns True on a hit"""
+        with self._lock:
+            if document_id in self._resident:
+                self._resident.move_to_end(document_id)
+                self._stats["hits"] += 1
+                RESIDENCY_LOOKUPS.inc(result="hit")
+                return True
+            self._stats["misses"] += 1
+            RESIDENCY_LOOKUPS.inc(result="miss")
+            future = self._loading.get(document_id)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._loading[document_id] = future
+
+        if owner:
+            self._load(document_id, future, "request")
+        # Waits for an in-flight prefetch instead of loading twice
+        future.result()
+        return False
+
+    def prefetch(self, document_ids: Iterable[str]):
+        """Load indexes in the background if they are not resident yet"""
+        if not Settings.INDEX_PREFETCH_ENABLED:
+            return
+        for document_id in document_ids:
+            with self._lock:
+                if document_id in self._resident or document_id in self._loading:
+                    continue
+                future = Future()
+                self._loading[document_id] = future
+                self._stats["prefetches"] += 1
+            self._executor.submit(self._load, document_id, future, "prefetch")
+
+    def _load(self, document_id: str, future: Future, source: str):
+        started = time.perf_counter()
+        try:
+            self.vector_store.load_index(document_id)
+        except Exception as e:
+            with self._lock:
+                self._loading.pop(document_id, None)
+            future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - started
+        INDEX_LOAD_SECONDS.observe(elapsed, source=source)
+
+        with self._lock:
+            self._loading.pop(document_id, None)
+            self._resident.pop(document_id, None)
+            self._resident[document_id] = None
+            # Chroma has closed the least recently used indexes beyond its capacity
+            while self.capacity and len(self._resident) > self.capacity:
+                self._resident.popitem(last=False)
+            self._stats["loads"] += 1
+            self._stats["load_seconds"] += elapsed
+            RESIDENT_DOCUMENTS.set(len(self._resident))
+        future.set_result(True)
+
+    def discard(self, document_id: str):
+        """Forget a document whose index was deleted or rebuilt"""
+        with self._lock:
+            self._resident.pop(document_id, None)
+            RESIDENT_DOCUMENTS.set(len(self._resident))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+                "avg_load_ms": round(stats["load_seconds"] / stats["loads"] * 1000, 1) if stats["loads"] else 0.0,
+                "resident_documents": list(self._resident),
+                "capacity": self.capacity,
+            })
+            stats["load_seconds"] = round(stats["load_seconds"], 3)
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,28 +1,58 @@
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage, SystemMessage
+import time
+from typing import Optional
 from app.config import Settings
+from app.services.metrics import track_stage, LLM_TOKENS
+from app.services.usage_service import UsageTracker
+from app.services.llm_router import LLMRouter, GroqRoute, OpenAICompatibleRoute
 
 
 class LLMGroqService:
     """Service for interacting with Groq LLM"""
     
-    def __init__(self):
+    def __init__(self, usage: Optional[UsageTracker] = None):
         if not Settings.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY environment variable is required")
         
-        self.llm = ChatGroq(
-            groq_api_key=Settings.GROQ_API_KEY,
-            model_name=Settings.MODEL_NAME,
-            temperature=0.1
+        import httpx
+        
+        # One pooled keep-alive client shared by every route
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=Settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=Settings.LLM_MAX_CONNECTIONS,
+                keepalive_expiry=Settings.LLM_KEEPALIVE_SECONDS
+            ),
+            timeout=Settings.LLM_TIMEOUT_SECONDS
         )
+        
+        # Primary model first, then cheaper/faster fallbacks, then an optional local stand-in
+        routes = [GroqRoute(Settings.MODEL_NAME, self.http_client)]
+        for model_name in Settings.LLM_FALLBACK_MODELS:
+            routes.append(GroqRoute(model_name, self.http_client))
+        if Settings.LLM_LOCAL_BASE_URL:
+            routes.append(OpenAICompatibleRoute(
+                Settings.LLM_LOCAL_BASE_URL,
+                Settings.LLM_LOCAL_MODEL,
+                self.http_client,
+                api_key=Settings.LLM_LOCAL_API_KEY
+            ))
+        
+        self.router = LLMRouter(routes)
+        self.usage = usage
     
     def generate(self, system_prompt: str, user_prompt: str) -> str:
         """Generate response from LLM"""
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
+        started = time.perf_counter()
+        with track_stage("llm_generate"):
+            result = self.router.generate(system_prompt, user_prompt)
+        latency = time.perf_counter() - started
         
-        response = self.llm.invoke(messages)
-        return response.content
-
+        LLM_TOKENS.inc(result.prompt_tokens, kind="prompt")
+        LLM_TOKENS.inc(result.completion_tokens, kind="completion")
+        if self.usage:
+            self.usage.record(result.prompt_tokens, result.completion_tokens, latency)
+        return result.content
+    
+    def route_stats(self) -> list[dict]:
+        """Latency statistics for each configured route"""
+        return self.router.stats()
@@ -0,0 +1,273 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+from app.config import Settings
+from app.services.metrics import metrics
+
+ROUTE_LATENCY = metrics.histogram(
+    "llm_route_latency_seconds",
+    "Latency of individual LLM attempts per route",
+    ["route"]
+)
+ROUTE_REQUESTS = metrics.counter(
+    "llm_route_requests_total",
+    "LLM attempts per route by outcome",
+    ["route", "outcome"]
+)
+
+
+class LLMRouteError(Exception):
+    """Error from an LLM endpoint, carrying the HTTP status when there is one"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMUnavailableError(Exception):
+    """Raised when no route could answer before the deadline"""
+
+
+@dataclass
+class LLMResult:
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    route: str = ""
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is not None:
+        return retry_after
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Timeouts, connection failures and 5xx responses are worth trying elsewhere"""
+    import httpx
+    if isinstance(exc, (TimeoutError, httpx.TransportError)):
+        return True
+    if type(exc).__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    status = _status_code(exc)
+    return status is not None and status >= 500
+
+
+class LLMRoute(ABC):
+    """One model endpoint with its own rolling latency statistics"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._latencies: Deque[float] = deque(maxlen=Settings.LLM_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.cooldown_until = 0.0
+
+    @abstractmethod
+    def _invoke(self, system_prompt: str, user_prompt: str, timeout: float) -> LLMResult:
+        """Make one request to the endpoint"""
+
+    def invoke(self, system_prompt: str, user_prompt: str, timeout: float) -> LLMResult:
+        """Call the endpoint and record the attempt's latency"""
+        started = time.perf_counter()
+        result = self._invoke(system_prompt, user_prompt, timeout)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._latencies.append(elapsed)
+        ROUTE_LATENCY.observe(elapsed, route=self.name)
+        result.route = self.name
+        return result
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile over recent successful attempts, once enough samples exist"""
+        with self._lock:
+            if len(self._latencies) < Settings.LLM_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(pct / 100 * len(ordered)))
+        return ordered[index]
+
+    def is_cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = len(self._latencies)
+        hedge_after = self.percentile(Settings.LLM_HEDGE_PERCENTILE) if Settings.LLM_HEDGE_ENABLED else None
+        return {
+            "route": self.name,
+            "samples": samples,
+            "p50_ms": round((self.percentile(50) or 0) * 1000, 1),
+            "p95_ms": round((self.percentile(95) or 0) * 1000, 1),
+            # None until enough samples exist (or with hedging off)
+            "hedge_after_ms": round(hedge_after * 1000, 1) if hedge_after is not None else None,
+            "cooling_down": self.is_cooling_down(),
+            "cooldown_remaining_s": round(max(0.0, self.cooldown_until - time.monotonic()), 1),
+        }
+
+
+class GroqRoute(LLMRoute):
+    """Groq chat model sharing a pooled keep-alive HTTP client"""
+
+    def __init__(self, model_name: str, http_client):
+        super().__init__(f"groq:{model_name}")
+        from langchain_groq import ChatGroq
+
+        self.llm = ChatGroq(
+            groq_api_key=Settings.GROQ_API_KEY,
+            model_name=model_name,
+            temperature=0.1,
+            http_client=http_client,
+            # Retries and fallbacks are handled by the router, not the SDK
+            max_retries=0,
+        )
+
+    def _invoke(self, system_prompt: str, user_prompt: str, timeout: float) -> LLMResult:
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=user_prompt)
+        ]
+        response = self.llm.invoke(messages, timeout=timeout)
+        usage = getattr(response, "usage_metadata", None) or {}
+        return LLMResult(
+            content=response.content,
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0),
+        )
+
+
+class OpenAICompatibleRoute(LLMRoute):
+    """Any OpenAI-compatible /chat/completions endpoint (e.g. a local stand-in model)"""
+
+    def __init__(self, base_url: str, model_name: str, http_client, api_key: Optional[str] = None):
+        super().__init__(f"openai:{model_name}")
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model_name = model_name
+        self.http_client = http_client
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    def _invoke(self, system_prompt: str, user_prompt: str, timeout: float) -> LLMResult:
+        response = self.http_client.post(
+            self.url,
+            headers=self.headers,
+            timeout=timeout,
+            json={
+                "model": self.model_name,
+                "temperature": 0.1,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+            },
+        )
+        if response.status_code >= 400:
+            error = LLMRouteError(
+                f"{self.name} returned {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code,
+            )
+            error.response = response
+            raise error
+        data = response.json()
+        usage = data.get("usage") or {}
+        return LLMResult(
+            content=data["choices"][0]["message"]["content"],
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+        )
+
+
+class LLMRouter:
+    """Routes generate calls across LLM endpoints.
+
+    Each call gets an overall deadline. Within a route, a duplicate (hedged) request
+    is sent once the first attempt runs longer than the route's recent latency
+    percentile; whichever finishes first wins. Rate-limited (429) or failing routes
+    are put on a short cooldown and the call falls through to the next route.
+    """
+
+    def __init__(self, routes: List[LLMRoute], executor: Optional[ThreadPoolExecutor] = None):
+        if not routes:
+            raise ValueError("At least one LLM route is required")
+        self.routes = routes
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=Settings.LLM_MAX_CONNECTIONS,
+            thread_name_prefix="llm"
+        )
+
+    def _attempt(self, route: LLMRoute, system_prompt: str, user_prompt: str, deadline: float) -> LLMResult:
+        """Run one (possibly hedged) request against a route"""
+        remaining = deadline - time.monotonic()
+        primary = self.executor.submit(route.invoke, system_prompt, user_prompt, remaining)
+        pending = {primary}
+
+        hedge_after = route.percentile(Settings.LLM_HEDGE_PERCENTILE) if Settings.LLM_HEDGE_ENABLED else None
+        if hedge_after is not None and hedge_after < remaining:
+            done, _ = wait(pending, timeout=hedge_after)
+            if not done:
+                ROUTE_REQUESTS.inc(route=route.name, outcome="hedged")
+                remaining = deadline - time.monotonic()
+                pending.add(self.executor.submit(route.invoke, system_prompt, user_prompt, remaining))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"{route.name} did not respond before the deadline")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def generate(self, system_prompt: str, user_prompt: str, timeout: Optional[float] = None) -> LLMResult:
+        """Generate a response from the first route that answers before the deadline"""
+        deadline = time.monotonic() + (timeout or Settings.LLM_TIMEOUT_SECONDS)
+        available = [route for route in self.routes if not route.is_cooling_down()]
+        # If everything is cooling down, still try the routes in priority order
+        candidates = available or self.routes
+        last_error: Optional[Exception] = None
+
+        for route in candidates:
+            if time.monotonic() >= deadline:
+                break
+            try:
+                result = self._attempt(route, system_prompt, user_prompt, deadline)
+                ROUTE_REQUESTS.inc(route=route.name, outcome="ok")
+                return result
+            except Exception as e:
+                last_error = e
+                if _status_code(e) == 429:
+                    ROUTE_REQUESTS.inc(route=route.name, outcome="rate_limited")
+                    route.cooldown_until = time.monotonic() + (_retry_after(e) or Settings.LLM_RATE_LIMIT_COOLDOWN)
+                elif isinstance(e, TimeoutError) or _is_transient(e):
+                    ROUTE_REQUESTS.inc(route=route.name, outcome="error")
+                    route.cooldown_until = time.monotonic() + Settings.LLM_ERROR_COOLDOWN
+                else:
+                    ROUTE_REQUESTS.inc(route=route.name, outcome="error")
+                    raise
+
+        if last_error is not None and _status_code(last_error) == 429:
+            raise last_error
+        raise LLMUnavailableError(f"No LLM route answered in time: {last_error}")
+
+    def stats(self) -> List[dict]:
+        return [route.stats() for route in self.routes]
@@ -0,0 +1,258 @@
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.config import Settings
+from app.services.metrics import metrics
+
+DEDUP_CHUNKS = metrics.counter(
+    "dedup_chunks_total",
+    "Chunks checked for near-duplicates at ingestion",
+    ["result"]
+)
+DEDUP_COLLAPSED = metrics.counter(
+    "dedup_collapsed_results_total",
+    "Retrieved chunks dropped as near-duplicates of a better-ranked one"
+)
+
+# Ingestion results
+UNIQUE = "unique"
+WITHIN_DOCUMENT = "within_document"
+ACROSS_DOCUMENTS = "across_documents"
+
+# Signature of a chunk without words; never matches anything
+EMPTY = 0xFFFFFFFF
+# Fixed so signatures written by earlier runs stay comparable
+PERMUTATION_SEED = 1
+
+_WORD = re.compile(r"\w+")
+
+ChunkKey = Tuple[str, int]  # (document_id, chunk_index)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index over every stored chunk, for finding near-duplicate text.
+
+    A chunk's signature is the minimum of ``DEDUP_NUM_PERM`` hash permutations over
+    its word shingles, so the fraction of equal positions in two signatures estimates
+    the Jaccard similarity of their texts. Signatures are split into ``DEDUP_BANDS``
+    bands; chunks sharing any band are candidates, and candidates at or above
+    ``DEDUP_THRESHOLD`` are duplicates. The index is updated per document and stored
+    as ``dedup/<id>.npz``, so it grows incrementally across the whole corpus.
+    """
+
+    def __init__(
+        self,
+        num_perm: Optional[int] = None,
+        bands: Optional[int] = None,
+        threshold: Optional[float] = None,
+        shingle_words: Optional[int] = None
+    ):
+        import numpy as np
+
+        self.num_perm = num_perm or Settings.DEDUP_NUM_PERM
+        self.bands = bands or Settings.DEDUP_BANDS
+        if self.num_perm % self.bands:
+            raise ValueError("DEDUP_BANDS must divide DEDUP_NUM_PERM")
+        self.rows = self.num_perm // self.bands
+        self.threshold = threshold or Settings.DEDUP_THRESHOLD
+        self.shingle_words = shingle_words or Settings.DEDUP_SHINGLE_WORDS
+        rng = np.random.default_rng(PERMUTATION_SEED)
+        # Multiply-shift hashing: odd 64-bit multipliers, keep the high 32 bits
+        self._a = rng.integers(1, 2 ** 63, self.num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, self.num_perm, dtype=np.uint64)
+
+        self.index_dir = Settings.VECTOR_STORE_DIR.parent / "dedup"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._signatures: Dict[ChunkKey, object] = {}
+        self._documents: Dict[str, List[int]] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[ChunkKey]] = {}
+
+    def _shingle_hashes(self, text: str):
+        import numpy as np
+
+        words = _WORD.findall(text.lower())
+        if not words:
+            return None
+        width = min(self.shingle_words, len(words))
+        shingles = {" ".join(words[i:i + width]) for i in range(len(words) - width + 1)}
+        return np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signatures(self, texts: Sequence[str]):
+        """MinHash signature per text, one uint32 row each"""
+        import numpy as np
+
+        result = np.full((len(texts), self.num_perm), EMPTY, dtype=np.uint32)
+        for row, text in enumerate(texts):
+            hashes = self._shingle_hashes(text)
+            if hashes is None:
+                continue
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+            result[row] = permuted.min(axis=1)
+        return result
+
+    def _band_keys(self, signature) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(first, second) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float((first == second).mean())
+
+    def _get_index_file(self, document_id: str):
+        return self.index_dir / f"{document_id}.npz"
+
+    def _insert_locked(self, key: ChunkKey, signature):
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def _remove_locked(self, document_id: str):
+        for chunk_index in self._documents.pop(document_id, []):
+            signature = self._signatures.pop((document_id, chunk_index), None)
+            if signature is None:
+                continue
+            for band_key in self._band_keys(signature):
+                bucket = self._buckets.get(band_key)
+                if bucket:
+                    bucket.remove((document_id, chunk_index))
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def _load(self):
+        """Read the stored per-document signatures once"""
+        import numpy as np
+
+        with self._lock:
+            if self._loaded:
+                return
+            for index_file in self.index_dir.glob("*.npz"):
+                try:
+                    with np.load(index_file) as data:
+                        indexes, signatures = data["indexes"], data["signatures"]
+                        shingle_words = int(data["shingle_words"])
+                except Exception:
+                    continue
+                # Written with other settings: the document rejoins when it is re-indexed
+                if signatures.shape[1:] != (self.num_perm,) or shingle_words != self.shingle_words:
+                    continue
+                document_id = index_file.stem
+                self._documents[document_id] = [int(i) for i in indexes]
+                for chunk_index, signature in zip(indexes, signatures):
+                    self._insert_locked((document_id, int(chunk_index)), signature)
+            self._loaded = True
+
+    def find_duplicates(self, document_id: str, signatures) -> List[Optional[ChunkKey]]:
+        """For each chunk of a document being indexed, the stored chunk it nearly duplicates.
+
+        Earlier chunks of the same document count too, so a link may point into
+        ``document_id`` itself; such chunks need not be stored at all. Chunks already
+        indexed for ``document_id`` (before a re-index) are ignored.
+        """
+        self._load()
+        links: List[Optional[ChunkKey]] = []
+        local_signatures: Dict[ChunkKey, object] = {}
+        local_buckets: Dict[Tuple[int, bytes], List[ChunkKey]] = {}
+        with self._lock:
+            for chunk_index, signature in enumerate(signatures):
+                if (signature == EMPTY).all():
+                    links.append(None)
+                    DEDUP_CHUNKS.inc(result=UNIQUE)
+                    continue
+                band_keys = self._band_keys(signature)
+                candidates = set()
+                for band_key in band_keys:
+                    candidates.update(local_buckets.get(band_key, ()))
+                    candidates.update(key for key in self._buckets.get(band_key, ()) if key[0] != document_id)
+
+                best, best_score = None, self.threshold
+                for key in candidates:
+                    stored = local_signatures.get(key)
+                    score = self.similarity(signature, stored if stored is not None else self._signatures[key])
+                    # Prefer a match inside the document, then the most similar chunk
+                    if score > best_score or (score == best_score and (best is None or key[0] == document_id)):
+                        best, best_score = key, score
+                links.append(best)
+
+                if best is not None and best[0] == document_id:
+                    DEDUP_CHUNKS.inc(result=WITHIN_DOCUMENT)
+                    continue
+                DEDUP_CHUNKS.inc(result=UNIQUE if best is None else ACROSS_DOCUMENTS)
+                # Will be stored: later chunks of this document may duplicate it
+                key = (document_id, chunk_index)
+                local_signatures[key] = signature
+                for band_key in band_keys:
+                    local_buckets.setdefault(band_key, []).append(key)
+        return links
+
+    def add_document(self, document_id: str, chunk_indexes: Sequence[int], signatures):
+        """Index the stored chunks of a newly indexed (or re-indexed) document"""
+        import numpy as np
+
+        keep = [row for row, signature in enumerate(signatures) if not (signature == EMPTY).all()]
+        indexes = np.asarray([chunk_indexes[row] for row in keep], dtype=np.int32)
+        kept = np.asarray(signatures, dtype=np.uint32)[keep] if keep else np.empty((0, self.num_perm), dtype=np.uint32)
+        np.savez(self._get_index_file(document_id), indexes=indexes, signatures=kept, shingle_words=self.shingle_words)
+
+        self._load()
+        with self._lock:
+            self._remove_locked(document_id)
+            self._documents[document_id] = [int(i) for i in indexes]
+            for chunk_index, signature in zip(indexes, kept):
+                self._insert_locked((document_id, int(chunk_index)), signature)
+
+    def similar_documents(self, document_id: str) -> Optional[List[str]]:
+        """Other documents with a chunk that nearly duplicates one of this document's chunks.
+
+        These are the only documents whose chunks can link to it. None if the document
+        is not in the index, so any document might.
+        """
+        self._load()
+        found = set()
+        with self._lock:
+            if document_id not in self._documents:
+                return None
+            for chunk_index in self._documents[document_id]:
+                signature = self._signatures[(document_id, chunk_index)]
+                for band_key in self._band_keys(signature):
+                    for key in self._buckets.get(band_key, ()):
+                        if key[0] != document_id and key[0] not in found and (
+                            self.similarity(signature, self._signatures[key]) >= self.threshold
+                        ):
+                            found.add(key[0])
+        return sorted(found)
+
+    def remove_document(self, document_id: str):
+        self._get_index_file(document_id).unlink(missing_ok=True)
+        with self._lock:
+            self._remove_locked(document_id)
+
+    def collapse(self, texts: Sequence[str]) -> List[str]:
+        """Drop texts that nearly duplicate an earlier (better-ranked) one, keeping order"""
+        if len(texts) < 2:
+            return list(texts)
+        signatures = self.signatures(texts)
+        kept: List[int] = []
+        for row in range(len(texts)):
+            if not (signatures[row] == EMPTY).all() and any(
+                self.similarity(signatures[row], signatures[other]) >= self.threshold for other in kept
+            ):
+                DEDUP_COLLAPSED.inc()
+                continue
+            kept.append(row)
+        return [texts[row] for row in kept]
+
+    def stats(self) -> Dict:
+        self._load()
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "chunks": len(self._signatures),
+                "buckets": len(self._buckets),
+                "signature_bytes": len(self._signatures) * self.num_perm * 4,
+            }
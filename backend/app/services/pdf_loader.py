@@ -1,19 +1,26 @@
 from pathlib import Path
-from pypdf import PdfReader
 
 
 class PDFLoader:
     """Extract text content from PDF files"""
     
     @staticmethod
-    def extract_text(file_path: Path) -> str:
-        """Extract text content from PDF file"""
-        text = ""
+    def extract_pages(file_path: Path) -> list[str]:
+        """Extract the text of each page of a PDF file"""
+        from pypdf import PdfReader
+        
         try:
             reader = PdfReader(file_path)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            return [page.extract_text() or "" for page in reader.pages]
         except Exception as e:
             raise ValueError(f"Error reading PDF: {str(e)}")
-        return text.strip()
-
+    
+    @staticmethod
+    def extract_text(file_path: Path) -> str:
+        """Extract text content from PDF file"""
+        return PDFLoader.join_pages(PDFLoader.extract_pages(file_path)).strip()
+    
+    @staticmethod
+    def join_pages(pages: list[str]) -> str:
+        """Join page texts the way documents are chunked (one newline after each page)"""
+        return "".join(page + "\n" for page in pages)
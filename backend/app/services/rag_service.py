@@ -1,18 +1,38 @@
-from typing import List
+import asyncio
+import time
+from typing import AsyncIterator, Callable, List, Optional, Tuple
 from pathlib import Path
 from app.services.pdf_loader import PDFLoader
-from app.services.text_splitter import TextSplitterService
+from app.services.text_splitter import TextSplitterService, COARSE
 from app.services.embeddings import EmbeddingService
 from app.services.vector_store import VectorStoreService
 from app.services.retriever import RetrieverService
 from app.services.llm_groq import LLMGroqService
+from app.services.cache_service import CacheService
+from app.services.artifact_store import ArtifactStore
+from app.services.context_compressor import ContextCompressor
+from app.services.task_scheduler import PriorityGate
+from app.services.document_router import DocumentRouter
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.usage_service import (
+    UsageTracker,
+    BudgetDecision,
+    BudgetExceededError,
+    usage_context,
+    estimate_tokens,
+    ALLOW,
+    DEGRADE,
+    REJECT,
+)
 from app.config import Settings
+from app.services.metrics import track_stage
 
 
 class PromptLoader:
     """Load prompts from files"""
     
     @staticmethod
+    @track_stage("prompt_load")
     def load_prompt(prompt_name: str, language: str = "en") -> tuple[str, str]:
         """Load system and user prompts from file"""
         prompt_file = Path(__file__).parent.parent / "prompts" / f"{prompt_name}.txt"
@@ -45,13 +65,33 @@ class PromptLoader:
 class RAGService:
     """Main RAG service that orchestrates all components"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        embeddings: Optional[EmbeddingService] = None,
+        vector_store: Optional[VectorStoreService] = None,
+        retriever: Optional[RetrieverService] = None,
+        llm: Optional[LLMGroqService] = None,
+        usage: Optional[UsageTracker] = None,
+        cache: Optional[CacheService] = None,
+        compressor: Optional[ContextCompressor] = None,
+        gate: Optional[PriorityGate] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        router: Optional[DocumentRouter] = None,
+        dedup: Optional[NearDuplicateIndex] = None
+    ):
         self.pdf_loader = PDFLoader()
         self.text_splitter = TextSplitterService()
-        self.embeddings = EmbeddingService()
-        self.vector_store = VectorStoreService()
-        self.retriever = RetrieverService(self.vector_store, self.embeddings)
-        self.llm = LLMGroqService()
+        self.embeddings = embeddings or EmbeddingService()
+        self.vector_store = vector_store or VectorStoreService()
+        self.retriever = retriever or RetrieverService(self.vector_store, self.embeddings)
+        self.llm = llm or LLMGroqService()
+        self.usage = usage
+        self.cache = cache or CacheService()
+        self.compressor = compressor or ContextCompressor(self.embeddings)
+        self.gate = gate
+        self.artifacts = artifacts or ArtifactStore()
+        self.router = router
+        self.dedup = dedup
         self.prompt_loader = PromptLoader()
     
     def _format_prompt(self, template: str, **kwargs) -> str:
@@ -66,37 +106,165 @@ class RAGService:
         # Return first part (before any --- separator)
         return content.split("---")[0].strip()
     
+    def _check_budget(self, system_prompt: str, user_prompt: str) -> BudgetDecision:
+        """Check the token budgets for an LLM call about to be made, reserving its tokens"""
+        if not self.usage:
+            return BudgetDecision(ALLOW)
+        return self.usage.check_budget(estimate_tokens(system_prompt, user_prompt), reserve=True)
+    
+    def _generate(self, system_prompt: str, user_prompt: str, decision: Optional[BudgetDecision] = None) -> str:
+        """Call the LLM, refusing calls that would exceed a token budget.
+        
+        ``decision`` is a budget check the caller already made for this call.
+        """
+        if decision is None:
+            decision = self._check_budget(system_prompt, user_prompt)
+        if decision.action == REJECT:
+            raise BudgetExceededError(decision.reason, decision.retry_after, decision.scope)
+        if not self.usage:
+            return self._call_llm(system_prompt, user_prompt)
+        with self.usage.reserved(decision):
+            return self._call_llm(system_prompt, user_prompt)
+    
+    def _call_llm(self, system_prompt: str, user_prompt: str) -> str:
+        if self.gate:
+            # Background jobs let in-flight chat requests use the LLM first
+            self.gate.yield_to_interactive()
+        return self.llm.generate(system_prompt, user_prompt)
+    
+    def _build_context(self, chunks: List[str], query: Optional[str], token_budget: int, task: str) -> str:
+        """Join chunks into prompt context, keeping only the most relevant sentences when enabled"""
+        if not Settings.CONTEXT_COMPRESSION_ENABLED:
+            return "\n\n".join(chunks)
+        return self.compressor.compress(chunks, query=query, token_budget=token_budget, task=task)
+    
+    def _get_task_chunks(self, document_id: str) -> List[str]:
+        """Coarse chunks for whole-document tasks, falling back to the indexed QA chunks"""
+        artifact = self.artifacts.load(document_id)
+        if artifact:
+            coarse = ArtifactStore.chunks(artifact, COARSE)
+            if coarse:
+                return [chunk.text for chunk in coarse]
+        return self.vector_store.get_all_chunks(document_id)
+    
+    def _sample_chunks(self, all_chunks: List[str], max_chunks: int) -> List[str]:
+        """Pick at most max_chunks evenly spread over the document"""
+        if len(all_chunks) > max_chunks:
+            step = len(all_chunks) // max_chunks
+            return all_chunks[::step][:max_chunks]
+        return all_chunks
+    
+    def _select_chunks(self, chunks: List[str]) -> List[str]:
+        """Top retrieved chunks for a prompt, sending repeated passages only once"""
+        if self.dedup:
+            chunks = self.dedup.collapse(chunks)
+        return chunks[:Settings.MAX_RETRIEVAL_CHUNKS]
+    
     async def answer_question(self, query: str, document_ids: List[str], language: str = "en") -> str:
         """Answer a question based on retrieved document content from multiple documents"""
-        all_chunks = []
-        
-        # Retrieve chunks from all documents
-        for document_id in document_ids:
-            chunks = self.retriever.retrieve(document_id, query, k=Settings.MAX_RETRIEVAL_CHUNKS)
-            # Add document_id metadata to each chunk
-            for chunk in chunks:
-                all_chunks.append((chunk, document_id))
+        # Embedding, Chroma and the LLM call all block: keep them off the event loop
+        return await asyncio.to_thread(self._answer_question, query, document_ids, language)
+    
+    def _answer_question(self, query: str, document_ids: List[str], language: str = "en") -> str:
+        query_embedding = self.embeddings.embed_query(query)
         
-        if not all_chunks:
+        # With many documents, only search the ones whose signatures match the query best
+        if self.router:
+            document_ids_to_search = self.router.route([query_embedding], document_ids)[0]
+        else:
+            document_ids_to_search = document_ids
+        
+        # Search all documents (in parallel across shards) and rank their chunks together by distance
+        all_chunks = self.retriever.retrieve_many(
+            [query_embedding], [document_ids_to_search], k=Settings.MAX_RETRIEVAL_CHUNKS
+        )[0]
+        selected_chunks = self._select_chunks(all_chunks)
+        return self._answer_from_chunks(query, selected_chunks, document_ids, language)
+    
+    def _answer_from_chunks(self, query: str, selected_chunks: List[str], document_ids: List[str], language: str = "en") -> str:
+        """Generate an answer to a question from already retrieved chunks"""
+        if not selected_chunks:
             return "The requested information is not available in the uploaded documents." if language == "en" else "Thông tin được yêu cầu không có trong các tài liệu đã tải lên."
         
-        # Sort chunks and take top k
-        # For now, just use first k chunks (can be improved with better ranking)
-        selected_chunks = [chunk for chunk, _ in all_chunks[:Settings.MAX_RETRIEVAL_CHUNKS]]
-        context = "\n\n".join(selected_chunks)
+        context = self._build_context(selected_chunks, query, Settings.QA_CONTEXT_TOKEN_BUDGET, "qa")
         
         # Load prompt
         system_prompt, user_template = self.prompt_loader.load_prompt("qa", language)
         user_prompt = self._format_prompt(user_template, context=context, query=query)
         
-        return self.llm.generate(system_prompt, user_prompt)
+        with usage_context(task_type="qa", document_ids=document_ids):
+            decision = self._check_budget(system_prompt, user_prompt)
+            if decision.action == DEGRADE:
+                # Close to a budget: answer from a smaller context
+                context = self._build_context(
+                    selected_chunks[:Settings.DEGRADED_RETRIEVAL_CHUNKS],
+                    query,
+                    Settings.QA_CONTEXT_TOKEN_BUDGET // 2,
+                    "qa"
+                )
+                user_prompt = self._format_prompt(user_template, context=context, query=query)
+            return self._generate(system_prompt, user_prompt, decision)
+    
+    async def answer_questions_batch(
+        self,
+        queries: List[str],
+        document_ids: List[str],
+        language: str = "en",
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[int, Optional[str], Optional[str]]]:
+        """Answer many questions against the same documents.
+        
+        All questions are embedded in one call, routed to their best documents, and
+        searched with one Chroma query per document (shards in parallel); LLM calls then run concurrently. Yields (index, answer, error) as
+        each answer finishes.
+        """
+        query_embeddings = await asyncio.to_thread(self.embeddings.embed_queries, queries)
+        
+        if self.router:
+            routes = await asyncio.to_thread(self.router.route, query_embeddings, document_ids)
+        else:
+            routes = [document_ids for _ in queries]
+        
+        # One search per document, for just the questions routed to it
+        per_query_chunks: List[List[str]] = await asyncio.to_thread(
+            self.retriever.retrieve_many, query_embeddings, routes, Settings.MAX_RETRIEVAL_CHUNKS
+        )
+        
+        deadline = time.monotonic() + Settings.BATCH_TIMEOUT_SECONDS
+        semaphore = asyncio.Semaphore(Settings.BATCH_LLM_CONCURRENCY)
+        
+        async def answer(index: int):
+            selected_chunks = await asyncio.to_thread(self._select_chunks, per_query_chunks[index])
+            async with semaphore:
+                with usage_context(session_id=session_id):
+                    while True:
+                        try:
+                            result = await asyncio.to_thread(
+                                self._answer_from_chunks, queries[index], selected_chunks, document_ids, language
+                            )
+                            return index, result, None
+                        except BudgetExceededError as e:
+                            # The shared TPM quota frees up over time: wait for it instead of failing
+                            if e.scope != "global" or not e.retry_after or time.monotonic() + e.retry_after > deadline:
+                                return index, None, f"Token budget exceeded: {e.reason}"
+                            await asyncio.sleep(e.retry_after)
+                        except Exception as e:
+                            return index, None, str(e)
+        
+        tasks = [asyncio.create_task(answer(index)) for index in range(len(queries))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
     
     def _summarize_chunk_batch(self, chunks: List[str], language: str = "en") -> str:
         """Summarize a batch of chunks (Map phase)"""
         context = "\n\n".join(chunks)
         system_prompt, user_template = self.prompt_loader.load_prompt("summary", language)
         user_prompt = self._format_prompt(user_template, context=context)
-        return self.llm.generate(system_prompt, user_prompt)
+        return self._generate(system_prompt, user_prompt)
     
     def _combine_summaries(self, summaries: List[str], language: str = "en") -> str:
         """Combine multiple summaries into a final summary (Reduce phase)"""
@@ -129,14 +297,44 @@ Requirements:
 
 Please combine these summaries into a single comprehensive summary."""
         
-        return self.llm.generate(system_prompt, user_prompt)
+        return self._generate(system_prompt, user_prompt)
     
-    async def summarize_document(self, document_id: str, language: str = "en") -> str:
+    async def summarize_document(
+        self,
+        document_id: str,
+        language: str = "en",
+        progress: Optional[Callable[[str, float], None]] = None
+    ) -> str:
         """Summarize the entire document using Map-Reduce approach"""
-        all_chunks = self.vector_store.get_all_chunks(document_id)
-        
-        if not all_chunks:
-            return "The requested information is not available in the uploaded document." if language == "en" else "Thông tin được yêu cầu không có trong tài liệu đã tải lên."
+        with usage_context(task_type="summarize", document_ids=[document_id]):
+            all_chunks = self._get_task_chunks(document_id)
+            
+            if not all_chunks:
+                return "The requested information is not available in the uploaded document." if language == "en" else "Thông tin được yêu cầu không có trong tài liệu đã tải lên."
+            
+            # Near a budget: serve a previously generated summary instead of spending tokens
+            if self.usage:
+                decision = self.usage.check_budget(estimate_tokens(*all_chunks))
+                if decision.action != ALLOW:
+                    cached = self.cache.get(document_id, "summarize", language)
+                    if cached:
+                        return cached
+            
+            summary = self._summarize_chunks(all_chunks, language, progress)
+            if progress:
+                # Raises if the job was cancelled meanwhile (e.g. its document was deleted)
+                progress("save", 1.0)
+            self.cache.set(document_id, "summarize", language, summary)
+            return summary
+    
+    def _summarize_chunks(
+        self,
+        all_chunks: List[str],
+        language: str = "en",
+        progress: Optional[Callable[[str, float], None]] = None
+    ) -> str:
+        """Run single-pass or Map-Reduce summarization over the given chunks"""
+        report = progress or (lambda stage, fraction: None)
         
         # Map-Reduce: If document is small, use single pass
         # Estimate tokens: ~1 token per character (rough estimate)
@@ -145,24 +343,29 @@ Please combine these summaries into a single comprehensive summary."""
         
         if total_estimated_tokens <= max_tokens_per_request:
             # Small document - single pass summarization
+            report("summarize", 0.0)
             context = "\n\n".join(all_chunks)
             system_prompt, user_template = self.prompt_loader.load_prompt("summary", language)
             user_prompt = self._format_prompt(user_template, context=context)
-            return self.llm.generate(system_prompt, user_prompt)
+            return self._generate(system_prompt, user_prompt)
         
         # Large document - Map-Reduce approach
         # Step 1: Map - Summarize chunks in batches
         batch_size = Settings.MAX_CHUNKS_PER_BATCH
         summaries = []
         
+        # Map takes ~80% of the work, the reduce levels the rest
         for i in range(0, len(all_chunks), batch_size):
+            report("map", 0.8 * i / len(all_chunks))
             batch = all_chunks[i:i + batch_size]
             batch_summary = self._summarize_chunk_batch(batch, language)
             summaries.append(batch_summary)
         
         # Step 2: Reduce - Combine summaries
         # If we have too many summaries, combine them recursively
+        map_count = len(summaries)
         while len(summaries) > 1:
+            report("reduce", 0.8 + 0.2 * (1 - len(summaries) / map_count))
             combined_summaries = []
             for i in range(0, len(summaries), batch_size):
                 batch = summaries[i:i + batch_size]
@@ -175,65 +378,71 @@ Please combine these summaries into a single comprehensive summary."""
         
         return summaries[0] if summaries else "Error: Could not generate summary."
     
-    async def generate_study_notes(self, document_id: str, language: str = "en") -> str:
+    def _generate_from_chunks(
+        self,
+        document_id: str,
+        prompt_name: str,
+        task_type: str,
+        max_chunks: int,
+        language: str = "en",
+        progress: Optional[Callable[[str, float], None]] = None
+    ) -> str:
+        """Generate task output from an evenly sampled subset of the document's chunks"""
+        with usage_context(task_type=task_type, document_ids=[document_id]):
+            all_chunks = self._get_task_chunks(document_id)
+            
+            if not all_chunks:
+                return "The requested information is not available in the uploaded document." if language == "en" else "Thông tin được yêu cầu không có trong tài liệu đã tải lên."
+            
+            chunks = self._sample_chunks(all_chunks, max_chunks)
+            context = self._build_context(chunks, None, Settings.TASK_CONTEXT_TOKEN_BUDGET, task_type)
+            
+            system_prompt, user_template = self.prompt_loader.load_prompt(prompt_name, language)
+            user_prompt = self._format_prompt(user_template, context=context)
+            
+            if progress:
+                progress("generate", 0.1)
+            decision = self._check_budget(system_prompt, user_prompt)
+            if decision.action != ALLOW:
+                # Near or over a budget: prefer a cached result, otherwise use half the context
+                cached = self.cache.get(document_id, task_type, language)
+                if cached:
+                    if self.usage:
+                        self.usage.release(decision.reservation)
+                    return cached
+                chunks = self._sample_chunks(all_chunks, max(1, max_chunks // 2))
+                context = self._build_context(chunks, None, Settings.TASK_CONTEXT_TOKEN_BUDGET // 2, task_type)
+                user_prompt = self._format_prompt(user_template, context=context)
+                if decision.action == REJECT:
+                    # The smaller prompt is checked afresh
+                    decision = None
+            
+            result = self._generate(system_prompt, user_prompt, decision)
+            if progress:
+                progress("save", 1.0)
+            self.cache.set(document_id, task_type, language, result)
+            return result
+    
+    async def generate_study_notes(self, document_id: str, language: str = "en", progress=None) -> str:
         """Generate concise study notes"""
-        all_chunks = self.vector_store.get_all_chunks(document_id)
-        
-        if not all_chunks:
-            return "The requested information is not available in the uploaded document." if language == "en" else "Thông tin được yêu cầu không có trong tài liệu đã tải lên."
-        
-        max_chunks = 25
-        if len(all_chunks) > max_chunks:
-            step = len(all_chunks) // max_chunks
-            chunks = all_chunks[::step][:max_chunks]
-        else:
-            chunks = all_chunks
-        
-        context = "\n\n".join(chunks)
-        
-        system_prompt, user_template = self.prompt_loader.load_prompt("notes", language)
-        user_prompt = self._format_prompt(user_template, context=context)
-        
-        return self.llm.generate(system_prompt, user_prompt)
+        return self._generate_from_chunks(document_id, "notes", "study_notes", 25, language, progress)
     
-    async def generate_faq(self, document_id: str, language: str = "en") -> str:
+    async def generate_faq(self, document_id: str, language: str = "en", progress=None) -> str:
         """Generate Frequently Asked Questions"""
-        all_chunks = self.vector_store.get_all_chunks(document_id)
-        
-        if not all_chunks:
-            return "The requested information is not available in the uploaded document." if language == "en" else "Thông tin được yêu cầu không có trong tài liệu đã tải lên."
-        
-        max_chunks = 25
-        if len(all_chunks) > max_chunks:
-            step = len(all_chunks) // max_chunks
-            chunks = all_chunks[::step][:max_chunks]
-        else:
-            chunks = all_chunks
-        
-        context = "\n\n".join(chunks)
-        
-        system_prompt, user_template = self.prompt_loader.load_prompt("faq", language)
-        user_prompt = self._format_prompt(user_template, context=context)
-        
-        return self.llm.generate(system_prompt, user_prompt)
+        return self._generate_from_chunks(document_id, "faq", "faq", 25, language, progress)
     
-    async def generate_podcast_script(self, document_id: str, language: str = "en") -> str:
+    async def generate_podcast_script(self, document_id: str, language: str = "en", progress=None) -> str:
         """Generate an educational podcast script"""
-        all_chunks = self.vector_store.get_all_chunks(document_id)
-        
-        if not all_chunks:
-            return "The requested information is not available in the uploaded document." if language == "en" else "Thông tin được yêu cầu không có trong tài liệu đã tải lên."
-        
-        max_chunks = 30
-        if len(all_chunks) > max_chunks:
-            step = len(all_chunks) // max_chunks
-            chunks = all_chunks[::step][:max_chunks]
-        else:
-            chunks = all_chunks
-        
-        context = "\n\n".join(chunks)
-        
-        system_prompt, user_template = self.prompt_loader.load_prompt("podcast", language)
-        user_prompt = self._format_prompt(user_template, context=context)
-        
-        return self.llm.generate(system_prompt, user_prompt)
+        return self._generate_from_chunks(document_id, "podcast", "podcast", 30, language, progress)
+    
+    async def run_task(self, task_type: str, document_id: str, language: str = "en", progress=None) -> str:
+        """Run one of the TaskRequest task types"""
+        generators = {
+            "summarize": self.summarize_document,
+            "study_notes": self.generate_study_notes,
+            "faq": self.generate_faq,
+            "podcast": self.generate_podcast_script,
+        }
+        if task_type not in generators:
+            raise ValueError(f"Unknown task type: {task_type}")
+        return await generators[task_type](document_id, language, progress=progress)
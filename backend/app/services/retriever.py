@@ -1,15 +1,23 @@
-from typing import List
+from typing import List, Optional
 from app.services.vector_store import VectorStoreService
 from app.services.embeddings import EmbeddingService
 from app.config import Settings
+from app.services.metrics import track_stage
+from app.services.index_residency import IndexResidencyManager
 
 
 class RetrieverService:
     """Service for retrieving relevant document chunks"""
     
-    def __init__(self, vector_store: VectorStoreService, embeddings: EmbeddingService):
+    def __init__(
+        self,
+        vector_store: VectorStoreService,
+        embeddings: EmbeddingService,
+        residency: Optional[IndexResidencyManager] = None
+    ):
         self.vector_store = vector_store
         self.embeddings = embeddings
+        self.residency = residency
     
     def retrieve(self, document_id: str, query: str, k: int = None) -> List[str]:
         """Retrieve relevant chunks for a query"""
@@ -17,15 +25,31 @@ class RetrieverService:
             k = Settings.MAX_RETRIEVAL_CHUNKS
         
         collection = self.vector_store.get_collection(document_id)
+        if self.residency:
+            self.residency.ensure_resident(document_id)
         query_embedding = self.embeddings.embed_query(query)
         
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k
-        )
+        with track_stage("vector_query"):
+            results = collection.query(
+                query_embeddings=[query_embedding],
+                n_results=k
+            )
         
         if results['documents'] and len(results['documents'][0]) > 0:
             return results['documents'][0]
         return []
-
-
+    
+    def retrieve_many(self, query_embeddings: List[List[float]], routes: List[List[str]], k: int = None) -> List[List[str]]:
+        """Retrieve chunks for many pre-embedded queries, each over its own documents.
+        
+        ``routes[i]`` lists the documents searched for query ``i``. Hits from all of
+        a query's documents are merged by distance, nearest first.
+        """
+        if k is None:
+            k = Settings.MAX_RETRIEVAL_CHUNKS
+        
+        if self.residency:
+            for document_id in dict.fromkeys(document_id for routed in routes for document_id in routed):
+                self.residency.ensure_resident(document_id)
+        hits = self.vector_store.query_documents(query_embeddings, routes, k)
+        return [[text for _, text, _ in query_hits] for query_hits in hits]
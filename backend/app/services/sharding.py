@@ -0,0 +1,171 @@
+import bisect
+import hashlib
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+from app.config import Settings
+from app.services.metrics import metrics
+
+DOCUMENTS_MOVED = metrics.counter(
+    "shard_documents_moved_total",
+    "Documents copied to the shard that owns them",
+    ["result"]
+)
+REBALANCE_SECONDS = metrics.histogram(
+    "shard_rebalance_seconds",
+    "Duration of a full placement check and the moves it triggered",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 1800.0)
+)
+
+
+def parse_shards(spec: str) -> Dict[str, str]:
+    """Parse ``name=url`` pairs separated by commas, e.g. ``s1=http://10.0.0.5:8000``"""
+    shards = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, url = entry.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"Invalid shard {entry!r}, expected name=url")
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+def split_url(url: str) -> Dict:
+    """Host, port and TLS flag of a Chroma server URL"""
+    parsed = urlparse(url if "://" in url else f"http://{url}")
+    ssl = parsed.scheme == "https"
+    return {"host": parsed.hostname, "port": parsed.port or (443 if ssl else 8000), "ssl": ssl}
+
+
+class ConsistentHashRing:
+    """Maps keys to nodes so that adding or removing a node only moves ~1/N of the keys.
+
+    Each node is placed at ``virtual_nodes`` points on a 64-bit ring; a key belongs
+    to the first point at or after its own hash. Nodes are placed by name, so a
+    shard keeps its documents when its URL changes.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), virtual_nodes: Optional[int] = None):
+        self.virtual_nodes = virtual_nodes or Settings.SHARD_VIRTUAL_NODES
+        self._nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        for replica in range(self.virtual_nodes):
+            point = self._hash(f"{node}#{replica}")
+            position = bisect.bisect(self._points, point)
+            self._points.insert(position, point)
+            self._owners.insert(position, node)
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise ValueError("No shards configured")
+        position = bisect.bisect_left(self._points, self._hash(key)) % len(self._points)
+        return self._owners[position]
+
+
+class ShardRebalancer:
+    """Background thread that moves documents to the shard the ring assigns them.
+
+    Runs a placement check on start, every ``SHARD_REBALANCE_INTERVAL`` seconds, and
+    whenever ``trigger`` is called (e.g. after a shard is added or set draining).
+    Moves happen one document at a time; until a document's copy is complete it
+    keeps being served from its old shard.
+    """
+
+    def __init__(self, vector_store, interval: Optional[float] = None):
+        self.vector_store = vector_store
+        self.interval = Settings.SHARD_REBALANCE_INTERVAL if interval is None else interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._running = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"runs": 0, "moved": 0, "failed": 0, "last_run": None, "last_duration_s": None, "errors": {}}
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._loop, name="shard-rebalancer", daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        """Run a placement check soon instead of waiting for the interval"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.rebalance()
+            except Exception as e:
+                self._stats["errors"]["_run"] = str(e)
+            self._wake.wait(self.interval)
+
+    def rebalance(self) -> Dict:
+        """Move every misplaced document to its owner. Returns counts for this run"""
+        with self._running:
+            started = time.perf_counter()
+            moved, failed = 0, 0
+            for shard in self.vector_store.shard_names():
+                try:
+                    document_ids = self.vector_store.list_shard_documents(shard)
+                except Exception as e:
+                    self._stats["errors"][shard] = str(e)
+                    continue
+                for document_id in document_ids:
+                    if self._stop.is_set():
+                        break
+                    if self.vector_store.owner(document_id) == shard:
+                        continue
+                    try:
+                        self.vector_store.move_document(document_id, shard, self.vector_store.owner(document_id))
+                        moved += 1
+                        DOCUMENTS_MOVED.inc(result="moved")
+                        self._stats["errors"].pop(document_id, None)
+                    except Exception as e:
+                        failed += 1
+                        DOCUMENTS_MOVED.inc(result="failed")
+                        self._stats["errors"][document_id] = str(e)
+            elapsed = time.perf_counter() - started
+            REBALANCE_SECONDS.observe(elapsed)
+            self._stats["runs"] += 1
+            self._stats["moved"] += moved
+            self._stats["failed"] += failed
+            self._stats["last_run"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self._stats["last_duration_s"] = round(elapsed, 3)
+        return {"moved": moved, "failed": failed, "seconds": round(elapsed, 3)}
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats["errors"] = dict(list(stats["errors"].items())[-20:])
+        stats["running"] = self._running.locked()
+        return stats
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from app.config import Settings
+from app.services.vector_store import VectorStoreService
+from app.services.artifact_store import ArtifactStore
+from app.services.document_router import DocumentRouter
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.metrics import track_stage
+
+BUNDLE_VERSION = 1
+MANIFEST = "manifest.json"
+EMBEDDINGS = "embeddings.npy"
+CHUNKS = "chunks.jsonl"
+ARTIFACT = "artifact.json.gz"
+
+
+def _sha256(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SnapshotService:
+    """Exports and imports document indexes as portable, checksummed bundles.
+
+    A bundle is one directory per document holding ``embeddings.npy`` (float32,
+    row per chunk, loadable with ``mmap_mode="r"``), ``chunks.jsonl`` (id, text
+    and metadata per chunk, same order), the ingestion artifact when there is
+    one, and ``manifest.json`` with the document id, filename, embedding model,
+    dimension and the size and SHA-256 of every file. Bundles are written to a
+    temporary directory and renamed, so a reader never sees a partial bundle.
+    Import memory-maps the embeddings and hands them to Chroma in batches through a
+    staging collection that is swapped in once complete, rebuilds the document's
+    near-duplicate and routing signatures, and skips documents already present in
+    full, so replicas can sync repeatedly and resume an interrupted sync.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStoreService,
+        artifacts: Optional[ArtifactStore] = None,
+        router: Optional[DocumentRouter] = None,
+        dedup: Optional[NearDuplicateIndex] = None
+    ):
+        self.vector_store = vector_store
+        self.artifacts = artifacts or ArtifactStore()
+        self.router = router
+        self.dedup = dedup
+
+    def _local_document_ids(self) -> List[str]:
+        return [document["document_id"] for document in self.vector_store.list_documents()]
+
+    def export_document(self, document_id: str, target_dir: Path) -> Dict:
+        """Write one document's bundle under ``target_dir/<document_id>``"""
+        import numpy as np
+
+        collection = self.vector_store.get_collection(document_id)
+        with track_stage("snapshot_read"):
+            results = collection.get(include=["documents", "metadatas", "embeddings"])
+        rows = sorted(
+            zip(results["ids"], results["documents"], results["metadatas"], results["embeddings"]),
+            key=lambda row: (row[2] or {}).get("chunk_index", 0)
+        )
+
+        bundle_dir = target_dir / document_id
+        tmp_dir = target_dir / f".{document_id}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        embeddings = np.asarray([row[3] for row in rows], dtype=np.float32)
+        np.save(tmp_dir / EMBEDDINGS, np.ascontiguousarray(embeddings))
+        with open(tmp_dir / CHUNKS, 'w', encoding='utf-8') as f:
+            for chunk_id, text, metadata, _ in rows:
+                f.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata or {}}, ensure_ascii=False))
+                f.write("\n")
+        artifact_file = self.artifacts.get_artifact_file(document_id)
+        if artifact_file.exists():
+            shutil.copyfile(artifact_file, tmp_dir / ARTIFACT)
+
+        artifact = self.artifacts.load(document_id)
+        manifest = {
+            "version": BUNDLE_VERSION,
+            "document_id": document_id,
+            "filename": (collection.metadata or {}).get("filename", "unknown.pdf"),
+            "embedding_model": artifact["embed"]["model"] if artifact else Settings.EMBEDDING_MODEL,
+            "chunks": len(rows),
+            "dimension": int(embeddings.shape[1]) if len(rows) else 0,
+            "created_at": datetime.now().isoformat(),
+            "files": {
+                path.name: {"bytes": path.stat().st_size, "sha256": _sha256(path)}
+                for path in sorted(tmp_dir.iterdir())
+            },
+        }
+        with open(tmp_dir / MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        shutil.rmtree(bundle_dir, ignore_errors=True)
+        tmp_dir.rename(bundle_dir)
+        return manifest
+
+    def export(self, target_dir: Path, document_ids: Optional[Iterable[str]] = None, overwrite: bool = False) -> Dict:
+        """Export bundles, skipping documents that already have one unless ``overwrite``"""
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        exported, skipped, failed = [], [], {}
+        for document_id in document_ids or self._local_document_ids():
+            if not overwrite and (target_dir / document_id / MANIFEST).exists():
+                skipped.append(document_id)
+                continue
+            try:
+                self.export_document(document_id, target_dir)
+                exported.append(document_id)
+            except Exception as e:
+                failed[document_id] = str(e)
+        return {"exported": exported, "skipped": skipped, "failed": failed}
+
+    @staticmethod
+    def read_manifest(bundle_dir: Path) -> Dict:
+        with open(bundle_dir / MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {manifest.get('version')}")
+        return manifest
+
+    @staticmethod
+    def verify(bundle_dir: Path, manifest: Dict):
+        """Check every file against the sizes and checksums in the manifest"""
+        for name, expected in manifest["files"].items():
+            path = bundle_dir / name
+            if not path.exists():
+                raise ValueError(f"Bundle file {name} is missing")
+            if path.stat().st_size != expected["bytes"] or _sha256(path) != expected["sha256"]:
+                raise ValueError(f"Bundle file {name} failed checksum verification")
+
+    def import_document(self, bundle_dir: Path, verify: bool = True) -> Dict:
+        """Load one bundle into the local vector store and artifact store"""
+        import numpy as np
+
+        manifest = self.read_manifest(bundle_dir)
+        if manifest["embedding_model"] != Settings.EMBEDDING_MODEL:
+            raise ValueError(
+                f"Bundle was embedded with {manifest['embedding_model']}, this node uses {Settings.EMBEDDING_MODEL}"
+            )
+        if verify:
+            with track_stage("snapshot_verify"):
+                self.verify(bundle_dir, manifest)
+
+        document_id = manifest["document_id"]
+        # Pages are mapped in from the file (or the page cache) as Chroma reads each batch
+        embeddings = np.load(bundle_dir / EMBEDDINGS, mmap_mode="r")
+        ids, texts, metadatas = [], [], []
+        with open(bundle_dir / CHUNKS, 'r', encoding='utf-8') as f:
+            for line in f:
+                chunk = json.loads(line)
+                ids.append(chunk["id"])
+                texts.append(chunk["text"])
+                metadatas.append(chunk["metadata"])
+        if len(ids) != embeddings.shape[0]:
+            raise ValueError("Bundle chunk count does not match its embeddings")
+
+        with track_stage("snapshot_load"):
+            self.vector_store.import_document(document_id, manifest["filename"], ids, embeddings, texts, metadatas)
+        # Same signatures an upload would have built, so dedup and routing see the document
+        if self.dedup:
+            with track_stage("dedup"):
+                chunk_indexes = [metadata.get("chunk_index", row) for row, metadata in enumerate(metadatas)]
+                self.dedup.add_document(document_id, chunk_indexes, self.dedup.signatures(texts))
+        if self.router:
+            self.router.add_document(document_id, embeddings)
+
+        if (bundle_dir / ARTIFACT).exists():
+            shutil.copyfile(bundle_dir / ARTIFACT, self.artifacts.get_artifact_file(document_id))
+        return manifest
+
+    def import_(
+        self,
+        source_dir: Path,
+        document_ids: Optional[Iterable[str]] = None,
+        verify: bool = True,
+        progress=None
+    ) -> Dict:
+        """Import every bundle in ``source_dir`` whose document is not already present in full"""
+        source_dir = Path(source_dir)
+        wanted = set(document_ids) if document_ids else None
+        local = set(self._local_document_ids())
+
+        def complete(document_id: str, bundle_dir: Path) -> bool:
+            # A partial copy (e.g. from an import that predates staging) is imported again
+            try:
+                expected = self.read_manifest(bundle_dir)["chunks"]
+                return self.vector_store.get_collection(document_id).count() == expected
+            except Exception:
+                return False
+        bundles = sorted(
+            path for path in source_dir.iterdir()
+            if (path / MANIFEST).exists() and (wanted is None or path.name in wanted)
+        )
+
+        imported, skipped, failed = [], [], {}
+        for index, bundle_dir in enumerate(bundles, start=1):
+            document_id = bundle_dir.name
+            if document_id in local and complete(document_id, bundle_dir):
+                skipped.append(document_id)
+            else:
+                try:
+                    self.import_document(bundle_dir, verify=verify)
+                    imported.append(document_id)
+                except Exception as e:
+                    failed[document_id] = str(e)
+            if progress:
+                progress(index, len(bundles), document_id)
+        return {"imported": imported, "skipped": skipped, "failed": failed}
@@ -0,0 +1,292 @@
+import heapq
+import itertools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from app.config import Settings
+from app.services.metrics import metrics
+
+TASK_QUEUE_DEPTH = metrics.gauge(
+    "task_queue_depth",
+    "Generation jobs waiting to run"
+)
+TASK_JOBS = metrics.counter(
+    "task_jobs_total",
+    "Generation jobs by final status",
+    ["task_type", "status"]
+)
+INTERACTIVE_YIELD_SECONDS = metrics.histogram(
+    "task_interactive_yield_seconds",
+    "Time background jobs waited for interactive requests before an LLM call"
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+# Set inside scheduler worker threads so shared services know they serve background work
+_background: ContextVar[bool] = ContextVar("background_job", default=False)
+
+
+class JobCancelledError(Exception):
+    """Raised inside a running job once cancellation was requested"""
+
+
+class PriorityGate:
+    """Lets background jobs step aside while interactive requests are in flight"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._interactive = 0
+
+    @contextmanager
+    def interactive(self):
+        """Mark an interactive (chat) request as in flight"""
+        with self._condition:
+            self._interactive += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._interactive -= 1
+                self._condition.notify_all()
+
+    def yield_to_interactive(self):
+        """Block a background caller while chat traffic is active (bounded to avoid starvation)"""
+        if not _background.get():
+            return
+        started = time.monotonic()
+        with self._condition:
+            self._condition.wait_for(lambda: self._interactive == 0, timeout=Settings.TASK_MAX_YIELD_SECONDS)
+        INTERACTIVE_YIELD_SECONDS.observe(time.monotonic() - started)
+
+
+class JobProgress:
+    """Progress reporter handed to a running job"""
+
+    def __init__(self, scheduler: "TaskScheduler", job_id: str):
+        self._scheduler = scheduler
+        self._job_id = job_id
+
+    def __call__(self, stage: str, fraction: float):
+        self._scheduler._update_progress(self._job_id, stage, fraction)
+
+
+class TaskScheduler:
+    """Runs long document generation tasks as prioritized background jobs.
+
+    Jobs are deduplicated per (document, task type, language) while queued or
+    running, can be cancelled, report progress by stage, and are persisted as
+    JSON files so clients can poll for results instead of holding a connection.
+    Finished jobs are kept for ``TASK_JOB_RETENTION_SECONDS``, at most
+    ``TASK_JOB_RETENTION_COUNT`` of them.
+    """
+
+    def __init__(self, runner: Callable[[Dict, JobProgress], str], workers: Optional[int] = None):
+        self.runner = runner
+        self.jobs_dir = Settings.VECTOR_STORE_DIR.parent / "jobs"
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Condition()
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self._jobs: Dict[str, Dict] = {}
+        self._active_by_key: Dict[tuple, str] = {}
+        self._cancel_requested: set = set()
+        self._stopping = False
+        self._load_jobs()
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"task-worker-{i}", daemon=True)
+            for i in range(workers or Settings.TASK_WORKERS)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _get_job_file(self, job_id: str):
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _load_jobs(self):
+        """Load persisted jobs; anything unfinished was interrupted by a restart"""
+        for job_file in self.jobs_dir.glob("*.json"):
+            try:
+                with open(job_file, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except Exception:
+                continue
+            if job.get("status") not in TERMINAL_STATUSES:
+                job["status"] = FAILED
+                job["error"] = "Interrupted by server restart"
+                job["finished_at"] = datetime.now().isoformat()
+                self._persist(job)
+            self._jobs[job["job_id"]] = job
+        self._prune_locked()
+
+    def _prune_locked(self):
+        """Forget finished jobs past the retention age or count, oldest first (caller holds the lock)"""
+        finished = sorted(
+            (job for job in self._jobs.values() if job["status"] in TERMINAL_STATUSES),
+            key=lambda job: job.get("finished_at") or ""
+        )
+        excess = len(finished) - Settings.TASK_JOB_RETENTION_COUNT if Settings.TASK_JOB_RETENTION_COUNT else 0
+        cutoff = ""
+        if Settings.TASK_JOB_RETENTION_SECONDS:
+            cutoff = (datetime.now() - timedelta(seconds=Settings.TASK_JOB_RETENTION_SECONDS)).isoformat()
+        for position, job in enumerate(finished):
+            if position >= excess and (job.get("finished_at") or "") >= cutoff:
+                break
+            del self._jobs[job["job_id"]]
+            self._get_job_file(job["job_id"]).unlink(missing_ok=True)
+
+    def _persist(self, job: Dict):
+        job_file = self._get_job_file(job["job_id"])
+        tmp_file = job_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        tmp_file.replace(job_file)
+
+    @staticmethod
+    def _job_key(document_id: str, task_type: str, language: str) -> tuple:
+        return document_id, task_type, language
+
+    def submit(self, document_id: str, task_type: str, language: str = "en", priority: int = 5) -> tuple[Dict, bool]:
+        """Queue a job, or return the active job for the same document/task. Returns (job, deduplicated)"""
+        key = self._job_key(document_id, task_type, language)
+        with self._lock:
+            existing_id = self._active_by_key.get(key)
+            if existing_id:
+                return dict(self._jobs[existing_id]), True
+
+            now = datetime.now().isoformat()
+            job = {
+                "job_id": str(uuid.uuid4()),
+                "document_id": document_id,
+                "task_type": task_type,
+                "language": language,
+                "priority": priority,
+                "status": QUEUED,
+                "stage": None,
+                "progress": 0.0,
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._jobs[job["job_id"]] = job
+            self._active_by_key[key] = job["job_id"]
+            heapq.heappush(self._queue, (priority, next(self._sequence), job["job_id"]))
+            TASK_QUEUE_DEPTH.set(len(self._queue))
+            self._persist(job)
+            self._lock.notify()
+            return dict(job), False
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, document_id: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            jobs = [
+                {k: v for k, v in job.items() if k != "result"}
+                for job in self._jobs.values()
+                if document_id is None or job["document_id"] == document_id
+            ]
+        jobs.sort(key=lambda job: job.get("created_at", ""), reverse=True)
+        return jobs
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued job immediately, or ask a running job to stop at its next stage"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["status"] in TERMINAL_STATUSES:
+                return dict(job) if job else None
+            if job["status"] == QUEUED:
+                self._finish(job, CANCELLED)
+            else:
+                self._cancel_requested.add(job_id)
+            return dict(job)
+
+    def cancel_document(self, document_id: str) -> int:
+        """Cancel every queued or running job for a document. Returns how many were cancelled"""
+        with self._lock:
+            job_ids = [
+                job["job_id"] for job in self._jobs.values()
+                if job["document_id"] == document_id and job["status"] not in TERMINAL_STATUSES
+            ]
+        for job_id in job_ids:
+            self.cancel(job_id)
+        return len(job_ids)
+
+    def _finish(self, job: Dict, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        """Move a job to a terminal state (caller holds the lock)"""
+        job["status"] = status
+        job["result"] = result
+        job["error"] = error
+        if status == COMPLETED:
+            job["progress"] = 1.0
+        job["finished_at"] = job["updated_at"] = datetime.now().isoformat()
+        self._active_by_key.pop(self._job_key(job["document_id"], job["task_type"], job["language"]), None)
+        self._cancel_requested.discard(job["job_id"])
+        TASK_JOBS.inc(task_type=job["task_type"], status=status)
+        self._persist(job)
+        self._prune_locked()
+
+    def _update_progress(self, job_id: str, stage: str, fraction: float):
+        with self._lock:
+            if job_id in self._cancel_requested:
+                raise JobCancelledError(f"Job {job_id} was cancelled")
+            job = self._jobs[job_id]
+            job["stage"] = stage
+            job["progress"] = round(max(job["progress"], min(fraction, 1.0)), 3)
+            job["updated_at"] = datetime.now().isoformat()
+            self._persist(job)
+
+    def _next_job(self) -> Optional[Dict]:
+        with self._lock:
+            while not self._stopping:
+                while self._queue:
+                    _, _, job_id = heapq.heappop(self._queue)
+                    TASK_QUEUE_DEPTH.set(len(self._queue))
+                    # Cancelled while queued, and possibly pruned since
+                    job = self._jobs.get(job_id)
+                    if job and job["status"] == QUEUED:
+                        job["status"] = RUNNING
+                        job["started_at"] = job["updated_at"] = datetime.now().isoformat()
+                        self._persist(job)
+                        return job
+                self._lock.wait()
+            return None
+
+    def _worker(self):
+        _background.set(True)
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                result = self.runner(dict(job), JobProgress(self, job["job_id"]))
+                status, error = COMPLETED, None
+            except JobCancelledError:
+                result, status, error = None, CANCELLED, None
+            except Exception as e:
+                result, status, error = None, FAILED, str(e)
+            with self._lock:
+                if job["job_id"] in self._cancel_requested:
+                    status, result = CANCELLED, None
+                self._finish(job, status, result, error)
+
+    def shutdown(self):
+        with self._lock:
+            self._stopping = True
+            self._lock.notify_all()
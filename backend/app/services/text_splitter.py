@@ -1,18 +1,127 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 from app.config import Settings
 
+# A sentence (ending at terminal punctuation followed by whitespace), a paragraph, or the rest of the page
+_UNIT = re.compile(r"\S.*?(?:[.!?](?=\s)|(?=\n\s*\n)|$)", re.S)
+
+FINE = "fine"
+COARSE = "coarse"
+
+
+@dataclass
+class TextChunk:
+    """A chunk of document text with its location in the joined page text"""
+    text: str
+    start: int
+    end: int
+    page: int
+    page_end: int
+
+    def metadata(self) -> dict:
+        return {"page": self.page, "page_end": self.page_end, "start": self.start, "end": self.end}
+
+
+class _Layer:
+    """Packs a stream of text units into chunks of at most ``size`` characters with ``overlap``"""
+
+    def __init__(self, size: int, overlap: int):
+        self.size = size
+        self.overlap = min(overlap, size // 2)
+        self.units = deque()
+        self.spans: List[tuple] = []
+
+    def add(self, start: int, end: int, page: int):
+        if self.units and end - self.units[0][0] > self.size:
+            self._emit()
+            # Carry trailing units (up to the overlap) into the next chunk
+            while self.units and (
+                self.units[-1][1] - self.units[0][0] > self.overlap or end - self.units[0][0] > self.size
+            ):
+                self.units.popleft()
+        self.units.append((start, end, page))
+
+    def _emit(self):
+        self.spans.append((self.units[0][0], self.units[-1][1], self.units[0][2], self.units[-1][2]))
+
+    def finish(self) -> List[tuple]:
+        if self.units and (not self.spans or self.units[-1][1] > self.spans[-1][1]):
+            self._emit()
+        return self.spans
+
 
 class TextSplitterService:
-    """Service for splitting text into chunks"""
-    
-    def __init__(self):
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=Settings.CHUNK_SIZE,
-            chunk_overlap=Settings.CHUNK_OVERLAP,
-            length_function=len,
-        )
-    
+    """Service for splitting text into chunks.
+
+    Splits a document's pages in a single linear pass into two layers: fine
+    chunks (``CHUNK_SIZE``) for question answering and coarse chunks
+    (``COARSE_CHUNK_SIZE``) for summaries and other whole-document tasks.
+    Text is cut at sentence and paragraph boundaries; sentences longer than a
+    fine chunk are cut at whitespace. Every chunk records its page numbers and
+    its character span in the joined page text (each page followed by a newline).
+    """
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        coarse_chunk_size: Optional[int] = None,
+        coarse_chunk_overlap: Optional[int] = None
+    ):
+        self.chunk_size = chunk_size or Settings.CHUNK_SIZE
+        self.chunk_overlap = Settings.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+        self.coarse_chunk_size = max(coarse_chunk_size or Settings.COARSE_CHUNK_SIZE, self.chunk_size)
+        self.coarse_chunk_overlap = Settings.COARSE_CHUNK_OVERLAP if coarse_chunk_overlap is None else coarse_chunk_overlap
+
+    def settings(self) -> dict:
+        """Parameters that determine the chunk boundaries"""
+        return {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "coarse_chunk_size": self.coarse_chunk_size,
+            "coarse_chunk_overlap": self.coarse_chunk_overlap,
+        }
+
+    def _units(self, page_text: str, offset: int):
+        """Yield (start, end) spans of sentences in a page, none longer than a fine chunk"""
+        for match in _UNIT.finditer(page_text):
+            start = match.start()
+            end = start + len(match.group().rstrip())
+            while end - start > self.chunk_size:
+                cut = page_text.rfind(" ", start + 1, start + self.chunk_size)
+                if cut < 0:
+                    cut = start + self.chunk_size
+                piece_end = cut
+                while piece_end > start and page_text[piece_end - 1].isspace():
+                    piece_end -= 1
+                yield offset + start, offset + piece_end
+                start = cut
+                while start < end and page_text[start].isspace():
+                    start += 1
+            if end > start:
+                yield offset + start, offset + end
+
+    def split_pages(self, pages: List[str]) -> Dict[str, List[TextChunk]]:
+        """Split page texts into fine and coarse chunks in one pass"""
+        layers = {
+            FINE: _Layer(self.chunk_size, self.chunk_overlap),
+            COARSE: _Layer(self.coarse_chunk_size, self.coarse_chunk_overlap),
+        }
+        offset = 0
+        for page_number, page_text in enumerate(pages, start=1):
+            for start, end in self._units(page_text, offset):
+                for layer in layers.values():
+                    layer.add(start, end, page_number)
+            offset += len(page_text) + 1
+
+        text = "".join(page + "\n" for page in pages)
+        return {
+            name: [TextChunk(text[start:end], start, end, page, page_end) for start, end, page, page_end in layer.finish()]
+            for name, layer in layers.items()
+        }
+
     def split_text(self, text: str) -> list[str]:
         """Split text into chunks"""
-        return self.splitter.split_text(text)
-
+        return [chunk.text for chunk in self.split_pages([text])[FINE]]
@@ -0,0 +1,272 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+from app.config import Settings
+from app.services.metrics import metrics
+
+BUDGET_DECISIONS = metrics.counter(
+    "llm_budget_decisions_total",
+    "Token budget checks by outcome",
+    ["action"]
+)
+
+# Attribution for LLM calls made while serving the current request
+_usage_context: ContextVar[Dict] = ContextVar("usage_context", default={})
+# Tokens set aside for the LLM call about to be made in this context
+_reservation: ContextVar[Optional["Reservation"]] = ContextVar("usage_reservation", default=None)
+
+ALLOW = "allow"
+DEGRADE = "degrade"
+REJECT = "reject"
+
+TPM_WINDOW_SECONDS = 60
+
+
+class BudgetExceededError(Exception):
+    """Raised when an LLM call would exceed a configured token budget"""
+
+    def __init__(self, reason: str, retry_after: int, scope: str = "global"):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+@dataclass
+class Reservation:
+    """Window entries holding a call's estimated tokens until its real usage is recorded"""
+    entries: List[List] = field(default_factory=list)
+    settled: bool = False
+
+
+@dataclass
+class BudgetDecision:
+    action: str
+    reason: str = ""
+    # 0 when the call alone is larger than the budget, so waiting will not help
+    retry_after: int = 0
+    scope: str = ""
+    reservation: Optional[Reservation] = None
+
+
+@contextmanager
+def usage_context(**fields):
+    """Attribute LLM calls inside this block to a session / documents / task type"""
+    merged = {**_usage_context.get(), **{k: v for k, v in fields.items() if v is not None}}
+    token = _usage_context.set(merged)
+    try:
+        yield merged
+    finally:
+        _usage_context.reset(token)
+
+
+def current_usage_context() -> Dict:
+    return _usage_context.get()
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token estimate used before a call is made"""
+    return int(sum(len(text) for text in texts) / Settings.CHARS_PER_TOKEN)
+
+
+class UsageTracker:
+    """Aggregates LLM token usage per session, document and task type, and enforces budgets.
+
+    Totals are kept as compact ``[calls, prompt_tokens, completion_tokens, latency_ms]``
+    rows and flushed to a single JSON file. Budgets are checked against rolling windows:
+    the global Groq TPM quota over the last minute, and per-session / per-document
+    budgets over ``BUDGET_WINDOW_SECONDS``.
+    """
+
+    def __init__(self):
+        self.usage_dir = Settings.VECTOR_STORE_DIR.parent / "usage"
+        self.usage_dir.mkdir(parents=True, exist_ok=True)
+        self.usage_file = self.usage_dir / "usage_totals.json"
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, List[float]]] = self._load()
+        # (scope, key) -> deque of [timestamp, tokens]; reserved entries are updated in place
+        self._windows: Dict[Tuple[str, str], Deque[List]] = {}
+        self._last_sweep = time.time()
+        self._unflushed = 0
+
+    def _load(self) -> Dict[str, Dict[str, List[float]]]:
+        if not self.usage_file.exists():
+            return {"global": {}, "session": {}, "document": {}, "task": {}}
+        try:
+            with open(self.usage_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {"global": {}, "session": {}, "document": {}, "task": {}}
+
+    def _keys_for(self, context: Dict) -> List[Tuple[str, str]]:
+        keys = [("global", "all")]
+        if context.get("session_id"):
+            keys.append(("session", context["session_id"]))
+        for document_id in context.get("document_ids") or []:
+            keys.append(("document", document_id))
+        if context.get("task_type"):
+            keys.append(("task", context["task_type"]))
+        return keys
+
+    def record(self, prompt_tokens: int, completion_tokens: int, latency_s: float, context: Optional[Dict] = None):
+        """Record one LLM call against every scope in the current usage context.
+
+        If the call's tokens were reserved by ``check_budget``, the reservation is
+        corrected to the real count instead of being counted twice.
+        """
+        context = current_usage_context() if context is None else context
+        reservation = _reservation.get()
+        now = time.time()
+        total_tokens = prompt_tokens + completion_tokens
+
+        with self._lock:
+            for scope, key in self._keys_for(context):
+                row = self._totals.setdefault(scope, {}).setdefault(key, [0, 0, 0, 0.0])
+                row[0] += 1
+                row[1] += prompt_tokens
+                row[2] += completion_tokens
+                row[3] = round(row[3] + latency_s * 1000, 1)
+            if reservation is not None and not reservation.settled:
+                for entry in reservation.entries:
+                    entry[1] = total_tokens
+                reservation.settled = True
+            else:
+                for scope, key in self._keys_for(context):
+                    self._windows.setdefault((scope, key), deque()).append([now, total_tokens])
+            # Sessions and documents that are never checked again would otherwise keep their windows
+            if now - self._last_sweep >= TPM_WINDOW_SECONDS:
+                for scope, key in list(self._windows):
+                    self._expire_locked(scope, key, now)
+                self._last_sweep = now
+            self._unflushed += 1
+            should_flush = self._unflushed >= Settings.USAGE_FLUSH_EVERY
+
+        if should_flush:
+            self.flush()
+
+    def _expire_locked(self, scope: str, key: str, now: float) -> Optional[Deque[List]]:
+        """Drop entries older than the longest window, and the window itself once it is empty"""
+        window = self._windows.get((scope, key))
+        if window is None:
+            return None
+        longest = max(TPM_WINDOW_SECONDS, Settings.BUDGET_WINDOW_SECONDS)
+        while window and window[0][0] < now - longest:
+            window.popleft()
+        if not window:
+            del self._windows[(scope, key)]
+            return None
+        return window
+
+    def _window_tokens(self, scope: str, key: str, window_seconds: float, now: float) -> Tuple[int, float]:
+        """Tokens used within the window, and seconds until the oldest entry expires"""
+        window = self._expire_locked(scope, key, now)
+        if not window:
+            return 0, 0.0
+        horizon = now - window_seconds
+        used = 0
+        oldest = None
+        for timestamp, tokens in window:
+            if timestamp >= horizon:
+                used += tokens
+                if oldest is None:
+                    oldest = timestamp
+        return used, (oldest + window_seconds - now) if oldest is not None else 0.0
+
+    def check_budget(self, estimated_tokens: int, context: Optional[Dict] = None, reserve: bool = False) -> BudgetDecision:
+        """Decide whether a call of ``estimated_tokens`` may proceed, should degrade, or must be rejected.
+
+        With ``reserve``, a call that may proceed has its estimate added to the windows
+        right away, so concurrent checks see it before the call returns. Make the call
+        inside ``reserved(decision)`` so its real usage replaces the estimate.
+        """
+        context = current_usage_context() if context is None else context
+        now = time.time()
+        limits = [("global", "all", Settings.GROQ_TPM_LIMIT, TPM_WINDOW_SECONDS)]
+        if context.get("session_id"):
+            limits.append(("session", context["session_id"], Settings.SESSION_TOKEN_BUDGET, Settings.BUDGET_WINDOW_SECONDS))
+        for document_id in context.get("document_ids") or []:
+            limits.append(("document", document_id, Settings.DOCUMENT_TOKEN_BUDGET, Settings.BUDGET_WINDOW_SECONDS))
+
+        worst_ratio = 0.0
+        decision = BudgetDecision(ALLOW)
+        with self._lock:
+            for scope, key, limit, window_seconds in limits:
+                if not limit:
+                    continue
+                used, expires_in = self._window_tokens(scope, key, window_seconds, now)
+                ratio = (used + estimated_tokens) / limit
+                if ratio > worst_ratio:
+                    worst_ratio = ratio
+                    decision = BudgetDecision(
+                        ALLOW,
+                        reason=f"{scope} budget at {ratio:.0%} ({used + estimated_tokens}/{limit} tokens)",
+                        # Nothing to wait for if the call alone exceeds the limit
+                        retry_after=max(1, int(expires_in + 0.999)) if used and estimated_tokens <= limit else 0,
+                        scope=scope,
+                    )
+
+            if worst_ratio > 1.0:
+                decision.action = REJECT
+            elif worst_ratio > Settings.BUDGET_DEGRADE_THRESHOLD:
+                decision.action = DEGRADE
+            if reserve and decision.action != REJECT:
+                decision.reservation = Reservation()
+                for scope, key in self._keys_for(context):
+                    entry = [now, estimated_tokens]
+                    self._windows.setdefault((scope, key), deque()).append(entry)
+                    decision.reservation.entries.append(entry)
+        BUDGET_DECISIONS.inc(action=decision.action)
+        return decision
+
+    def release(self, reservation: Optional[Reservation]):
+        """Give back reserved tokens of a call that was not made or recorded"""
+        if reservation is None:
+            return
+        with self._lock:
+            if not reservation.settled:
+                for entry in reservation.entries:
+                    entry[1] = 0
+                reservation.settled = True
+
+    @contextmanager
+    def reserved(self, decision: BudgetDecision):
+        """Make the LLM call for a reserving ``check_budget`` inside this block"""
+        token = _reservation.set(decision.reservation)
+        try:
+            yield
+        finally:
+            _reservation.reset(token)
+            # The call failed, or its client did not report usage
+            self.release(decision.reservation)
+
+    def summary(self, scope: Optional[str] = None) -> Dict:
+        """Return aggregated totals, optionally for a single scope"""
+        with self._lock:
+            scopes = [scope] if scope else list(self._totals)
+            return {
+                name: {
+                    key: {
+                        "calls": int(row[0]),
+                        "prompt_tokens": int(row[1]),
+                        "completion_tokens": int(row[2]),
+                        "avg_latency_ms": round(row[3] / row[0], 1) if row[0] else 0.0,
+                    }
+                    for key, row in self._totals.get(name, {}).items()
+                }
+                for name in scopes
+            }
+
+    def flush(self):
+        """Persist aggregated totals"""
+        with self._lock:
+            data = json.dumps(self._totals, separators=(",", ":"))
+            self._unflushed = 0
+        tmp_file = self.usage_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(data)
+        tmp_file.replace(self.usage_file)
@@ -1,68 +1,641 @@
+import shutil
+import sqlite3
+import threading
 import uuid
-from typing import List, Dict
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
 from app.config import Settings
+from app.services.metrics import metrics, track_stage
+from app.services.sharding import ConsistentHashRing, ShardRebalancer, parse_shards, split_url
+
+# Shard name of the single local store when sharding is off
+LOCAL_SHARD = "local"
+# Collection name prefix of a document copy still being moved between shards
+STAGING_PREFIX = "moving_"
+
+SHARD_FANOUT = metrics.histogram(
+    "vector_query_shards",
+    "Shards searched by one multi-document retrieval",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16)
+)
 
 
 class VectorStoreService:
-    """Service for managing vector store (ChromaDB)"""
+    """Service for managing vector store (ChromaDB).
+    
+    By default all collections live in one local Chroma directory. With
+    ``VECTOR_STORE_SHARDS`` set, each document's collection lives on one of several
+    Chroma servers, picked by consistent hashing on the document id, and this
+    service routes every call to the shard holding the document. Multi-document
+    searches fan out to just the shards involved, in parallel, and their hits are
+    merged by distance. Shards listed in ``VECTOR_STORE_DRAINING_SHARDS`` (or
+    drained at runtime) are still read while a background rebalancer moves their
+    documents, and those misplaced by an added shard, to their owners.
+    """
     
-    def __init__(self):
-        self.client = chromadb.PersistentClient(
-            path=str(Settings.VECTOR_STORE_DIR),
-            settings=ChromaSettings(anonymized_telemetry=False)
+    def __init__(self, shards: Optional[Dict[str, str]] = None, draining: Optional[Dict[str, str]] = None):
+        self.shards = parse_shards(Settings.VECTOR_STORE_SHARDS) if shards is None else dict(shards)
+        self.draining = parse_shards(Settings.VECTOR_STORE_DRAINING_SHARDS) if draining is None else dict(draining)
+        self.sharded = bool(self.shards)
+        self._clients: Dict = {}
+        self._clients_lock = threading.Lock()
+        self._locations: Dict[str, str] = {}
+        # Striped per-document locks: a move excludes writes and deletes of the same document
+        self._document_locks = [threading.Lock() for _ in range(64)]
+        self._executor = None
+        self.rebalancer = None
+        
+        if not self.sharded:
+            self.draining = {}
+            self.ring = ConsistentHashRing([LOCAL_SHARD], virtual_nodes=1)
+            self._clients[LOCAL_SHARD] = self._connect(None)
+            return
+        
+        self.draining = {name: url for name, url in self.draining.items() if name not in self.shards}
+        self.ring = ConsistentHashRing(self.shards)
+        self._executor = ThreadPoolExecutor(
+            max_workers=Settings.SHARD_QUERY_WORKERS,
+            thread_name_prefix="shard-query"
         )
+        self.rebalancer = ShardRebalancer(self)
+        self.rebalancer.start()
+    
+    @staticmethod
+    def _connect(url: Optional[str]):
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+        
+        if url is None:
+            return chromadb.PersistentClient(
+                path=str(Settings.VECTOR_STORE_DIR),
+                settings=ChromaSettings(anonymized_telemetry=False)
+            )
+        return chromadb.HttpClient(**split_url(url), settings=ChromaSettings(anonymized_telemetry=False))
+    
+    def _client(self, shard: str):
+        """Chroma client for a shard, connected on first use so one unreachable shard does not block startup"""
+        client = self._clients.get(shard)
+        if client is not None:
+            return client
+        with self._clients_lock:
+            if shard not in self._clients:
+                url = self.shards.get(shard) or self.draining.get(shard)
+                if url is None:
+                    raise ValueError(f"Unknown shard {shard}")
+                self._clients[shard] = self._connect(url)
+            return self._clients[shard]
+    
+    @staticmethod
+    def _collection_name(document_id: str) -> str:
+        return f"document_{document_id}"
+    
+    def _document_lock(self, document_id: str) -> threading.Lock:
+        return self._document_locks[hash(document_id) % len(self._document_locks)]
+    
+    def shard_names(self) -> List[str]:
+        """Active shards, then draining ones"""
+        return self.ring.nodes + [name for name in self.draining if name not in self.ring.nodes]
     
-    def create_collection(self, document_id: str, filename: str):
+    def owner(self, document_id: str) -> str:
+        """Shard a document belongs on"""
+        return self.ring.node_for(document_id)
+    
+    @staticmethod
+    def _collection_metadata(document_id: str, filename: str, embeddings=None) -> Dict:
+        """Collection metadata; records the embedding dimension so loads need not probe for it"""
+        metadata = {"document_id": document_id, "filename": filename}
+        if embeddings is not None and len(embeddings):
+            metadata["dimension"] = len(embeddings[0])
+        return metadata
+    
+    def create_collection(self, document_id: str, filename: str, embeddings=None):
         """Create a new collection for a document"""
-        return self.client.get_or_create_collection(
-            name=f"document_{document_id}",
-            metadata={"document_id": document_id, "filename": filename}
+        shard = self.owner(document_id)
+        collection = self._client(shard).get_or_create_collection(
+            name=self._collection_name(document_id),
+            metadata=self._collection_metadata(document_id, filename, embeddings)
         )
+        self._locations[document_id] = shard
+        return collection
+    
+    def _locate(self, document_id: str):
+        """(shard, collection) currently holding a document, or None.
+        
+        Tries the shard it was last seen on, then its owner, then every other shard:
+        during rebalancing a document may not have reached its owner yet.
+        """
+        from chromadb.errors import NotFoundError
+        
+        candidates = [self._locations.get(document_id), self.owner(document_id)] + self.shard_names()
+        for shard in dict.fromkeys(shard for shard in candidates if shard):
+            try:
+                collection = self._client(shard).get_collection(name=self._collection_name(document_id))
+            except NotFoundError:
+                continue
+            self._locations[document_id] = shard
+            return shard, collection
+        self._locations.pop(document_id, None)
+        return None
     
     def get_collection(self, document_id: str):
         """Get collection for a document"""
+        located = self._locate(document_id)
+        if located is None:
+            raise ValueError(f"Document {document_id} not found")
+        return located[1]
+    
+    def has_document(self, document_id: str) -> bool:
+        """Whether a document's collection exists on any shard"""
+        return self._locate(document_id) is not None
+    
+    def load_index(self, document_id: str) -> bool:
+        """Load a document's vector index into Chroma's cache with one small query. Returns False if it is empty"""
+        collection = self.get_collection(document_id)
+        # Recorded in the collection metadata at write time, so the load is a single query
+        dimension = (collection.metadata or {}).get("dimension")
+        if not dimension:
+            # Written before the dimension was recorded
+            sample = collection.peek(1)["embeddings"]
+            if sample is None or not len(sample):
+                return False
+            dimension = len(sample[0])
+        with track_stage("index_load"):
+            results = collection.query(query_embeddings=[[0.0] * dimension], n_results=1, include=[])
+        return bool(results["ids"][0])
+    
+    def index_cache_capacity(self) -> Optional[int]:
+        """How many document indexes Chroma keeps open before closing the least recently used.
+        
+        The embedded client sizes its HNSW cache from the open-file limit, five files
+        per index. Shard servers size their own caches, so it is unknown when sharded.
+        """
+        if self.sharded:
+            return None
         try:
-            return self.client.get_collection(name=f"document_{document_id}")
+            import resource
+        except ImportError:
+            return None
+        return resource.getrlimit(resource.RLIMIT_NOFILE)[0] // 5
+    
+    def delete_document(self, document_id: str) -> bool:
+        """Drop a document's collection from every shard holding it. Returns False if it did not exist"""
+        from chromadb.errors import NotFoundError
+        
+        deleted = False
+        with self._document_lock(document_id):
+            for shard in self.shard_names():
+                for name in (self._collection_name(document_id), f"{STAGING_PREFIX}{document_id}"):
+                    try:
+                        self._client(shard).delete_collection(name=name)
+                    except NotFoundError:
+                        continue
+                    deleted = deleted or not name.startswith(STAGING_PREFIX)
+            self._locations.pop(document_id, None)
+        return deleted
+    
+    def list_shard_documents(self, shard: str) -> List[str]:
+        """Ids of the documents stored on one shard"""
+        return [
+            (collection.metadata or {}).get("document_id", collection.name[len("document_"):])
+            for collection in self._client(shard).list_collections()
+            if collection.name.startswith("document_")
+        ]
+    
+    def _write_staging(self, shard: str, document_id: str, metadata: Optional[Dict], batches: Iterable[Dict], total: int):
+        """Write a document's rows into a fresh staging collection on a shard and check that all ``total`` arrived.
+        
+        The caller renames it into place; until then readers see no partial collection.
+        """
+        from chromadb.errors import NotFoundError
+        
+        client = self._client(shard)
+        staging_name = f"{STAGING_PREFIX}{document_id}"
+        try:
+            client.delete_collection(name=staging_name)
+        except NotFoundError:
+            pass
+        staging = client.create_collection(name=staging_name, metadata=metadata)
+        try:
+            for batch in batches:
+                staging.add(**batch)
+            if staging.count() != total:
+                raise ValueError(f"Copy of {document_id} to {shard} is incomplete")
         except Exception:
-            raise ValueError(f"Document {document_id} not found")
+            client.delete_collection(name=staging_name)
+            raise
+        return staging
+    
+    def import_document(
+        self,
+        document_id: str,
+        filename: str,
+        ids: List[str],
+        embeddings,
+        documents: List[str],
+        metadatas: List[Dict]
+    ):
+        """Replace a document's collection with the given rows, e.g. from a snapshot bundle.
+        
+        Rows are written to a staging collection on the owner shard in batches and
+        swapped in once all of them arrived, so an interrupted import leaves no
+        partial collection behind. ``embeddings`` may be a memory-mapped array.
+        """
+        from chromadb.errors import NotFoundError
+        
+        shard = self.owner(document_id)
+        batch_size = self._client(shard).get_max_batch_size()
+        batches = (
+            {
+                "ids": ids[start:start + batch_size],
+                "embeddings": embeddings[start:start + batch_size],
+                "documents": documents[start:start + batch_size],
+                "metadatas": metadatas[start:start + batch_size]
+            }
+            for start in range(0, len(ids), batch_size)
+        )
+        name = self._collection_name(document_id)
+        with self._document_lock(document_id):
+            staging = self._write_staging(
+                shard, document_id, self._collection_metadata(document_id, filename, embeddings), batches, len(ids)
+            )
+            for other in self.shard_names():
+                try:
+                    self._client(other).delete_collection(name=name)
+                except NotFoundError:
+                    continue
+            staging.modify(name=name)
+            self._locations[document_id] = shard
+    
+    def move_document(self, document_id: str, source: str, target: str) -> bool:
+        """Copy a document's collection to another shard, then drop it from the source.
+        
+        The copy is written under a staging name and renamed once complete, so
+        readers keep using the source copy until the target copy is whole. If the
+        target already has the document (it was rewritten there meanwhile), the
+        source copy is stale and is just dropped. Returns False if the source no
+        longer has the document.
+        """
+        from chromadb.errors import NotFoundError
+        
+        name = self._collection_name(document_id)
+        with self._document_lock(document_id):
+            try:
+                source_collection = self._client(source).get_collection(name=name)
+            except NotFoundError:
+                return False
+            try:
+                self._client(target).get_collection(name=name)
+            except NotFoundError:
+                batch_size = min(self._client(source).get_max_batch_size(), self._client(target).get_max_batch_size())
+                total = source_collection.count()
+                
+                def batches():
+                    for offset in range(0, total, batch_size):
+                        batch = source_collection.get(
+                            include=["documents", "metadatas", "embeddings"],
+                            limit=batch_size,
+                            offset=offset
+                        )
+                        yield {
+                            "ids": batch["ids"],
+                            "embeddings": batch["embeddings"],
+                            "documents": batch["documents"],
+                            "metadatas": batch["metadatas"]
+                        }
+                
+                with track_stage("shard_move"):
+                    staging = self._write_staging(target, document_id, source_collection.metadata, batches(), total)
+                staging.modify(name=name)
+            self._locations[document_id] = target
+            self._client(source).delete_collection(name=name)
+        return True
+    
+    def add_shard(self, name: str, url: str):
+        """Start placing documents on a new shard; the rebalancer moves its share over"""
+        if not self.sharded:
+            raise ValueError("Sharding is not enabled")
+        with self._clients_lock:
+            self.shards[name] = url
+            self.draining.pop(name, None)
+            self._clients.pop(name, None)
+        self.ring.add(name)
+        self.rebalancer.trigger()
+    
+    def drain_shard(self, name: str):
+        """Stop placing documents on a shard and move its documents away; it stays readable meanwhile"""
+        if not self.sharded:
+            raise ValueError("Sharding is not enabled")
+        if name not in self.shards:
+            raise ValueError(f"Unknown shard {name}")
+        if len(self.shards) == 1:
+            raise ValueError("Cannot drain the last active shard")
+        with self._clients_lock:
+            self.draining[name] = self.shards.pop(name)
+        self.ring.remove(name)
+        self.rebalancer.trigger()
+    
+    def shard_stats(self) -> Dict:
+        shards = []
+        for shard in self.shard_names():
+            entry = {
+                "name": shard,
+                "url": self.shards.get(shard) or self.draining.get(shard),
+                "state": "draining" if shard in self.draining else "active",
+            }
+            try:
+                entry["documents"] = len(self.list_shard_documents(shard))
+            except Exception as e:
+                entry["error"] = str(e)
+            shards.append(entry)
+        return {
+            "sharded": self.sharded,
+            "shards": shards,
+            "rebalancer": self.rebalancer.stats() if self.rebalancer else None,
+        }
+    
+    def query_documents(
+        self,
+        query_embeddings: List[List[float]],
+        routes: List[List[str]],
+        k: int
+    ) -> List[List[Tuple[float, str, str]]]:
+        """Search each query's documents and merge the hits by distance.
+        
+        ``routes[i]`` lists the documents to search for query ``i``. Each document
+        is searched once for all the queries routed to it, documents are grouped by
+        shard, and shards are searched in parallel. Returns, per query, up to ``k``
+        (distance, chunk text, document id) hits from each document, nearest first.
+        """
+        queries_by_document: Dict[str, List[int]] = {}
+        for index, document_ids in enumerate(routes):
+            for document_id in document_ids:
+                queries_by_document.setdefault(document_id, []).append(index)
+        documents_by_shard: Dict[str, List[str]] = {}
+        for document_id in queries_by_document:
+            shard = self._locations.get(document_id) or self.owner(document_id)
+            documents_by_shard.setdefault(shard, []).append(document_id)
+        
+        def search(document_ids: List[str]) -> List[Tuple[int, float, str, str]]:
+            hits = []
+            for document_id in document_ids:
+                indexes = queries_by_document[document_id]
+                collection = self.get_collection(document_id)
+                with track_stage("vector_query"):
+                    results = collection.query(
+                        query_embeddings=[query_embeddings[index] for index in indexes],
+                        n_results=k,
+                        include=["documents", "distances"]
+                    )
+                for index, documents, distances in zip(indexes, results["documents"], results["distances"]):
+                    hits.extend((index, distance, text, document_id) for text, distance in zip(documents, distances))
+            return hits
+        
+        SHARD_FANOUT.observe(len(documents_by_shard))
+        if self._executor and len(documents_by_shard) > 1:
+            shard_hits = list(self._executor.map(search, documents_by_shard.values()))
+        else:
+            shard_hits = [search(document_ids) for document_ids in documents_by_shard.values()]
+        
+        merged: List[List[Tuple[float, str, str]]] = [[] for _ in query_embeddings]
+        for hits in shard_hits:
+            for index, distance, text, document_id in hits:
+                merged[index].append((distance, text, document_id))
+        for hits in merged:
+            # Ties broken by document so results do not depend on shard placement
+            hits.sort(key=lambda hit: (hit[0], hit[2]))
+        return merged
+    
+    def close(self):
+        if self.rebalancer:
+            self.rebalancer.shutdown()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _directory_size(path: Path) -> int:
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    
+    @staticmethod
+    def compact(store_dir: Path = None, vacuum: bool = True) -> Dict:
+        """Reclaim disk space in a Chroma directory and report the bytes freed.
+        
+        Removes HNSW segment directories no longer referenced by any collection
+        (Chroma leaves them behind when a collection is dropped) and VACUUMs the
+        SQLite database. Run it while no server is writing to the directory.
+        """
+        store_dir = Path(store_dir or Settings.VECTOR_STORE_DIR)
+        db_file = store_dir / "chroma.sqlite3"
+        if not db_file.exists():
+            raise ValueError(f"No Chroma database found in {store_dir}")
+        
+        bytes_before = VectorStoreService._directory_size(store_dir)
+        
+        connection = sqlite3.connect(db_file)
+        try:
+            segment_ids = {row[0] for row in connection.execute("SELECT id FROM segments")}
+            
+            removed_segments = 0
+            for child in store_dir.iterdir():
+                if not child.is_dir() or child.name in segment_ids:
+                    continue
+                try:
+                    uuid.UUID(child.name)
+                except ValueError:
+                    continue  # Not a segment directory
+                shutil.rmtree(child)
+                removed_segments += 1
+            
+            if vacuum:
+                connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                connection.execute("VACUUM")
+        finally:
+            connection.close()
+        
+        bytes_after = VectorStoreService._directory_size(store_dir)
+        return {
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "bytes_freed": bytes_before - bytes_after,
+            "orphaned_segments_removed": removed_segments,
+        }
     
     def add_documents(
         self,
         collection,
         documents: List[str],
         embeddings: List[List[float]],
-        document_id: str
+        document_id: str,
+        metadatas: Optional[List[Dict]] = None,
+        chunk_indexes: Optional[List[int]] = None
     ):
         """Add documents to a collection"""
-        collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            ids=[f"{document_id}_chunk_{i}" for i in range(len(documents))],
-            metadatas=[{"chunk_index": i, "document_id": document_id} for i in range(len(documents))]
+        chunk_indexes = chunk_indexes or list(range(len(documents)))
+        with track_stage("vector_add"):
+            collection.add(
+                embeddings=embeddings,
+                documents=documents,
+                ids=[self.chunk_id(document_id, i) for i in chunk_indexes],
+                metadatas=self._chunk_metadatas(document_id, chunk_indexes, metadatas)
+            )
+    
+    def add_document(
+        self,
+        document_id: str,
+        filename: str,
+        documents: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict]] = None,
+        chunk_indexes: Optional[List[int]] = None
+    ):
+        """Create a new document's collection and add its chunks.
+        
+        Holds the document lock throughout, so a rebalance cannot move the
+        collection while it is only partly written.
+        """
+        with self._document_lock(document_id):
+            collection = self.create_collection(document_id, filename, embeddings)
+            self.add_documents(collection, documents, embeddings, document_id, metadatas, chunk_indexes)
+        return collection
+    
+    @staticmethod
+    def chunk_id(document_id: str, chunk_index: int) -> str:
+        return f"{document_id}_chunk_{chunk_index}"
+    
+    @staticmethod
+    def _chunk_metadatas(document_id: str, chunk_indexes: List[int], extra: Optional[List[Dict]] = None) -> List[Dict]:
+        """Per-chunk metadata: index and document id, plus e.g. page number and character span"""
+        return [
+            {"chunk_index": chunk_index, "document_id": document_id, **(extra[i] if extra else {})}
+            for i, chunk_index in enumerate(chunk_indexes)
+        ]
+    
+    def get_chunk_embeddings(self, document_id: str, chunk_indexes: List[int]) -> Dict[int, List[float]]:
+        """Embeddings of some of a document's chunks, by chunk index; missing chunks are left out"""
+        try:
+            collection = self.get_collection(document_id)
+        except ValueError:
+            return {}
+        results = collection.get(
+            ids=[self.chunk_id(document_id, i) for i in chunk_indexes],
+            include=["embeddings", "metadatas"]
         )
+        if results["embeddings"] is None:
+            return {}
+        return {
+            metadata["chunk_index"]: [float(x) for x in embedding]
+            for metadata, embedding in zip(results["metadatas"], results["embeddings"])
+        }
+    
+    def get_embeddings_by_text(self, document_id: str) -> Dict[str, List[float]]:
+        """Map each stored chunk text of a document to its embedding"""
+        try:
+            collection = self.get_collection(document_id)
+        except ValueError:
+            return {}
+        results = collection.get(include=["documents", "embeddings"])
+        if results["embeddings"] is None:
+            return {}
+        return {
+            text: [float(x) for x in embedding]
+            for text, embedding in zip(results["documents"], results["embeddings"])
+        }
+    
+    def unlink_duplicates(self, document_id: str, document_ids: Optional[Iterable[str]] = None) -> int:
+        """Clear ``duplicate_of`` links to a document's chunks from other documents (by default, from all of them).
+        
+        Linked chunks hold their own copy of the embedding, so they stay searchable. Returns the number unlinked.
+        """
+        try:
+            targets = self.get_collection(document_id).get(include=[])["ids"]
+        except ValueError:
+            return 0
+        if not targets:
+            return 0
+        if document_ids is None:
+            document_ids = [document["document_id"] for document in self.list_documents()]
+        
+        unlinked = 0
+        for other_id in document_ids:
+            if other_id == document_id:
+                continue
+            with self._document_lock(other_id):
+                located = self._locate(other_id)
+                if located is None:
+                    continue
+                collection = located[1]
+                ids = collection.get(where={"duplicate_of": {"$in": targets}}, include=[])["ids"]
+                if ids:
+                    collection.update(ids=ids, metadatas=[{"duplicate_of": None}] * len(ids))
+                    unlinked += len(ids)
+        return unlinked
+    
+    def replace_documents(
+        self,
+        document_id: str,
+        filename: str,
+        documents: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict]] = None,
+        chunk_indexes: Optional[List[int]] = None
+    ):
+        """Replace a document's chunks in place, keeping the collection queryable throughout"""
+        chunk_indexes = chunk_indexes or list(range(len(documents)))
+        with self._document_lock(document_id):
+            # Rewritten where it is now; a pending move takes the new chunks along
+            located = self._locate(document_id)
+            collection = located[1] if located else self.create_collection(document_id, filename, embeddings)
+            metadata = collection.metadata or {}
+            if len(embeddings) and metadata.get("dimension") != len(embeddings[0]):
+                collection.modify(metadata={**metadata, "dimension": len(embeddings[0])})
+            existing_ids = collection.get(include=[])["ids"]
+            new_ids = [self.chunk_id(document_id, i) for i in chunk_indexes]
+            with track_stage("vector_add"):
+                if documents:
+                    collection.upsert(
+                        embeddings=embeddings,
+                        documents=documents,
+                        ids=new_ids,
+                        metadatas=self._chunk_metadatas(document_id, chunk_indexes, metadatas)
+                    )
+                new_ids = set(new_ids)
+                stale_ids = [chunk_id for chunk_id in existing_ids if chunk_id not in new_ids]
+                if stale_ids:
+                    collection.delete(ids=stale_ids)
+    
+    def get_filename(self, document_id: str) -> str:
+        try:
+            metadata = self.get_collection(document_id).metadata or {}
+        except ValueError:
+            return "unknown.pdf"
+        return metadata.get("filename", "unknown.pdf")
     
     def list_documents(self) -> List[Dict]:
         """List all processed documents"""
-        collections = self.client.list_collections()
         documents = []
+        seen = set()
         
-        for collection in collections:
-            metadata = collection.metadata or {}
-            documents.append({
-                "document_id": metadata.get("document_id", collection.name),
-                "filename": metadata.get("filename", "Unknown"),
-                "name": collection.name
-            })
+        for shard in self.shard_names():
+            for collection in self._client(shard).list_collections():
+                metadata = collection.metadata or {}
+                document_id = metadata.get("document_id", collection.name)
+                # Half-copied documents, and the source copy of one just moved
+                if collection.name.startswith(STAGING_PREFIX) or document_id in seen:
+                    continue
+                seen.add(document_id)
+                documents.append({
+                    "document_id": document_id,
+                    "filename": metadata.get("filename", "Unknown"),
+                    "name": collection.name
+                })
         
         return documents
     
     def get_all_chunks(self, document_id: str) -> List[str]:
         """Get all chunks from a document"""
         collection = self.get_collection(document_id)
-        results = collection.get()
+        with track_stage("vector_get_all"):
+            results = collection.get()
         
         if results['documents']:
             # Sort by chunk_index in metadata
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate chunk benchmark: ingests a synthetic course corpus with and without
+MinHash/LSH deduplication and reports index size, chunks embedded, ingestion time
+and how many distinct passages end up in a question's top-k context.
+
+The corpus mimics repeated course material: every original PDF may be followed by
+an identical copy (the same deck uploaded for another course) or by a new edition
+with a fifth of its pages rewritten.
+
+Run from the backend directory:
+    python -m benchmarks.dedup --documents 30 --pages 12 --fake-embeddings --fake-embedding-ms 8 --output dedup.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.e2e import configure_environment, peak_rss_mb
+from benchmarks.fake_embeddings import HashingEmbeddingService
+from benchmarks.synthetic_pdf import build_pdf
+
+
+class SlowHashingEmbeddingService(HashingEmbeddingService):
+    """Hashing embedder that also charges a fixed per-chunk cost, standing in for a model"""
+
+    def __init__(self, ms_per_chunk: float):
+        super().__init__()
+        self.delay = ms_per_chunk / 1000
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.delay * len(texts))
+        return super().embed_documents(texts)
+
+
+class UploadFile:
+    """The parts of a FastAPI upload that DocumentService reads"""
+
+    def __init__(self, path: Path):
+        self.filename = path.name
+        self.path = path
+
+    async def read(self) -> bytes:
+        return self.path.read_bytes()
+
+
+def build_corpus(directory: Path, originals: int, pages: int, seed: int) -> list[tuple[str, Path]]:
+    """Write (kind, pdf) pairs: originals, identical copies and revised editions"""
+    rng = random.Random(seed)
+    page_seeds = itertools.count(seed * 1_000_000 + 1)
+    directory.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for index in range(originals):
+        seeds = [next(page_seeds) for _ in range(pages)]
+        entries.append(("original", seeds))
+        roll = rng.random()
+        if roll < 0.3:
+            entries.append(("copy", list(seeds)))
+        elif roll < 0.6:
+            edition = list(seeds)
+            for page in rng.sample(range(pages), max(1, pages // 5)):
+                edition[page] = next(page_seeds)
+            entries.append(("edition", edition))
+    return [
+        (kind, build_pdf(directory / f"{index:03d}_{kind}.pdf", pages, page_seeds=seeds))
+        for index, (kind, seeds) in enumerate(entries)
+    ]
+
+
+def directory_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def global_top(vector_store, document_ids: list[str], query_embedding: list[float], k: int) -> list[str]:
+    """Best k chunk texts over all documents, by distance"""
+    hits = []
+    for document_id in document_ids:
+        results = vector_store.get_collection(document_id).query(
+            query_embeddings=[query_embedding], n_results=k, include=["documents", "distances"]
+        )
+        hits.extend(zip(results["distances"][0], results["documents"][0]))
+    return [text for _, text in sorted(hits, key=lambda hit: hit[0])]
+
+
+async def run_mode(args, corpus: list[tuple[str, Path]], work_dir: Path, dedup_enabled: bool) -> dict:
+    from app.config import Settings
+    from app.services.document_service import DocumentService
+    from app.services.near_duplicates import NearDuplicateIndex
+    from app.services.text_splitter import FINE
+    from app.services.vector_store import VectorStoreService
+
+    # Each mode gets its own stores
+    Settings.UPLOAD_DIR = work_dir / "uploads"
+    Settings.VECTOR_STORE_DIR = work_dir / "vectorstore"
+    Settings.CHAT_HISTORY_DIR = work_dir / "chat_history"
+    Settings.ensure_directories()
+
+    if args.fake_embeddings:
+        embeddings = SlowHashingEmbeddingService(args.fake_embedding_ms)
+    else:
+        from app.services.embeddings import EmbeddingService
+        embeddings = EmbeddingService()
+    embedded = 0
+    embed_documents = embeddings.embed_documents
+
+    def counting_embed(texts):
+        nonlocal embedded
+        embedded += len(texts)
+        return embed_documents(texts)
+
+    embeddings.embed_documents = counting_embed
+    vector_store = VectorStoreService()
+    dedup = NearDuplicateIndex() if dedup_enabled else None
+    service = DocumentService(embeddings=embeddings, vector_store=vector_store, dedup=dedup)
+
+    started = time.perf_counter()
+    document_ids = [await service.upload_and_process(UploadFile(pdf)) for _, pdf in corpus]
+    ingest_s = time.perf_counter() - started
+
+    chunks_total = sum(len(service.artifacts.load(document_id)["split"]["layers"][FINE]) for document_id in document_ids)
+    chunks_stored, linked = 0, 0
+    for document_id in document_ids:
+        metadatas = vector_store.get_collection(document_id).get(include=["metadatas"])["metadatas"]
+        chunks_stored += len(metadatas)
+        linked += sum(1 for metadata in metadatas if metadata.get("duplicate_of"))
+
+    # Distinct passages in the top-k context of questions over the whole corpus
+    rng = random.Random(args.seed)
+    collapser = dedup or NearDuplicateIndex()
+    unique_raw, unique_collapsed = [], []
+    for _ in range(args.queries):
+        document_id = rng.choice(document_ids)
+        text = rng.choice(vector_store.get_all_chunks(document_id))
+        query = embeddings.embed_query(" ".join(rng.sample(text.split(), 12)))
+        ranked = global_top(vector_store, document_ids, query, args.k * 2)
+        unique_raw.append(len(collapser.collapse(ranked[:args.k])))
+        selected = collapser.collapse(ranked)[:args.k] if dedup_enabled else ranked[:args.k]
+        unique_collapsed.append(len(collapser.collapse(selected)))
+
+    return {
+        "dedup": dedup_enabled,
+        "ingest_s": round(ingest_s, 2),
+        "chunks_total": chunks_total,
+        "chunks_stored": chunks_stored,
+        "chunks_linked_across_documents": linked,
+        "chunks_embedded": embedded,
+        "vector_store_bytes": directory_bytes(Settings.VECTOR_STORE_DIR),
+        "dedup_index_bytes": directory_bytes(Settings.VECTOR_STORE_DIR.parent / "dedup") if dedup_enabled else 0,
+        "unique_passages_in_top_k": round(sum(unique_collapsed) / len(unique_collapsed), 2),
+        "unique_passages_in_raw_top_k": round(sum(unique_raw) / len(unique_raw), 2),
+    }
+
+
+async def run_benchmark(args, work_dir: Path) -> dict:
+    corpus = build_corpus(work_dir / "corpus", args.documents, args.pages, args.seed)
+    baseline = await run_mode(args, corpus, work_dir / "baseline", dedup_enabled=False)
+    deduplicated = await run_mode(args, corpus, work_dir / "dedup", dedup_enabled=True)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": {
+            "documents": len(corpus),
+            "originals": args.documents,
+            "copies": sum(1 for kind, _ in corpus if kind == "copy"),
+            "editions": sum(1 for kind, _ in corpus if kind == "edition"),
+            "pages_per_document": args.pages,
+            "embedding": f"hashing+{args.fake_embedding_ms}ms/chunk" if args.fake_embeddings else "model",
+            "k": args.k,
+        },
+        "baseline": baseline,
+        "dedup": deduplicated,
+        "embedding_reduction": round(1 - deduplicated["chunks_embedded"] / baseline["chunks_embedded"], 3),
+        "stored_chunk_reduction": round(1 - deduplicated["chunks_stored"] / baseline["chunks_stored"], 3),
+        "vector_store_size_reduction": round(
+            1 - deduplicated["vector_store_bytes"] / baseline["vector_store_bytes"], 3
+        ),
+        "ingestion_speedup": round(baseline["ingest_s"] / deduplicated["ingest_s"], 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate chunk detection benchmark")
+    parser.add_argument("--documents", type=int, default=30, help="Original documents (copies and editions are added)")
+    parser.add_argument("--pages", type=int, default=12, help="Pages per document")
+    parser.add_argument("--queries", type=int, default=50, help="Questions for the top-k context check")
+    parser.add_argument("--k", type=int, default=5, help="Chunks per question context")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use a hashing embedder instead of the model")
+    parser.add_argument("--fake-embedding-ms", type=float, default=0.0, help="Simulated model cost per embedded chunk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dedup-bench-") as tmp:
+        work_dir = Path(args.work_dir or tmp)
+        configure_environment(work_dir)
+        results = asyncio.run(run_benchmark(args, work_dir))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
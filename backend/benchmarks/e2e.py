@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: ingestion throughput, concurrent query latency,
+summarization wall-clock and peak RSS, using a fake LLM and synthetic PDFs.
+
+Run from the backend directory:
+    python -m benchmarks.e2e --pages 5 20 80 --queries 200 --concurrency 16 --output e2e.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_embeddings import HashingEmbeddingService
+from benchmarks.fake_llm import FakeLLMService
+from benchmarks.synthetic_pdf import build_corpus, VOCABULARY
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def configure_environment(work_dir: Path):
+    """Point all storage at a scratch directory before the app is imported"""
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    os.environ["UPLOAD_DIR"] = str(work_dir / "uploads")
+    os.environ["VECTOR_STORE_DIR"] = str(work_dir / "vectorstore")
+    os.environ["CHAT_HISTORY_DIR"] = str(work_dir / "chat_history")
+
+
+async def run_ingestion(client, container, pdfs: list[Path], page_counts: list[int]) -> tuple[dict, list[str]]:
+    results = []
+    document_ids = []
+    for pdf, pages in zip(pdfs, page_counts):
+        started = time.perf_counter()
+        with open(pdf, "rb") as f:
+            response = await client.post(
+                "/api/documents/upload",
+                files={"file": (pdf.name, f, "application/pdf")}
+            )
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        document_id = response.json()["document_id"]
+        document_ids.append(document_id)
+        chunks = container.vector_store.get_collection(document_id).count()
+        results.append({
+            "pages": pages,
+            "chunks": chunks,
+            "bytes": pdf.stat().st_size,
+            "seconds": round(elapsed, 4),
+            "pages_per_s": round(pages / elapsed, 2),
+            "chunks_per_s": round(chunks / elapsed, 2),
+        })
+    
+    total_seconds = sum(r["seconds"] for r in results)
+    return {
+        "documents": results,
+        "total_pages_per_s": round(sum(page_counts) / total_seconds, 2) if total_seconds else 0,
+        "total_chunks_per_s": round(sum(r["chunks"] for r in results) / total_seconds, 2) if total_seconds else 0,
+    }, document_ids
+
+
+async def run_queries(client, document_ids: list[str], total: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    session_id = (await client.post("/api/chat/session")).json()["session_id"]
+    questions = [
+        f"What does the document say about {rng.choice(VOCABULARY)} and {rng.choice(VOCABULARY)}?"
+        for _ in range(total)
+    ]
+    latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for question in questions:
+        queue.put_nowait(question)
+    
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                question = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            response = await client.post("/api/chat/query", json={
+                "query": question,
+                "session_id": session_id,
+                "document_ids": document_ids,
+            })
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(total / wall, 2) if wall else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+async def run_summarization(container, document_ids: list[str], page_counts: list[int]) -> list[dict]:
+    results = []
+    for document_id, pages in zip(document_ids, page_counts):
+        calls_before = container.llm.calls
+        started = time.perf_counter()
+        await container.rag_service.summarize_document(document_id)
+        results.append({
+            "pages": pages,
+            "seconds": round(time.perf_counter() - started, 3),
+            "llm_calls": container.llm.calls - calls_before,
+        })
+    return results
+
+
+async def run_benchmark(args) -> dict:
+    import httpx
+    from app.config import Settings
+    from app.dependencies import ServiceContainer
+    from app.main import app
+    
+    work_dir = Path(os.environ["UPLOAD_DIR"]).parent
+    Settings.ensure_directories()
+    pdfs = build_corpus(work_dir / "corpus", args.pages, seed=args.seed)
+    
+    fake_llm = FakeLLMService(
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        rate_limit_rpm=args.llm_rpm,
+        seed=args.seed
+    )
+    container = ServiceContainer()
+    container.override("llm", fake_llm)
+    if args.fake_embeddings:
+        container.override("embeddings", HashingEmbeddingService())
+    app.state.container = container
+    
+    startup = time.perf_counter()
+    container.warm_up()
+    warmup_s = time.perf_counter() - startup
+    
+    # ASGITransport does not run the lifespan; enter it so the app is set up as it is when served
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            ingestion, document_ids = await run_ingestion(client, container, pdfs, args.pages)
+            queries = await run_queries(client, document_ids, args.queries, args.concurrency, args.seed)
+        summarization = await run_summarization(container, document_ids, args.pages) if not args.skip_summary else []
+    
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": {
+            "pages": args.pages,
+            "queries": args.queries,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_rpm": args.llm_rpm,
+            "chunk_size": Settings.CHUNK_SIZE,
+            "chunk_overlap": Settings.CHUNK_OVERLAP,
+            "embedding_model": "hashing" if args.fake_embeddings else Settings.EMBEDDING_MODEL,
+        },
+        "warmup_s": round(warmup_s, 3),
+        "ingestion": ingestion,
+        "query": queries,
+        "summarization": summarization,
+        "llm": fake_llm.stats(),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end RAG benchmark with a fake LLM")
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 80], help="Page count of each synthetic PDF")
+    parser.add_argument("--queries", type=int, default=100, help="Total number of chat queries")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent query clients")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Mean fake LLM latency")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0, help="Std deviation of fake LLM latency")
+    parser.add_argument("--llm-rpm", type=int, default=0, help="Fake LLM requests per minute (0 = unlimited)")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use a hashing embedder instead of the model")
+    parser.add_argument("--skip-summary", action="store_true", help="Skip the summarization benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        work_dir = Path(args.work_dir or tmp)
+        configure_environment(work_dir)
+        results = asyncio.run(run_benchmark(args))
+    
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
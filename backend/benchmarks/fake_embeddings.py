@@ -0,0 +1,33 @@
+"""
+Deterministic hashing embedder used when the sentence-transformers model is unavailable.
+"""
+import hashlib
+import math
+import re
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbeddingService:
+    """Drop-in replacement for EmbeddingService that needs no model download"""
+    
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+    
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+    
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+    
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+    
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
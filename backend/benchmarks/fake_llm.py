@@ -0,0 +1,75 @@
+"""
+Local stand-in for LLMGroqService with configurable latency and rate limits.
+"""
+import random
+import threading
+import time
+
+
+class RateLimitExceeded(Exception):
+    """Raised when the fake provider rejects a call, mirroring a Groq 429"""
+
+
+class FakeLLMService:
+    """Drop-in replacement for LLMGroqService.generate used by benchmarks"""
+    
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        rate_limit_rpm: int = 0,
+        reject_when_limited: bool = False,
+        tokens_per_char: float = 0.25,
+        seed: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_rpm = rate_limit_rpm
+        self.reject_when_limited = reject_when_limited
+        self.tokens_per_char = tokens_per_char
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._call_times: list[float] = []
+        self.calls = 0
+        self.throttled = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+    
+    def _acquire_slot(self):
+        """Sliding one-minute window; waits (or rejects) once the RPM budget is used"""
+        if not self.rate_limit_rpm:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._call_times = [t for t in self._call_times if now - t < 60.0]
+                if len(self._call_times) < self.rate_limit_rpm:
+                    self._call_times.append(now)
+                    return
+                self.throttled += 1
+                wait = 60.0 - (now - self._call_times[0])
+            if self.reject_when_limited:
+                raise RateLimitExceeded("Rate limit reached for fake LLM")
+            time.sleep(wait)
+    
+    def generate(self, system_prompt: str, user_prompt: str) -> str:
+        """Sleep for the configured latency and return a deterministic answer"""
+        self._acquire_slot()
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        time.sleep(delay)
+        
+        answer = f"Synthetic answer based on {len(user_prompt)} characters of context."
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += int((len(system_prompt) + len(user_prompt)) * self.tokens_per_char)
+            self.completion_tokens += int(len(answer) * self.tokens_per_char)
+        return answer
+    
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
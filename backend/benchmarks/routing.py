@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Document routing benchmark: recall and latency of routed search against searching
+every document, on a synthetic corpus of topical documents.
+
+Each document mixes words from its own topic (topics are shared by a few documents),
+one or two neighbouring topics per section, and common filler. Queries are word
+samples from one chunk. The baseline searches all documents and keeps the global
+top-k chunks; routed search keeps the top-k chunks of the ROUTING_TOP_DOCUMENTS
+documents picked by the routing stage.
+
+Run from the backend directory:
+    python -m benchmarks.routing --documents 500 --queries 200 --top-n 1 2 4 8 16 32 --output routing.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.e2e import configure_environment, percentile, peak_rss_mb
+from benchmarks.fake_embeddings import HashingEmbeddingService
+from benchmarks.synthetic_pdf import VOCABULARY
+
+SYLLABLES = "ka lo mi nu pe ri sa to vu ze ba de fi go hu ja ke li mo ne".split()
+
+
+def topic_words(rng: random.Random, count: int) -> list[str]:
+    return ["".join(rng.choice(SYLLABLES) for _ in range(3)) for _ in range(count)]
+
+
+def build_corpus(rng: random.Random, documents: int, chunks_per_document: int, words_per_chunk: int) -> list[list[str]]:
+    """Return the chunk texts of each synthetic document"""
+    topics = [topic_words(rng, 15) for _ in range(max(1, documents // 2))]
+    corpus = []
+    for index in range(documents):
+        own = topics[index % len(topics)]
+        chunks = []
+        for chunk_index in range(chunks_per_document):
+            # Each section of a document drifts towards a neighbouring topic
+            neighbour = topics[(index + 1 + chunk_index // 5) % len(topics)]
+            words = []
+            for _ in range(words_per_chunk):
+                roll = rng.random()
+                pool = own if roll < 0.35 else neighbour if roll < 0.5 else VOCABULARY
+                words.append(rng.choice(pool))
+            chunks.append(" ".join(words) + ".")
+        corpus.append(chunks)
+    return corpus
+
+
+def search(vector_store, document_ids: list[str], query_embedding: list[float], k: int) -> list[tuple]:
+    """Global top-k (distance, chunk id) over the given documents"""
+    hits = []
+    for document_id in document_ids:
+        results = vector_store.get_collection(document_id).query(
+            query_embeddings=[query_embedding], n_results=k, include=["distances"]
+        )
+        hits.extend(zip(results["distances"][0], results["ids"][0]))
+    return sorted(hits)[:k]
+
+
+def run_benchmark(args) -> dict:
+    from app.config import Settings
+    from app.services.document_router import DocumentRouter
+    from app.services.vector_store import VectorStoreService
+
+    Settings.ensure_directories()
+    rng = random.Random(args.seed)
+    embedder = HashingEmbeddingService()
+    vector_store = VectorStoreService()
+    router = DocumentRouter(vector_store)
+
+    started = time.perf_counter()
+    corpus = build_corpus(rng, args.documents, args.chunks, args.words)
+    document_ids = []
+    for index, chunks in enumerate(corpus):
+        document_id = f"doc-{index:04d}"
+        embeddings = embedder.embed_documents(chunks)
+        vector_store.add_document(document_id, f"{document_id}.pdf", chunks, embeddings)
+        router.add_document(document_id, embeddings)
+        document_ids.append(document_id)
+    build_s = time.perf_counter() - started
+
+    queries = []
+    for _ in range(args.queries):
+        source = rng.randrange(len(corpus))
+        words = rng.choice(corpus[source]).rstrip(".").split()
+        queries.append(embedder.embed_query(" ".join(rng.sample(words, args.query_words))))
+
+    # Warm every index so both sides measure search, not first-load
+    for document_id in document_ids:
+        search(vector_store, [document_id], queries[0], 1)
+
+    baseline_latencies, truths = [], []
+    for query in queries:
+        started = time.perf_counter()
+        truths.append({chunk_id for _, chunk_id in search(vector_store, document_ids, query, args.k)})
+        baseline_latencies.append(time.perf_counter() - started)
+
+    routed = []
+    for top_n in args.top_n:
+        latencies, routing_latencies, recalls = [], [], []
+        for query, truth in zip(queries, truths):
+            started = time.perf_counter()
+            selected = router.route([query], document_ids, top_n=top_n)[0]
+            routing_latencies.append(time.perf_counter() - started)
+            hits = search(vector_store, selected, query, args.k)
+            latencies.append(time.perf_counter() - started)
+            recalls.append(len(truth & {chunk_id for _, chunk_id in hits}) / len(truth))
+        routed.append({
+            "top_n": top_n,
+            "recall_at_k": round(sum(recalls) / len(recalls), 4),
+            "routing_p50_ms": round(percentile(routing_latencies, 50) * 1000, 3),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "speedup_p50": round(percentile(baseline_latencies, 50) / percentile(latencies, 50), 1),
+        })
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": {
+            "documents": args.documents,
+            "chunks_per_document": args.chunks,
+            "queries": args.queries,
+            "k": args.k,
+            "routing_segments": Settings.ROUTING_SEGMENTS,
+        },
+        "build_s": round(build_s, 2),
+        "baseline": {
+            "p50_ms": round(percentile(baseline_latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(baseline_latencies, 95) * 1000, 2),
+        },
+        "routed": routed,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-stage document routing benchmark")
+    parser.add_argument("--documents", type=int, default=500, help="Synthetic documents in the corpus")
+    parser.add_argument("--chunks", type=int, default=20, help="Chunks per document")
+    parser.add_argument("--words", type=int, default=120, help="Words per chunk")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to run")
+    parser.add_argument("--query-words", type=int, default=8, help="Words sampled from a chunk per query")
+    parser.add_argument("--k", type=int, default=5, help="Chunks retrieved per query")
+    parser.add_argument("--top-n", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Routing settings to compare")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="routing-bench-") as tmp:
+        work_dir = Path(args.work_dir or tmp)
+        configure_environment(work_dir)
+        # Route however small the corpus: the run compares routed and exhaustive search
+        os.environ["ROUTING_MIN_DOCUMENTS"] = "0"
+        results = run_benchmark(args)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
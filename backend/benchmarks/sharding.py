@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Sharded vector store check and benchmark against local Chroma server processes.
+
+Starts several `chroma run` processes, spreads a synthetic corpus over them by
+consistent hashing, and checks that:
+  - every document lives on the shard the ring assigns it,
+  - multi-document searches merged across shards match an exact search,
+  - adding a shard moves only the documents it now owns, and draining a shard
+    empties it, with searches answering identically and without errors throughout,
+  - deleting a document removes it from every shard.
+It also reports the placement spread, rebalancing time and parallel fan-out latency.
+Exits non-zero if a check fails.
+
+Run from the backend directory (needs the `chroma` CLI from the chromadb package):
+    python -m benchmarks.sharding --shards 3 --documents 120 --queries 100 --output sharding.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.e2e import configure_environment, percentile
+from benchmarks.fake_embeddings import HashingEmbeddingService
+from benchmarks.routing import build_corpus
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_shard(chroma: str, path: Path) -> tuple[subprocess.Popen, str]:
+    """Start one Chroma server and wait until it answers"""
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    port = free_port()
+    process = subprocess.Popen(
+        [chroma, "run", "--path", str(path), "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            chromadb.HttpClient(host="127.0.0.1", port=port, settings=ChromaSettings(anonymized_telemetry=False)).heartbeat()
+            return process, f"http://127.0.0.1:{port}"
+        except Exception:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f"Chroma server on port {port} did not start")
+            time.sleep(0.2)
+
+
+def exact_top(embeddings: dict, document_ids: list[str], query, k: int) -> list[str]:
+    """Exact k nearest chunk texts (squared L2, Chroma's default) over the given documents"""
+    import numpy as np
+
+    hits = []
+    for document_id in document_ids:
+        texts, vectors = embeddings[document_id]
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        hits.extend(zip(distances.tolist(), texts))
+    hits.sort(key=lambda hit: hit[0])
+    return [text for _, text in hits[:k]]
+
+
+def placement(vector_store) -> dict:
+    """Shard -> document ids, and whether every document is on its owner"""
+    layout = {shard: vector_store.list_shard_documents(shard) for shard in vector_store.shard_names()}
+    misplaced = [
+        document_id for shard, document_ids in layout.items()
+        for document_id in document_ids if vector_store.owner(document_id) != shard
+    ]
+    return {"counts": {shard: len(ids) for shard, ids in layout.items()}, "misplaced": len(misplaced)}
+
+
+class BackgroundSearches:
+    """Keeps searching while shards are rebalanced, counting errors and changed results"""
+
+    def __init__(self, vector_store, queries: list, routes: list, expected: list, k: int):
+        self.vector_store = vector_store
+        self.queries, self.routes, self.expected, self.k = queries, routes, expected, k
+        self.searches, self.errors, self.mismatches = 0, 0, 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        index = 0
+        while not self._stop.is_set():
+            i = index % len(self.queries)
+            try:
+                hits = self.vector_store.query_documents([self.queries[i]], [self.routes[i]], self.k)[0]
+                if [text for _, text, _ in hits[:self.k]] != self.expected[i]:
+                    self.mismatches += 1
+            except Exception:
+                self.errors += 1
+            self.searches += 1
+            index += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_benchmark(args, work_dir: Path) -> dict:
+    import numpy as np
+    from app.services.sharding import ConsistentHashRing
+    from app.services.vector_store import VectorStoreService
+
+    chroma = shutil.which("chroma")
+    if chroma is None:
+        raise SystemExit("The `chroma` command (chromadb package) is needed to start shard servers")
+
+    processes = []
+    try:
+        shards = {}
+        for index in range(args.shards + 1):
+            process, url = start_shard(chroma, work_dir / f"shard{index}")
+            processes.append(process)
+            shards[f"s{index}"] = url
+        spare = f"s{args.shards}"
+        spare_url = shards.pop(spare)
+
+        checks = {}
+        rng = random.Random(args.seed)
+        embedder = HashingEmbeddingService()
+        vector_store = VectorStoreService(shards=shards, draining={})
+
+        # Ingest
+        corpus = build_corpus(rng, args.documents, args.chunks, args.words)
+        stored = {}
+        started = time.perf_counter()
+        for index, chunks in enumerate(corpus):
+            document_id = f"doc-{index:04d}"
+            embeddings = embedder.embed_documents(chunks)
+            vector_store.add_document(document_id, f"{document_id}.pdf", chunks, embeddings)
+            stored[document_id] = (chunks, np.asarray(embeddings, dtype=np.float32))
+        ingest_s = time.perf_counter() - started
+        document_ids = list(stored)
+
+        initial = placement(vector_store)
+        checks["placed_on_owner"] = initial["misplaced"] == 0 and sum(initial["counts"].values()) == len(document_ids)
+        checks["listed_once"] = len(vector_store.list_documents()) == len(document_ids)
+
+        # Multi-document searches: merged results against an exact search
+        queries, routes = [], []
+        for _ in range(args.queries):
+            chunks = corpus[rng.randrange(len(corpus))]
+            words = rng.choice(chunks).rstrip(".").split()
+            queries.append(embedder.embed_query(" ".join(rng.sample(words, 8))))
+            routes.append(rng.sample(document_ids, min(args.documents_per_query, len(document_ids))))
+        baseline = [
+            [text for _, text, _ in vector_store.query_documents([query], [route], args.k)[0][:args.k]]
+            for query, route in zip(queries, routes)
+        ]
+        exact = [
+            exact_top(stored, route, np.asarray(query, dtype=np.float32), args.k)
+            for query, route in zip(queries, routes)
+        ]
+        recall = sum(len(set(a) & set(b)) / args.k for a, b in zip(baseline, exact)) / len(queries)
+        checks["merged_matches_exact"] = recall >= 0.99
+
+        # Fan-out latency: shards searched in parallel vs one after another
+        def timed(parallel: bool) -> list[float]:
+            executor = vector_store._executor
+            vector_store._executor = executor if parallel else None
+            latencies = []
+            try:
+                for query, route in zip(queries, routes):
+                    started = time.perf_counter()
+                    vector_store.query_documents([query], [route], args.k)
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                vector_store._executor = executor
+            return latencies
+        sequential, parallel = timed(False), timed(True)
+
+        def still_answers(label: str, searches: BackgroundSearches):
+            now = [
+                [text for _, text, _ in vector_store.query_documents([query], [route], args.k)[0][:args.k]]
+                for query, route in zip(queries, routes)
+            ]
+            checks[f"{label}_results_unchanged"] = now == baseline
+            checks[f"{label}_no_errors_while_moving"] = searches.errors == 0
+            checks[f"{label}_no_changed_results_while_moving"] = searches.mismatches == 0
+
+        # Add a shard: only the documents it now owns should move
+        before = ConsistentHashRing(shards)
+        after = ConsistentHashRing(list(shards) + [spare])
+        expected_moves = sum(1 for document_id in document_ids if before.node_for(document_id) != after.node_for(document_id))
+        vector_store.add_shard(spare, spare_url)
+        with BackgroundSearches(vector_store, queries, routes, baseline, args.k) as searches:
+            add_run = vector_store.rebalancer.rebalance()
+        added = placement(vector_store)
+        checks["add_moves_only_new_owner_share"] = add_run["moved"] == expected_moves and add_run["failed"] == 0
+        checks["add_placed_on_owner"] = added["misplaced"] == 0
+        still_answers("add", searches)
+        add_searches = searches.searches
+
+        # Drain a shard: it must end up empty
+        drained = next(iter(shards))
+        vector_store.drain_shard(drained)
+        with BackgroundSearches(vector_store, queries, routes, baseline, args.k) as searches:
+            drain_run = vector_store.rebalancer.rebalance()
+        after_drain = placement(vector_store)
+        checks["drained_shard_empty"] = after_drain["counts"][drained] == 0 and drain_run["failed"] == 0
+        checks["drain_placed_on_owner"] = after_drain["misplaced"] == 0
+        still_answers("drain", searches)
+        drain_searches = searches.searches
+
+        # Delete: gone from every shard
+        victim = document_ids[0]
+        deleted = vector_store.delete_document(victim)
+        checks["delete_everywhere"] = deleted and all(
+            victim not in vector_store.list_shard_documents(shard) for shard in vector_store.shard_names()
+        )
+        vector_store.close()
+
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "config": {
+                "shards": args.shards,
+                "documents": args.documents,
+                "chunks_per_document": args.chunks,
+                "queries": args.queries,
+                "documents_per_query": args.documents_per_query,
+                "k": args.k,
+            },
+            "ingest_s": round(ingest_s, 2),
+            "placement": initial["counts"],
+            "merged_recall_vs_exact": round(recall, 4),
+            "fanout": {
+                "sequential_p50_ms": round(percentile(sequential, 50) * 1000, 2),
+                "parallel_p50_ms": round(percentile(parallel, 50) * 1000, 2),
+                "parallel_p95_ms": round(percentile(parallel, 95) * 1000, 2),
+                "speedup_p50": round(percentile(sequential, 50) / percentile(parallel, 50), 2),
+            },
+            "add_shard": {
+                **add_run,
+                "expected_moves": expected_moves,
+                "placement": added["counts"],
+                "searches_during": add_searches,
+            },
+            "drain_shard": {**drain_run, "shard": drained, "placement": after_drain["counts"], "searches_during": drain_searches},
+            "checks": checks,
+            "passed": all(checks.values()),
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded vector store check against local Chroma servers")
+    parser.add_argument("--shards", type=int, default=3, help="Shards to start with (one more is added during the run)")
+    parser.add_argument("--documents", type=int, default=120)
+    parser.add_argument("--chunks", type=int, default=20, help="Chunks per document")
+    parser.add_argument("--words", type=int, default=80, help="Words per chunk")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--documents-per-query", type=int, default=24, help="Documents each search spans")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="sharding-bench-") as tmp:
+        work_dir = Path(args.work_dir or tmp)
+        configure_environment(work_dir)
+        # The run drives rebalancing itself
+        os.environ["SHARD_REBALANCE_INTERVAL"] = "0"
+        results = run_benchmark(args, work_dir)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+    if not results["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Measure backend cold-start cost: per-module import time and time-to-first-request.
+
+Run from the backend directory:
+    python -m benchmarks.startup_time --output startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _benchmark_env() -> dict:
+    """Environment for child processes (the app refuses to import without a Groq key)"""
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    env["PYTHONPATH"] = str(BACKEND_DIR) + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure_import_time(module: str = "app.main", top: int = 15) -> dict:
+    """Run `python -X importtime -c 'import <module>'` and summarise the breakdown"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=_benchmark_env(),
+        capture_output=True,
+        text=True,
+    )
+    wall_time = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    
+    modules = []
+    self_by_package = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name.strip()
+        modules.append({"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+        self_by_package[name.split(".")[0]] += int(self_us)
+    
+    modules.sort(key=lambda m: m["cumulative_us"], reverse=True)
+    packages = sorted(self_by_package.items(), key=lambda item: item[1], reverse=True)
+    target = next((m for m in modules if m["module"] == module), None)
+    
+    return {
+        "module": module,
+        "process_wall_s": round(wall_time, 3),
+        "import_cumulative_s": round(target["cumulative_us"] / 1e6, 3) if target else None,
+        "top_modules": modules[:top],
+        "top_packages": [{"package": name, "self_us": us} for name, us in packages[:top]],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(path: str = "/", timeout: float = 120.0, warmup: bool = False) -> dict:
+    """Start uvicorn in a subprocess and time until the first successful response"""
+    port = _free_port()
+    env = _benchmark_env()
+    env["WARMUP_ON_STARTUP"] = "true" if warmup else "false"
+    
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}{path}"
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited before serving a request")
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError(f"No response from {url} within {timeout}s")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    status = response.status
+                break
+            except OSError:
+                time.sleep(0.05)
+        first_response = time.perf_counter() - started
+        
+        request_started = time.perf_counter()
+        with urllib.request.urlopen(url, timeout=timeout):
+            pass
+        second_request = time.perf_counter() - request_started
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    
+    return {
+        "path": path,
+        "warmup_on_startup": warmup,
+        "status": status,
+        "time_to_first_response_s": round(first_response, 3),
+        "second_request_s": round(second_request, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend startup-time benchmark")
+    parser.add_argument("--module", default="app.main", help="Module to profile with -X importtime")
+    parser.add_argument("--path", default="/", help="Endpoint used for time-to-first-request")
+    parser.add_argument("--top", type=int, default=15, help="Number of modules/packages to report")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import time")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+    
+    results = {
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "import": measure_import_time(args.module, args.top),
+    }
+    if not args.skip_server:
+        results["first_request"] = measure_first_request(args.path)
+    
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Generate synthetic text PDFs of a chosen size without extra dependencies.
+"""
+import random
+from pathlib import Path
+from typing import Optional
+
+VOCABULARY = (
+    "learning student lecture chapter theory method analysis result experiment data model "
+    "function variable system process structure energy history economy language culture "
+    "network algorithm memory signal equation proof example definition concept principle "
+    "cell protein market policy climate water matrix vector graph probability evidence "
+    "the of and to in is that for with as on by this are be from an which or it"
+).split()
+
+LINES_PER_PAGE = 55
+CHARS_PER_LINE = 90
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng: random.Random, page_number: int) -> list[str]:
+    lines = [f"Chapter {page_number // 10 + 1} - Section {page_number + 1}"]
+    while len(lines) < LINES_PER_PAGE:
+        words = []
+        length = 0
+        while length < CHARS_PER_LINE - 12:
+            word = rng.choice(VOCABULARY)
+            words.append(word)
+            length += len(word) + 1
+        line = " ".join(words)
+        lines.append(line[0].upper() + line[1:] + ".")
+    return lines
+
+
+def build_pdf(path: Path, pages: int, seed: int = 0, page_seeds: Optional[list[int]] = None) -> Path:
+    """Write a PDF with `pages` pages of deterministic pseudo-text and return its path.
+    
+    With `page_seeds`, each page's text comes from its own seed, so pages can be
+    repeated within and across documents.
+    """
+    rng = random.Random(seed)
+    objects: list[bytes] = []
+    
+    # Object numbering: 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    
+    for i, page_id in enumerate(page_ids):
+        text_ops = ["BT", "/F1 9 Tf", "13 TL", "40 800 Td"]
+        page_rng = random.Random(page_seeds[i]) if page_seeds else rng
+        for line in _page_lines(page_rng, i):
+            text_ops.append(f"({_escape(line)}) Tj T*")
+        text_ops.append("ET")
+        stream = "\n".join(text_ops).encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n".encode()
+    output += b"0000000000 65535 f \n"
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    
+    path = Path(path)
+    path.write_bytes(bytes(output))
+    return path
+
+
+def build_corpus(directory: Path, page_counts: list[int], seed: int = 0) -> list[Path]:
+    """Build one PDF per entry in `page_counts`"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    return [
+        build_pdf(directory / f"synthetic_{pages}p_{index}.pdf", pages, seed=seed + index)
+        for index, pages in enumerate(page_counts)
+    ]
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Reclaim disk space in the Chroma vector store after documents were deleted.
+
+Stop the server first (or point --path at a copy): SQLite VACUUM needs exclusive access.
+"""
+import argparse
+import json
+from app.config import Settings
+from app.services.vector_store import VectorStoreService
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact the Chroma vector store")
+    parser.add_argument("--path", default=str(Settings.VECTOR_STORE_DIR), help="Vector store directory")
+    parser.add_argument("--skip-vacuum", action="store_true", help="Only remove orphaned index directories")
+    args = parser.parse_args()
+    
+    report = VectorStoreService.compact(args.path, vacuum=not args.skip_vacuum)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Re-index stored documents after changing CHUNK_SIZE / CHUNK_OVERLAP or EMBEDDING_MODEL.
+
+Only the stages whose inputs changed are redone: stored page text is re-split
+instead of re-parsing the PDF, and chunks are re-embedded only when their text
+or the embedding model changed.
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.config import Settings
+from app.dependencies import ServiceContainer
+
+STAGES = ("parse", "split", "embed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-index processed documents")
+    parser.add_argument("document_ids", nargs="*", help="Documents to re-index (default: all)")
+    parser.add_argument("--workers", type=int, default=4, help="Documents processed in parallel")
+    parser.add_argument("--force", action="append", choices=STAGES, default=[], help="Redo a stage even if its inputs are unchanged")
+    args = parser.parse_args()
+    
+    Settings.ensure_directories()
+    container = ServiceContainer()
+    document_service = container.document_service
+    
+    document_ids = args.document_ids or sorted(
+        {document["document_id"] for document in container.vector_store.list_documents()}
+        | set(container.artifacts.list_document_ids())
+    )
+    print(f"Re-indexing {len(document_ids)} documents "
+          f"(chunk_size={Settings.CHUNK_SIZE}, chunk_overlap={Settings.CHUNK_OVERLAP}, model={Settings.EMBEDDING_MODEL})")
+    
+    started = time.perf_counter()
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(document_service.reindex_document, document_id, args.force): document_id
+            for document_id in document_ids
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            document_id = futures[future]
+            try:
+                result = future.result()
+                stages = ", ".join(result["stages"]) or "up to date"
+                print(f"[{done}/{len(futures)}] {document_id}: {stages} "
+                      f"({result['chunks']} chunks, {result['chunks_embedded']} embedded)", flush=True)
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(futures)}] {document_id}: failed: {e}", flush=True)
+    
+    print(f"Done in {time.perf_counter() - started:.1f}s, {failures} failed")
+    sys.exit(1 if failures else 0)
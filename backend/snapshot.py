@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Export document indexes as portable bundles, or import them on another node.
+
+    python snapshot.py export /mnt/shared/snapshots
+    python snapshot.py import /mnt/shared/snapshots
+
+Import only loads documents this node does not have yet, so it can be re-run to sync a replica.
+"""
+import argparse
+import json
+import sys
+import time
+from app.config import Settings
+from app.dependencies import ServiceContainer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import document index bundles")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("directory", help="Bundle directory (e.g. a shared volume or a synced object storage prefix)")
+    parser.add_argument("document_ids", nargs="*", help="Documents to export/import (default: all)")
+    parser.add_argument("--overwrite", action="store_true", help="Re-export documents that already have a bundle")
+    parser.add_argument("--skip-verify", action="store_true", help="Do not check bundle checksums on import")
+    args = parser.parse_args()
+    
+    Settings.ensure_directories()
+    snapshots = ServiceContainer().snapshots
+    started = time.perf_counter()
+    
+    if args.action == "export":
+        result = snapshots.export(args.directory, args.document_ids or None, overwrite=args.overwrite)
+    else:
+        def progress(done, total, document_id):
+            print(f"[{done}/{total}] {document_id}", flush=True)
+        result = snapshots.import_(
+            args.directory,
+            args.document_ids or None,
+            verify=not args.skip_verify,
+            progress=progress
+        )
+    
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["failed"] else 0)
@@ -41,7 +41,10 @@ export const documentApi = {
 
 export const chatApi = {
   query: async (request: QueryRequest): Promise<QueryResponse> => {
-    const response = await api.post<QueryResponse>('/api/chat/query', request)
+    // The session id lets the server share capacity fairly between sessions under load
+    const response = await api.post<QueryResponse>('/api/chat/query', request, {
+      headers: { 'X-Session-Id': request.session_id },
+    })
     return response.data
   },
 }